@@ -0,0 +1,163 @@
+import os
+import time
+import threading
+import logging
+import numpy as np
+import pandas as pd
+from core.metrics import cache_requests
+
+logger = logging.getLogger(__name__)
+
+BAR_STORAGE_FOLDER = os.path.join("./storage", "bars")
+BAR_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+# ความยาวของแท่งเทียนแต่ละ Interval ของ tvDatafeed (วินาที) ใช้ประเมินว่าต้องดึงเพิ่มกี่แท่ง
+INTERVAL_SECONDS = {
+    "in_1_minute": 60,
+    "in_3_minute": 3 * 60,
+    "in_5_minute": 5 * 60,
+    "in_15_minute": 15 * 60,
+    "in_30_minute": 30 * 60,
+    "in_45_minute": 45 * 60,
+    "in_1_hour": 60 * 60,
+    "in_2_hour": 2 * 60 * 60,
+    "in_3_hour": 3 * 60 * 60,
+    "in_4_hour": 4 * 60 * 60,
+    "in_daily": 24 * 60 * 60,
+    "in_weekly": 7 * 24 * 60 * 60,
+    "in_monthly": 28 * 24 * 60 * 60,
+}
+
+
+def interval_name(interval):
+    return getattr(interval, "name", str(interval))
+
+
+def frame_to_columns(df):
+    """แปลง DataFrame จาก tv.get_hist เป็น dict ของ numpy array (timestamp เป็น epoch วินาที)"""
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_convert(None)
+    columns = {"timestamp": index.asi8 // 10**9}
+    for col in BAR_COLUMNS:
+        columns[col] = df[col].to_numpy(dtype=np.float64)
+    return columns
+
+
+def columns_to_frame(columns, full_symbol):
+    df = pd.DataFrame({col: columns[col] for col in BAR_COLUMNS})
+    df.insert(0, "symbol", full_symbol)
+    df.index = pd.to_datetime(columns["timestamp"], unit="s")
+    df.index.name = "datetime"
+    return df
+
+
+class BarStore:
+    """
+    เก็บแท่งเทียน OHLCV แบบ column (.npz) หนึ่งไฟล์ต่อ symbol ต่อ interval
+    ทุกครั้งที่ขอข้อมูลจะดึงจาก upstream เฉพาะแท่งที่ใหม่กว่า timestamp ล่าสุดที่เก็บไว้แล้วต่อท้าย
+    """
+
+    def __init__(self, root=BAR_STORAGE_FOLDER, min_refresh_seconds=60, max_bars=5000, overlap_bars=2):
+        self.root = root
+        self.min_refresh_seconds = min_refresh_seconds
+        self.max_bars = max_bars
+        self.overlap_bars = overlap_bars
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _lock_for(self, key):
+        with self._locks_guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+    def path(self, exchange, symbol, interval):
+        safe_symbol = symbol.replace("/", "_").replace(":", "_")
+        return os.path.join(self.root, f"{exchange}_{safe_symbol}_{interval_name(interval)}.npz")
+
+    def load(self, exchange, symbol, interval):
+        path = self.path(exchange, symbol, interval)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as npz:
+                return {key: npz[key] for key in npz.files}
+        except Exception as e:
+            logger.warning(f"⚠️ อ่านไฟล์ {path} ไม่ได้: {e}")
+            return None
+
+    def save(self, exchange, symbol, interval, columns):
+        path = self.path(exchange, symbol, interval)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **columns)
+        os.replace(tmp_path, path)
+
+    def merge(self, stored, fresh):
+        """ตัดแท่งที่ซ้อนกับข้อมูลใหม่ทิ้ง (แท่งล่าสุดอาจยังไม่ปิด) แล้วต่อท้ายด้วยข้อมูลใหม่"""
+        if stored is None or len(stored["timestamp"]) == 0:
+            merged = {key: fresh[key] for key in ["timestamp"] + BAR_COLUMNS}
+        elif len(fresh["timestamp"]) == 0:
+            merged = {key: stored[key] for key in ["timestamp"] + BAR_COLUMNS}
+        else:
+            cut = np.searchsorted(stored["timestamp"], fresh["timestamp"][0], side="left")
+            merged = {
+                key: np.concatenate([stored[key][:cut], fresh[key]])
+                for key in ["timestamp"] + BAR_COLUMNS
+            }
+        if len(merged["timestamp"]) > self.max_bars:
+            merged = {key: value[-self.max_bars:] for key, value in merged.items()}
+        return merged
+
+    def bars_to_fetch(self, stored, interval):
+        step = INTERVAL_SECONDS.get(interval_name(interval), 60)
+        now = int(pd.Timestamp.now().value // 10**9)
+        elapsed = max(0, now - int(stored["timestamp"][-1]))
+        return int(min(elapsed // step + self.overlap_bars, self.max_bars))
+
+    def get_bars(self, exchange, symbol, interval, n_bars, fetch):
+        """
+        คืน DataFrame แท่งล่าสุด n_bars แท่ง
+        fetch(n) ต้องคืน DataFrame แบบเดียวกับ tv.get_hist(..., n_bars=n)
+        """
+        full_symbol = f"{exchange}:{symbol}"
+        with self._lock_for((exchange, symbol, interval_name(interval))):
+            stored = self.load(exchange, symbol, interval)
+
+            depth = int(stored["depth"]) if stored is not None and "depth" in stored else 0
+            fetched_at = float(stored["fetched_at"]) if stored is not None and "fetched_at" in stored else 0.0
+
+            if stored is None or len(stored["timestamp"]) == 0 or n_bars > depth:
+                # ยังไม่เคยดึงย้อนหลังลึกขนาดนี้ ต้องดึงใหม่ทั้งก้อน
+                n_fetch = n_bars
+                depth = max(depth, n_bars)
+                cache_requests.labels("bar_store", "miss").inc()
+            elif time.time() - fetched_at >= self.min_refresh_seconds:
+                n_fetch = self.bars_to_fetch(stored, interval)
+                cache_requests.labels("bar_store", "incremental").inc()
+            else:
+                n_fetch = 0
+                cache_requests.labels("bar_store", "hit").inc()
+
+            if n_fetch > 0:
+                fresh_df = fetch(n_fetch)
+
+                if fresh_df is not None and not fresh_df.empty:
+                    merged = self.merge(stored, frame_to_columns(fresh_df))
+                    merged["fetched_at"] = np.array(time.time())
+                    merged["depth"] = np.array(depth)
+                    self.save(exchange, symbol, interval, merged)
+                    logger.debug(f"{full_symbol}: ดึงเพิ่ม {len(fresh_df)} แท่ง รวม {len(merged['timestamp'])} แท่ง")
+                    stored = merged
+                elif stored is None:
+                    return None
+
+            columns = {key: stored[key][-n_bars:] for key in ["timestamp"] + BAR_COLUMNS}
+
+        return columns_to_frame(columns, full_symbol)
+
+
+bar_store = BarStore()
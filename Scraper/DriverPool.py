@@ -0,0 +1,172 @@
+import os
+import time
+import threading
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DRIVER_POOL_SIZE = int(os.getenv("DRIVER_POOL_SIZE", "2"))
+DRIVER_MAX_USES = int(os.getenv("DRIVER_MAX_USES", "50"))
+DRIVER_ACQUIRE_TIMEOUT = float(os.getenv("DRIVER_ACQUIRE_TIMEOUT", "30"))
+CHROMEDRIVER_PATH = "chromedriver-win64/chromedriver.exe"
+
+
+def new_chrome_driver():
+    # selenium import ช้า โหลดเฉพาะตอนเปิด browser จริง
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+
+    chrome_options = Options()
+    chrome_options.add_argument("--headless=new")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--no-sandbox")
+
+    service = Service(CHROMEDRIVER_PATH)
+    return webdriver.Chrome(service=service, options=chrome_options)
+
+
+class DriverPoolTimeout(Exception):
+    pass
+
+
+class PooledDriver:
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+        self.created_at = time.monotonic()
+
+
+class DriverPool:
+    """
+    pool ของ Chrome WebDriver ที่เปิดค้างไว้ (ไม่ต้องเปิด browser ใหม่ทุก request)
+    - จำนวน session สูงสุดไม่เกิน size
+    - ตรวจสุขภาพก่อนยืมทุกครั้ง และเปิดใหม่เมื่อใช้ครบ max_uses หรือ crash
+    - ถ้าทุก session ไม่ว่าง จะรอในคิวไม่เกิน acquire_timeout วินาที
+    """
+
+    def __init__(self, factory=new_chrome_driver, size=DRIVER_POOL_SIZE, max_uses=DRIVER_MAX_USES,
+                 acquire_timeout=DRIVER_ACQUIRE_TIMEOUT):
+        self.factory = factory
+        self.size = size
+        self.max_uses = max_uses
+        self.acquire_timeout = acquire_timeout
+        self._idle = []
+        self._total = 0
+        self._waiting = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def stats(self):
+        with self._cond:
+            return {"size": self.size, "open": self._total, "idle": len(self._idle), "waiting": self._waiting}
+
+    def _create(self):
+        try:
+            return PooledDriver(self.factory())
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            raise
+
+    def _destroy(self, item):
+        try:
+            item.driver.quit()
+        except Exception as e:
+            logger.debug(f"ปิด driver ไม่สำเร็จ: {e}")
+
+    def _is_healthy(self, item):
+        try:
+            item.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def _acquire(self):
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    if self._closed:
+                        raise DriverPoolTimeout("Driver pool is closed")
+                    if self._idle:
+                        item = self._idle.pop()
+                        break
+                    if self._total < self.size:
+                        self._total += 1
+                        item = None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise DriverPoolTimeout(f"No WebDriver available after {self.acquire_timeout}s")
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+        if item is None:
+            return self._create()
+
+        if not self._is_healthy(item):
+            logger.warning("⚠️ driver ไม่ตอบสนอง เปิดใหม่แทน")
+            self._destroy(item)
+            return self._create()
+        return item
+
+    def _release(self, item, broken=False):
+        item.uses += 1
+        retire = broken or item.uses >= self.max_uses or self._closed
+        if retire:
+            self._destroy(item)
+        with self._cond:
+            if retire:
+                self._total -= 1
+            else:
+                self._idle.append(item)
+            self._cond.notify()
+
+    @contextmanager
+    def lease(self):
+        item = self._acquire()
+        broken = False
+        try:
+            yield item.driver
+        except Exception:
+            broken = True
+            raise
+        finally:
+            self._release(item, broken)
+
+    def warm(self):
+        """เปิด driver ให้ครบ size ไว้ล่วงหน้า"""
+        items = []
+        try:
+            for _ in range(self.size):
+                with self._cond:
+                    if self._total >= self.size:
+                        break
+                    self._total += 1
+                items.append(self._create())
+        except Exception as e:
+            logger.warning(f"⚠️ warm driver pool ไม่สำเร็จ: {e}")
+        with self._cond:
+            self._idle.extend(items)
+            self._cond.notify_all()
+        logger.info(f"🌐 driver pool พร้อม {len(items)} session")
+
+    def warm_in_background(self):
+        threading.Thread(target=self.warm, name="driver-pool-warm", daemon=True).start()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._total -= len(idle)
+            self._cond.notify_all()
+        for item in idle:
+            self._destroy(item)
+
+
+driver_pool = DriverPool()
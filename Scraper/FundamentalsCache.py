@@ -0,0 +1,45 @@
+import os
+from Scraper.TtlCache import TtlCache
+from Scraper.StockFundamental import scrape_stock_data, trading_view_stock_data
+
+# ข้อมูลพื้นฐานบริษัทเปลี่ยนอย่างมากวันละครั้ง
+COMPANY_DATA_TTL = float(os.getenv("COMPANY_DATA_TTL", str(6 * 60 * 60)))
+COMPANY_PROFILE_TTL = float(os.getenv("COMPANY_PROFILE_TTL", str(6 * 60 * 60)))
+FUNDAMENTALS_STALE_TTL = float(os.getenv("FUNDAMENTALS_STALE_TTL", str(48 * 60 * 60)))
+
+company_data_cache = TtlCache(
+    "company_data",
+    ttl=COMPANY_DATA_TTL,
+    stale_ttl=FUNDAMENTALS_STALE_TTL,
+    max_entries=1000,
+    disk=True,
+)
+
+company_profile_cache = TtlCache(
+    "company_profile",
+    ttl=COMPANY_PROFILE_TTL,
+    stale_ttl=FUNDAMENTALS_STALE_TTL,
+    max_entries=2000,
+    disk=True,
+)
+
+
+def get_company_data(symbol):
+    """scrape_stock_data ผ่าน cache (SET highlight/profile/board)"""
+    symbol = symbol.strip().upper()
+    return company_data_cache.get(symbol, lambda: scrape_stock_data(symbol))
+
+
+def peek_company_data(symbol):
+    """คืนข้อมูลจาก cache ใน memory โดยไม่ scrape และไม่อ่าน disk (None ถ้าไม่มี) ใช้จาก async route ได้"""
+    symbol = symbol.strip().upper()
+    return company_data_cache.peek(symbol, lambda: scrape_stock_data(symbol), memory_only=True)
+
+
+def get_company_profile(tv_symbol):
+    """trading_view_stock_data ผ่าน cache, tv_symbol เช่น SET-PTT"""
+    return company_profile_cache.get(tv_symbol, lambda: trading_view_stock_data(tv_symbol))
+
+
+def peek_company_profile(tv_symbol):
+    return company_profile_cache.peek(tv_symbol, lambda: trading_view_stock_data(tv_symbol), memory_only=True)
@@ -1,57 +1,212 @@
-from tvDatafeed import TvDatafeed, Interval
-import pandas as pd
 import json
 import asyncio
 import logging
-import csv
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+import heapq
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from Scraper.SymbolUniverse import symbol_universe
+from Scraper.QuoteHub import QuoteHub
+from Scraper.MarketHours import market_hours
+from Scraper.QuoteJournal import quote_journal
+from Scraper.TvSessionPool import tv_pool
+from Scraper.Upstream import tradingview_upstream, backoff_delay
+from core.metrics import upstream_retries
+from core.executors import quote_poller_pool, tvdatafeed_pool
+import os
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def get_historical_data(symbol):
-    tv = TvDatafeed()
+# tvDatafeed/pandas/numpy (bar store, resample, indicator) import ในฟังก์ชันที่ใช้
+# server จึง start ได้โดยไม่ต้องโหลด library เหล่านี้ warm-up เบื้องหลังจะ import ไว้ก่อน request แรก
+
+# ชื่อย่อ -> ชื่อ Interval ของ tvDatafeed
+INTERVALS = {
+    "1m": "in_1_minute",
+    "3m": "in_3_minute",
+    "5m": "in_5_minute",
+    "15m": "in_15_minute",
+    "30m": "in_30_minute",
+    "45m": "in_45_minute",
+    "1h": "in_1_hour",
+    "2h": "in_2_hour",
+    "3h": "in_3_hour",
+    "4h": "in_4_hour",
+    "1d": "in_daily",
+    "1w": "in_weekly",
+    "1M": "in_monthly",
+}
+
+def parse_interval(value):
+    """แปลง "4h", "1d", "in_daily" ฯลฯ เป็น Interval"""
+    from tvDatafeed import Interval
+    if isinstance(value, Interval):
+        return value
+    name = INTERVALS.get(value) or (INTERVALS.get(value.lower()) if value else None) or value
+    try:
+        return Interval[name]
+    except KeyError:
+        raise ValueError(f"Unknown interval '{value}'")
+
+MAX_BARS = 5000
+CRON_WORKERS = int(os.getenv("CRON_WORKERS", "8"))
+CRON_MAX_RETRIES = int(os.getenv("CRON_MAX_RETRIES", "5"))
+
+# base series ละเอียดหนึ่งชุดต่อ symbol, interval ระหว่างวันที่หยาบกว่า (2h, 3h) ได้จากการ resample
+# 4h/รายวัน/รายสัปดาห์/รายเดือนดึงตรงเสมอ (ดู NATIVE_INTERVALS)
+BASE_INTERVAL = os.getenv("HIST_BASE_INTERVAL", "1h")
+BASE_BARS = MAX_BARS
+
+def bars_to_cover(interval, bars_count, start=None, timezone=None):
+    """
+    จำนวนแท่งที่ต้องดึง: bars_count แท่ง หรือพอย้อนไปถึง start (ประมาณจากความยาวแท่ง
+    ช่วงตลาดปิดทำให้ได้เกินพอ) ไม่เกิน MAX_BARS
+    """
+    from Scraper.BarStore import INTERVAL_SECONDS
+    from Scraper.Resample import to_timestamp
+    if start is None:
+        return bars_count
+    elapsed = time.time() - to_timestamp(start, timezone).value / 10**9
+    step = INTERVAL_SECONDS.get(interval.name, 60)
+    return int(min(MAX_BARS, max(bars_count, elapsed // step + 1)))
+
+def fetch_bars(exchange, stock_symbol, interval, bars_count):
+    from Scraper.BarStore import bar_store
+    # ดึงจาก upstream เฉพาะแท่งที่ยังไม่มีใน bar store
+    def fetch(n_bars):
+        return tv_pool.get_hist(
+            symbol=stock_symbol,
+            exchange=exchange,
+            interval=interval,
+            n_bars=n_bars
+        )
+
+    return bar_store.get_bars(exchange, stock_symbol, interval, bars_count, fetch)
 
-    matched_row = None
+def get_historical_frame(symbol, bars_count=1000, interval="4h", start=None, end=None, indicators=None):
+    """
+    DataFrame แท่งเทียน (index = datetime) ไม่เจอ symbol/ไม่มีข้อมูลคืน None
+    interval ระหว่างวันที่หยาบกว่า BASE_INTERVAL ได้จากการ resample base series เดียวตาม session ของตลาด
+    start/end (ISO หรือ epoch วินาที, ISO ที่ไม่มี offset เป็นเวลาของตลาด) ตัดช่วงด้วย binary search แล้วคืนไม่เกิน bars_count แท่งล่าสุดในช่วง
+    indicators (list จาก parse_indicators) จะถูกคำนวณบน series เต็มก่อนตัดช่วง แล้วเพิ่มเป็น column
+    """
+    from Scraper.Resample import is_coarser, base_bars_needed, resample_ohlcv, slice_range, to_timestamp, to_server_time
+    from signals.signals import indicator_engine
+
+    matched_row = symbol_universe.resolve(symbol)
+    if matched_row is None:
+        return None
 
-    with open('StockData.csv', newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            if row['symbol'].endswith(symbol):
-                matched_row = row
-                break
-    bars_count = 1000  # approx 1 year daily bars
     # print(matched_row['symbol'])
     exchange, stock_symbol = matched_row['symbol'].split(':', 1)
-    # Fetch historical data: daily bars, for about 1 year
-    historical_data = tv.get_hist(
-        symbol=stock_symbol,
-        exchange=exchange,
-        interval=Interval.in_4_hour,
-        n_bars=bars_count
-    )
+    interval = parse_interval(interval)
+    timezone = market_hours.timezone(exchange)
+
+    base_interval = parse_interval(BASE_INTERVAL)
+
+    n_bars = bars_to_cover(interval, bars_count, start, timezone)
+    historical_data = None
+    if is_coarser(interval, base_interval):
+        base_bars = min(BASE_BARS, base_bars_needed(interval, base_interval, n_bars))
+        base = fetch_bars(exchange, stock_symbol, base_interval, base_bars)
+        if base is not None and not base.empty:
+            historical_data = resample_ohlcv(base, interval, exchange)
+            # base series ย้อนหลังไม่พอ (เช่น รายวันหลายปี) -> ดึง interval นั้นตรงๆ แทน
+            if start is None and len(historical_data) < bars_count:
+                historical_data = None
+            elif start is not None and base.index[0] > to_server_time(to_timestamp(start, timezone)):
+                historical_data = None
+
+    if historical_data is None:
+        historical_data = fetch_bars(exchange, stock_symbol, interval, n_bars)
+        if historical_data is None:
+            return None
+
+    if indicators:
+        values = indicator_engine.compute((matched_row['symbol'], interval.name), historical_data, indicators)
+        historical_data = historical_data.assign(**values)
+
+    historical_data = slice_range(historical_data, start, end, timezone)
+    return historical_data.iloc[-bars_count:]
+
+def get_historical_data(symbol, bars_count=1000, interval="4h", start=None, end=None, indicators=None):
+    historical_data = get_historical_frame(symbol, bars_count, interval, start, end, indicators)
+    if historical_data is None or historical_data.empty:
+        return []
 
     historical_data = historical_data.copy()
     for col in historical_data.select_dtypes(include=['datetime64[ns]', 'datetime64[ns, UTC]']).columns:
         historical_data[col] = historical_data[col].dt.strftime('%Y-%m-%dT%H:%M:%S')
 
+    if indicators:
+        # ช่วง warm-up ของ indicator เป็น NaN ซึ่ง JSON ไม่รองรับ
+        historical_data = historical_data.astype(object).where(historical_data.notna(), None)
+
     json_data = historical_data.reset_index().to_dict(orient='records')
     return json_data
 
-TV_USER = "siwasit2546"
-TV_PASS = "fightfortriam1#"
-tv = TvDatafeed(username=TV_USER, password=TV_PASS)
+def get_stock_signals(symbol, interval="1d", bars_count=1000, lookback=50, indicators=None):
+    """
+    คำนวณ indicator บนแท่งเทียนย้อนหลัง แล้วคืนค่าล่าสุด + สัญญาณ crossover ใน lookback แท่งสุดท้าย
+    ไม่เจอ symbol/ไม่มีข้อมูลคืน None
+    """
+    from signals.signals import parse_indicators, detect_signals, latest_values, DEFAULT_SIGNAL_INDICATORS
+    from Scraper.Resample import epoch_seconds
+    indicators = indicators or parse_indicators(DEFAULT_SIGNAL_INDICATORS)
+    interval = parse_interval(interval)
+    df = get_historical_frame(symbol, bars_count, interval, indicators=indicators)
+    if df is None or df.empty:
+        return None
+
+    fields = [field for indicator in indicators for field in indicator.fields()]
+    values = {field: df[field].to_numpy() for field in fields}
+    return {
+        "symbol": str(df["symbol"].iloc[0]),
+        "interval": interval.name,
+        "timestamp": int(epoch_seconds(df.index[-1:])[0]),
+        "close": float(df["close"].iloc[-1]),
+        "indicators": latest_values(values),
+        "signals": detect_signals(df, values, since=max(0, len(df) - lookback)),
+    }
+
+async def get_historical_data_batch(symbol_list, bars_count=1000, interval="4h", loader=get_historical_data,
+                                    start=None, end=None):
+    """
+    ดึงแท่งเทียนหลาย symbol พร้อมกันบน tvdatafeed_pool (แต่ละ worker ใช้ TvDatafeed ของตัวเองซ้ำ)
+    รับเข้าคิวทั้ง batch ครั้งเดียว ไม่มี pool ซ้อน pool ที่ทำให้ request อื่นรอ worker ที่ว่างแต่รอ batch
+    loader(symbol, bars_count, interval, start, end) ใช้เปลี่ยนรูปแบบข้อมูลของแต่ละ symbol ได้
+    คืน {"data": {symbol: [...]}, "errors": {symbol: "..."}}
+    """
+    interval = parse_interval(interval)
+    symbols = list(dict.fromkeys(symbol_list))
+    results = await tvdatafeed_pool.run_batch(loader, [(symbol, bars_count, interval, start, end) for symbol in symbols])
+
+    data = {}
+    errors = {}
+    for symbol, result in zip(symbols, results):
+        if isinstance(result, Exception):
+            logger.warning(f"❌ {symbol} ดึงข้อมูลย้อนหลังไม่สำเร็จ: {result}")
+            errors[symbol] = str(result)
+        elif result:
+            data[symbol] = result
+        else:
+            errors[symbol] = "No historical data found"
+
+    return {"data": data, "errors": errors}
 
 def fetch_one_stock(row):
+    from tvDatafeed import Interval
     full_symbol = row['symbol']
     thai_name = row['ThaiCompanyName']
     eng_name = row['EngCompanyName']
     logo = row['logo']
 
-    logger.info(f"🔄 กำลังดึงข้อมูล: {full_symbol} ({eng_name})")
+    # log ราย symbol ที่ระดับ debug (cron ดึงทีละหลายพันตัว) เช็ค level ก่อนจะได้ไม่ต้อง format ข้อความ
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"🔄 กำลังดึงข้อมูล: {full_symbol} ({eng_name})")
 
     try:
         exchange, symbol = full_symbol.split(':', 1)
-        historical_data = tv.get_hist(
+        historical_data = tv_pool.get_hist(
             symbol=symbol,
             exchange=exchange,
             interval=Interval.in_4_hour,
@@ -73,7 +228,8 @@ def fetch_one_stock(row):
         previous_close = historical_data['close'].iloc[-2]
         pct_change = ((last_close - previous_close) / previous_close) * 100
 
-        logger.info(f"✅ {symbol}: ราคา {last_close} | เปลี่ยนแปลง {pct_change:.2f}%")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"✅ {symbol}: ราคา {last_close} | เปลี่ยนแปลง {pct_change:.2f}%")
 
         return {
             "stockSymbol": symbol,
@@ -97,21 +253,19 @@ def fetch_one_stock(row):
         }
 
 def get_stock_price(symbol_list):
-    df = pd.read_csv("StockData.csv")
-
-    # กรอง dataframe ให้เหลือแค่ symbol ที่ต้องการ
-    df_filtered = df[df['symbol'].str.upper().isin([s.upper() for s in symbol_list])]
+    # กรองให้เหลือแค่ symbol ที่ต้องการ
+    rows = symbol_universe.get_rows(symbol_list)
 
-    if df_filtered.empty:
+    if not rows:
         logger.warning("⚠️ ไม่มีข้อมูลบริษัทสำหรับ symbol ที่ระบุ")
         return []
 
     result = []
 
-    logger.info(f"เริ่มดึงข้อมูล {len(df_filtered)} ตัวที่ระบุเข้ามา ด้วย ThreadPoolExecutor max_workers=5")
+    logger.info(f"เริ่มดึงข้อมูล {len(rows)} ตัวที่ระบุเข้ามา ด้วย ThreadPoolExecutor max_workers=5")
 
     with ThreadPoolExecutor(max_workers=5) as executor:
-        futures = {executor.submit(fetch_one_stock, row): row['symbol'] for _, row in df_filtered.iterrows()}
+        futures = {executor.submit(fetch_one_stock, row): row['symbol'] for row in rows}
 
         for future in as_completed(futures):
             res = future.result()
@@ -124,30 +278,27 @@ async def async_fetch_one_stock(row):
     loop = asyncio.get_event_loop()
     return await loop.run_in_executor(None, fetch_one_stock, row)
 
-async def event_generator(symbol_list):
-    df = pd.read_csv("StockData.csv")
-    df_filtered = df[df['symbol'].str.upper().isin([s.upper() for s in symbol_list])]
+# poller หนึ่งตัวต่อ symbol ใช้ร่วมกันทุก connection ของ /streamStockPrice
+quote_hub = QuoteHub(fetch_one_stock, quote_poller_pool, market_hours=market_hours, journal=quote_journal)
 
-    if df_filtered.empty:
+async def event_generator(symbol_list, keep_alive_seconds=15):
+    rows = symbol_universe.get_rows(symbol_list)
+
+    if not rows:
         yield f"data: {json.dumps({'error': 'No symbols found'})}\n\n"
         return
 
-    batch_size = 2
-    rows = list(df_filtered.iterrows())
-
-    for i in range(0, len(rows), batch_size):
-        batch_rows = rows[i:i + batch_size]
-
-        tasks = [async_fetch_one_stock(row) for _, row in batch_rows]
-        results = await asyncio.gather(*tasks)  # ดึงทีละ 2 ตัวพร้อมกัน
-
-        for res in results:
+    sub = quote_hub.subscribe(rows)
+    try:
+        while True:
+            try:
+                res = await asyncio.wait_for(sub.queue.get(), timeout=keep_alive_seconds)
+            except asyncio.TimeoutError:
+                yield ":\n\n"  # SSE comment keep-alive
+                continue
             yield f"data: {json.dumps(res)}\n\n"
-
-    # Keep connection alive
-    while True:
-        await asyncio.sleep(15)
-        yield ":\n\n"  # SSE comment keep-alive
+    finally:
+        quote_hub.unsubscribe(sub)
 
 # def get_cron_stock_price(symbol_list, max_retries=1000):
 #     import time
@@ -207,66 +358,78 @@ async def event_generator(symbol_list):
 
 #     return result, failed_symbols
 
-def get_cron_stock_price(symbol_list, max_retries=1000):
-    import time
-
-    df = pd.read_csv("StockData.csv")
-    df_filtered = df[df['symbol'].str.upper().isin([s.upper() for s in symbol_list])]
+def get_cron_stock_price(symbol_list, max_retries=CRON_MAX_RETRIES):
+    """
+    ดึงราคาทั้ง list ให้เร็วที่สุดเท่าที่ rate limiter ของ tradingview ยอม
+    ตัวที่ล้มจะถูก retry เป็นราย symbol ด้วย exponential backoff + jitter (ไม่รอทั้งรอบ)
+    ระหว่างที่ circuit เปิด จะเลื่อน retry ออกไปจนกว่าจะครบ cooldown
+    คืน (result, failed_symbols) โดย result มี symbol ละหนึ่งรายการ (ผลล่าสุด)
+    """
+    rows = symbol_universe.get_rows(symbol_list)
 
-    if df_filtered.empty:
+    if not rows:
         logger.warning("⚠️ ไม่มีข้อมูลบริษัทสำหรับ symbol ที่ระบุ")
         return [], []
 
-    result = []
-    failed_symbols = []
-
-    logger.info(f"เริ่มดึงข้อมูล {len(df_filtered)} ตัวที่ระบุเข้ามา ด้วย ThreadPoolExecutor max_workers=5")
-
-    for attempt in range(1, max_retries + 1):
-        current_result = []
-        current_failed = []
-
-        logger.info(f"📦 เริ่มรอบดึงข้อมูล Attempt #{attempt}")
-
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            futures = {
-                executor.submit(fetch_one_stock, row): row['symbol']
-                for _, row in df_filtered.iterrows()
-            }
-
-            for future in as_completed(futures):
-                symbol = futures[future]
+    logger.info(f"เริ่มดึงข้อมูล {len(rows)} ตัวที่ระบุเข้ามา ด้วย {CRON_WORKERS} workers")
+
+    latest = {}
+    attempts = {}
+    # (เวลาที่พร้อม retry, ลำดับ, row)
+    pending = [(0.0, i, row) for i, row in enumerate(rows)]
+    heapq.heapify(pending)
+    seq = len(rows)
+    in_flight = {}
+
+    with ThreadPoolExecutor(max_workers=CRON_WORKERS) as executor:
+        while pending or in_flight:
+            now = time.monotonic()
+            while pending and pending[0][0] <= now and len(in_flight) < CRON_WORKERS:
+                _, _, row = heapq.heappop(pending)
+                in_flight[executor.submit(fetch_one_stock, row)] = row
+
+            if not in_flight:
+                time.sleep(max(0.0, pending[0][0] - now))
+                continue
+
+            timeout = max(0.0, pending[0][0] - now) if pending else None
+            done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                row = in_flight.pop(future)
+                symbol = row['symbol']
+                # fetch_one_stock จับ exception เองแล้วคืน dict ที่มี error
+                # ที่หลุดมาถึงนี่ได้ให้นับเป็น error ของ symbol นั้น ไม่ให้ทั้ง shard ล้ม
                 try:
                     res = future.result()
-
-                    # ตรวจสอบผลลัพธ์
-                    if isinstance(res, dict) and res.get("error"):
-                        logger.warning(f"❌ ข้อมูล {symbol} ไม่สมบูรณ์ (error field): {res['error']}")
-                        current_failed.append(symbol)
-
-                    current_result.append(res)
-
                 except Exception as e:
-                    # ใช้ fetch_one_stock ให้ return error แทนการสร้าง dict เอง
-                    logger.warning(f"❌ Exception ที่ไม่ได้จับใน fetch_one_stock สำหรับ {symbol}: {e}")
-                    row = df[df['symbol'].str.upper() == symbol.upper()].iloc[0]
-                    res = fetch_one_stock(row)  # ให้มัน handle error เอง
-                    current_result.append(res)
-                    current_failed.append(symbol)
-
-        # เก็บผลลัพธ์รอบนี้
-        result.extend(current_result)
-        logger.info(f"✅ Attempt #{attempt}: สำเร็จ {len(current_result) - len(current_failed)} ตัว | ล้มเหลว {len(current_failed)} ตัว")
-
-        # รอบสุดท้ายหรือไม่มีตัวล้มเหลว -> หยุด loop
-        if not current_failed or attempt == max_retries:
-            failed_symbols = current_failed
-            break
-
-        # เตรียมข้อมูลสำหรับ retry เฉพาะตัวที่ fail
-        df_filtered = df[df['symbol'].str.upper().isin([s.upper() for s in current_failed])]
-
-        time.sleep(1)  # พักก่อน retry
+                    logger.error(f"❌ {symbol} เกิดข้อผิดพลาด: {e}")
+                    exchange, stock_symbol = symbol.split(':', 1)
+                    res = {
+                        "stockSymbol": stock_symbol,
+                        "stockMarket": exchange,
+                        "ThaiCompanyName": row['ThaiCompanyName'],
+                        "EngCompanyName": row['EngCompanyName'],
+                        "logo": row['logo'],
+                        "error": str(e)
+                    }
+
+                latest[symbol] = res
+                if not res.get("error"):
+                    continue
+
+                attempt = attempts[symbol] = attempts.get(symbol, 0) + 1
+                if attempt >= max_retries:
+                    continue
+                delay = max(backoff_delay(attempt), tradingview_upstream.breaker.retry_in())
+                seq += 1
+                upstream_retries.labels("tradingview", "backoff").inc()
+                heapq.heappush(pending, (time.monotonic() + delay, seq, row))
+
+    result = [latest[row['symbol']] for row in rows if row['symbol'] in latest]
+    failed_symbols = [quote_symbol for quote_symbol, res in latest.items() if res.get("error")]
+    logger.info(f"✅ สำเร็จ {len(result) - len(failed_symbols)} ตัว | ล้มเหลว {len(failed_symbols)} ตัว | retry {len(attempts)} ตัว")
 
     return result, failed_symbols
 
+
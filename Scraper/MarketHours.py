@@ -0,0 +1,175 @@
+import os
+import json
+import time
+import logging
+from datetime import datetime, date, timedelta, time as dtime
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+# ราคาปิดจริงมาหลัง close ไม่กี่นาที (closing auction / data delay) ยังถือว่าตลาด "live" อยู่ช่วงนี้
+MARKET_CLOSE_GRACE_MINUTES = float(os.getenv("MARKET_CLOSE_GRACE_MINUTES", "10"))
+# ปฏิทินวันหยุดทุกตลาด {"US": ["2027-01-01", ...], "SET": [...], "CN": [...]}
+# key เป็นชื่อปฏิทินใน MARKET_SESSIONS หรือชื่อ exchange (วันหยุดเฉพาะตลาดนั้น) ต้องเติมปีใหม่ทุกปี
+MARKET_HOLIDAYS_FILE = os.getenv("MARKET_HOLIDAYS_FILE", "market_holidays.json")
+
+US_SESSIONS = [("09:30", "16:00")]
+CN_SESSIONS = [("09:30", "11:30"), ("13:00", "15:00")]
+
+# exchange -> (timezone, ช่วงเวลาซื้อขายตามเวลาท้องถิ่น, ปฏิทินวันหยุดใน MARKET_HOLIDAYS_FILE)
+MARKET_SESSIONS = {
+    "SET": ("Asia/Bangkok", [("10:00", "12:30"), ("14:30", "16:40")], "SET"),
+    "NYSE": ("America/New_York", US_SESSIONS, "US"),
+    "NASDAQ": ("America/New_York", US_SESSIONS, "US"),
+    "AMEX": ("America/New_York", US_SESSIONS, "US"),
+    "CBOE": ("America/New_York", US_SESSIONS, "US"),
+    "SSE": ("Asia/Shanghai", CN_SESSIONS, "CN"),
+    "SZSE": ("Asia/Shanghai", CN_SESSIONS, "CN"),
+}
+
+
+def parse_hhmm(value):
+    hour, minute = value.split(":")
+    return dtime(int(hour), int(minute))
+
+
+class Market:
+    """ปฏิทินของตลาดเดียว: จันทร์-ศุกร์ ยกเว้นวันหยุด แต่ละวันมีได้หลาย session (เช่นพักเที่ยง)"""
+
+    def __init__(self, name, timezone, sessions, holidays=()):
+        self.name = name
+        self.tz = ZoneInfo(timezone)
+        self.sessions = [(parse_hhmm(start), parse_hhmm(end)) for start, end in sessions]
+        self.holidays = {date.fromisoformat(day) for day in holidays}
+        self.calendar_years = {day.year for day in self.holidays}
+
+    def is_trading_day(self, day):
+        return day.weekday() < 5 and day not in self.holidays
+
+    def _day_sessions(self, day):
+        if not self.is_trading_day(day):
+            return []
+        return [(datetime.combine(day, start, self.tz), datetime.combine(day, end, self.tz))
+                for start, end in self.sessions]
+
+    def is_open(self, now):
+        local = now.astimezone(self.tz)
+        return any(start <= local < end for start, end in self._day_sessions(local.date()))
+
+    def last_close(self, now, max_days=14):
+        """เวลาปิดของ session ล่าสุดที่ปิดไปแล้ว ณ now"""
+        day = now.astimezone(self.tz).date()
+        for _ in range(max_days):
+            for _, end in reversed(self._day_sessions(day)):
+                if end <= now:
+                    return end
+            day -= timedelta(days=1)
+        return None
+
+    def next_open(self, now, max_days=14):
+        day = now.astimezone(self.tz).date()
+        for _ in range(max_days):
+            for start, _ in self._day_sessions(day):
+                if start > now:
+                    return start
+            day += timedelta(days=1)
+        return None
+
+
+def load_holidays(path=MARKET_HOLIDAYS_FILE):
+    if not path or not os.path.exists(path):
+        logger.warning(f"⚠️ ไม่พบไฟล์วันหยุด {path} ทุกตลาดจะถือว่าเปิดทุกวันจันทร์-ศุกร์")
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return {key.upper(): days for key, days in json.load(f).items()}
+    except Exception as e:
+        logger.warning(f"⚠️ โหลดวันหยุดจาก {path} ไม่ได้: {e}")
+        return {}
+
+
+class MarketHours:
+    """
+    รู้ว่าแต่ละตลาดเปิดอยู่ไหมตามเวลาท้องถิ่นของตลาดนั้น
+    - live: อยู่ใน session หรือเพิ่งปิดไม่เกิน grace นาที (ราคายังเปลี่ยนได้)
+    - settled_close: เวลาปิดล่าสุดที่พ้น grace แล้ว ราคาที่ดึงหลังเวลานี้คือราคาปิด ไม่ต้องดึงซ้ำจนกว่าจะเปิดใหม่
+    exchange ที่ไม่รู้จักถือว่า live ตลอด (ดึงตามปกติเหมือนเดิม)
+    วันหยุดมาจาก holidays_file ถ้าปฏิทินของตลาดไม่มีวันหยุดของปีปัจจุบันเลยจะ log warning (ปีละครั้งต่อตลาด)
+    """
+
+    def __init__(self, sessions=MARKET_SESSIONS, grace_minutes=MARKET_CLOSE_GRACE_MINUTES, holidays_file=MARKET_HOLIDAYS_FILE):
+        holidays = load_holidays(holidays_file)
+        self.holidays_file = holidays_file
+        self.grace = timedelta(minutes=grace_minutes)
+        self.markets = {
+            name: Market(name, timezone, market_sessions,
+                         holidays.get(calendar, []) + (holidays.get(name, []) if name != calendar else []))
+            for name, (timezone, market_sessions, calendar) in sessions.items()
+        }
+        self._warned = set()
+
+    @staticmethod
+    def _now(now):
+        if now is None:
+            return datetime.now(ZoneInfo("UTC"))
+        if isinstance(now, (int, float)):
+            return datetime.fromtimestamp(now, ZoneInfo("UTC"))
+        return now
+
+    def _check_calendar(self, market, now):
+        year = now.astimezone(market.tz).year
+        if year in market.calendar_years or (market.name, year) in self._warned:
+            return
+        self._warned.add((market.name, year))
+        logger.warning(f"⚠️ ปฏิทินวันหยุดของ {market.name} ไม่มีปี {year} วันหยุดปีนี้จะถูกดึงราคาเหมือนวันทำการ "
+                       f"(เพิ่มใน {self.holidays_file})")
+
+    def timezone(self, exchange):
+        market = self.markets.get(exchange)
+        return market.tz if market is not None else None
+
+    def is_live(self, exchange, now=None):
+        market = self.markets.get(exchange)
+        if market is None:
+            return True
+        now = self._now(now)
+        self._check_calendar(market, now)
+        return market.is_open(now) or market.is_open(now - self.grace)
+
+    def settled_close(self, exchange, now=None):
+        """epoch ของ close ล่าสุดที่พ้น grace แล้ว (None ถ้าไม่รู้จักตลาด)"""
+        market = self.markets.get(exchange)
+        if market is None:
+            return None
+        now = self._now(now)
+        self._check_calendar(market, now)
+        close = market.last_close(now - self.grace)
+        return close.timestamp() if close is not None else None
+
+    def needs_refresh(self, exchange, fetched_at, now=None):
+        """ตลาด live -> ดึงได้เสมอ, ตลาดปิด -> ดึงครั้งเดียวหลัง close (ถ้า fetched_at ยังก่อน close)"""
+        now = self._now(now)
+        if self.is_live(exchange, now):
+            return True
+        close = self.settled_close(exchange, now)
+        return close is None or (fetched_at or 0) < close
+
+    def status(self, now=None):
+        now = self._now(now)
+        result = {}
+        for name, market in self.markets.items():
+            last_close = market.last_close(now)
+            next_open = market.next_open(now)
+            result[name] = {
+                "timezone": str(market.tz),
+                "open": market.is_open(now),
+                "live": self.is_live(name, now),
+                "local_time": now.astimezone(market.tz).isoformat(timespec="seconds"),
+                "last_close": last_close.isoformat() if last_close else None,
+                "next_open": next_open.isoformat() if next_open else None,
+                "calendar_years": sorted(market.calendar_years),
+            }
+        return result
+
+
+market_hours = MarketHours()
@@ -0,0 +1,148 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from core.executors import UpstreamBusy
+
+logger = logging.getLogger(__name__)
+
+QUOTE_REFRESH_SECONDS = float(os.getenv("QUOTE_REFRESH_SECONDS", "15"))
+# สุ่มรอบ poll ±10% ให้ poller ที่เริ่มพร้อมกันค่อยๆ กระจายออก ไม่ยิง upstream เป็นก้อนทุก refresh_seconds
+QUOTE_REFRESH_JITTER = 0.1
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class Subscription:
+    def __init__(self, queue_size=SUBSCRIBER_QUEUE_SIZE):
+        self.symbols = set()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    def push(self, symbol, quote):
+        # คิวเต็ม (client อ่านไม่ทัน) -> ทิ้งราคาเก่าที่สุดแล้วใส่ราคาใหม่แทน
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait(quote)
+
+
+class CoalescingSubscription:
+    """
+    เก็บเฉพาะราคาล่าสุดต่อ symbol ที่ยังไม่ได้ส่ง (ใช้กับ WebSocket)
+    client ช้าหรือตั้ง throttle ไว้ ราคาที่มาระหว่างรอจะทับกันเอง ไม่มีคิวสะสม
+    """
+
+    def __init__(self):
+        self.symbols = set()
+        self.pending = {}
+        self.ready = asyncio.Event()
+
+    def push(self, symbol, quote):
+        self.pending[symbol] = quote
+        self.ready.set()
+
+    def drain(self):
+        pending, self.pending = self.pending, {}
+        self.ready.clear()
+        return pending
+
+
+class QuoteHub:
+    """
+    Pub/sub ราคาหุ้นระดับ process
+    หนึ่ง symbol มี poller เดียวไม่ว่าจะมีกี่ connection ดูอยู่
+    poller ถูกยกเลิกเมื่อ subscriber คนสุดท้ายของ symbol นั้นออกไป
+    ถ้ามี journal ทุกราคาที่เปลี่ยนจะถูกต่อท้าย journal (series ระหว่างวันละเอียดตามรอบ poll)
+    ถ้ามี market_hours poller จะหยุดดึงเมื่อตลาดปิดและได้ราคาหลัง close แล้ว จนกว่าตลาดจะเปิดใหม่
+    poller ทุกตัวรัน fetch บน executor (BoundedExecutor) ของตัวเอง ถ้าคิวเต็มจะข้ามรอบนั้นไป
+    """
+
+    def __init__(self, fetch, executor, refresh_seconds=QUOTE_REFRESH_SECONDS, market_hours=None, journal=None):
+        self.fetch = fetch  # fetch(row) -> dict แบบ fetch_one_stock
+        self.executor = executor
+        self.refresh_seconds = refresh_seconds
+        self.market_hours = market_hours
+        self.journal = journal
+        self.subscribers = {}  # full symbol -> set(Subscription)
+        self.pollers = {}      # full symbol -> asyncio.Task
+        self.last_quotes = {}  # full symbol -> quote ล่าสุด
+
+    def subscriber_count(self):
+        return sum(len(subs) for subs in self.subscribers.values())
+
+    def subscriber_counts(self):
+        """full symbol -> จำนวน subscriber (เรียกจาก thread อื่นได้)"""
+        return {symbol: len(subs) for symbol, subs in list(self.subscribers.items())}
+
+    def subscribe(self, rows):
+        sub = Subscription()
+        self.add(sub, rows)
+        return sub
+
+    def unsubscribe(self, sub):
+        self.remove(sub, list(sub.symbols))
+
+    def add(self, sub, rows):
+        """เพิ่ม symbol ให้ subscription ที่มีอยู่ (ส่งราคาล่าสุดที่มีให้ทันที)"""
+        for row in rows:
+            symbol = row['symbol']
+            if symbol in sub.symbols:
+                continue
+            sub.symbols.add(symbol)
+            self.subscribers.setdefault(symbol, set()).add(sub)
+
+            if symbol in self.last_quotes:
+                sub.push(symbol, self.last_quotes[symbol])
+
+            if symbol not in self.pollers:
+                self.pollers[symbol] = asyncio.create_task(self._poll(row))
+                logger.debug(f"เริ่ม poller {symbol}")
+
+    def remove(self, sub, symbols):
+        for symbol in symbols:
+            if symbol not in sub.symbols:
+                continue
+            sub.symbols.discard(symbol)
+            subs = self.subscribers.get(symbol)
+            if subs is None:
+                continue
+            subs.discard(sub)
+            if not subs:
+                del self.subscribers[symbol]
+                task = self.pollers.pop(symbol, None)
+                if task is not None:
+                    task.cancel()
+                self.last_quotes.pop(symbol, None)
+                logger.debug(f"หยุด poller {symbol}")
+
+    def publish(self, symbol, quote):
+        previous = self.last_quotes.get(symbol)
+        self.last_quotes[symbol] = quote
+        if previous == quote:
+            return
+        if self.journal is not None:
+            # เขียนบน writer thread ของ journal ไม่ทำ file I/O บน event loop
+            self.journal.submit([quote])
+        for sub in list(self.subscribers.get(symbol, ())):
+            sub.push(symbol, quote)
+
+    async def _poll(self, row):
+        symbol = row['symbol']
+        exchange = symbol.split(':', 1)[0]
+        fetched_at = 0
+        while True:
+            if self.market_hours is None or self.market_hours.needs_refresh(exchange, fetched_at):
+                try:
+                    quote = await self.executor.run(self.fetch, row)
+                    self.publish(symbol, quote)
+                    if not quote.get("error"):
+                        fetched_at = time.time()
+                except asyncio.CancelledError:
+                    raise
+                except UpstreamBusy:
+                    logger.debug(f"poller {symbol} ข้ามรอบนี้ (pool เต็ม)")
+                except Exception as e:
+                    logger.warning(f"⚠️ poller {symbol} ผิดพลาด: {e}")
+            await asyncio.sleep(self.refresh_seconds * random.uniform(1 - QUOTE_REFRESH_JITTER, 1 + QUOTE_REFRESH_JITTER))
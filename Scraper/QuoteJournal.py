@@ -0,0 +1,324 @@
+import os
+import re
+import time
+import queue
+import calendar
+import threading
+import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: dev server process เดียว ไม่ต้อง lock ข้าม process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_FOLDER = os.getenv("QUOTE_JOURNAL_FOLDER", os.path.join("storage", "journal"))
+JOURNAL_RETENTION_DAYS = int(os.getenv("QUOTE_JOURNAL_RETENTION_DAYS", "30"))
+# จำนวนวันที่เก็บ index ไว้ใน memory (วันเก่ากว่านี้สร้าง index ใหม่ตอนถูกอ่าน)
+JOURNAL_CACHED_DAYS = 8
+# จำนวนชุดที่รอ writer thread ได้ (เกินนี้ทิ้งชุดใหม่ ดีกว่าให้ memory โตเมื่อ disk ช้า)
+JOURNAL_QUEUE_SIZE = 10_000
+
+# record ละ 16 byte: symbol id, epoch วินาที, ราคา, % เปลี่ยนแปลง
+# เป็น dtype spec ที่ numpy รับได้ตรงๆ (numpy import ตอนอ่าน/เขียนครั้งแรก ไม่ให้ถ่วงเวลา start server)
+RECORD = [("id", "<u4"), ("ts", "<u4"), ("price", "<f4"), ("change", "<f4")]
+RECORD_SIZE = 16
+DAY_FILE_RE = re.compile(r"^quotes-(\d{8})\.bin$")
+
+
+@contextmanager
+def file_lock(f):
+    """lock ไฟล์ข้าม process (uvicorn หลาย worker เขียน journal ชุดเดียวกัน)"""
+    if fcntl is None:
+        yield
+        return
+    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def day_of(ts):
+    """ไฟล์หมุนทุกวันตาม UTC (session ของ SET/SSE/NYSE อยู่ในวัน UTC เดียวกันทั้งหมด)"""
+    return time.strftime("%Y%m%d", time.gmtime(ts))
+
+
+class DayIndex:
+    """
+    per-symbol offset index ของไฟล์วันเดียว: symbol id -> ตำแหน่ง record เรียงตามเวลา
+    ไฟล์ของวันนี้ยังโตอยู่ ตอนอ่านจะ index ต่อเฉพาะ record ที่เพิ่มมาใหม่
+    หลาย process เขียนไฟล์เดียวกันได้ ลำดับในไฟล์จึงไม่รับประกันว่าเรียงตามเวลา ต้องเรียงตาม ts ตอน index
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self.positions = {}
+        self._lock = threading.Lock()
+
+    def _mapped(self, count):
+        import numpy as np
+        return np.memmap(self.path, dtype=RECORD, mode="r", shape=(count,))
+
+    def refresh(self):
+        import numpy as np
+        try:
+            # นับเฉพาะ record ที่เขียนครบแล้ว
+            count = os.path.getsize(self.path) // RECORD_SIZE
+        except OSError:
+            return
+        with self._lock:
+            if count <= self.count:
+                return
+            mapped = self._mapped(count)
+            ts = np.asarray(mapped["ts"])
+            ids = np.asarray(mapped["id"][self.count:count])
+            order = np.argsort(ids, kind="stable")
+            unique_ids, starts = np.unique(ids[order], return_index=True)
+            bounds = np.append(starts, len(order))
+            for k, symbol_id in enumerate(unique_ids.tolist()):
+                new = order[bounds[k]:bounds[k + 1]] + self.count
+                new = new[np.argsort(ts[new], kind="stable")]
+                old = self.positions.get(symbol_id)
+                if old is None:
+                    self.positions[symbol_id] = new
+                elif ts[new[0]] >= ts[old[-1]]:
+                    self.positions[symbol_id] = np.concatenate([old, new])
+                else:
+                    merged = np.concatenate([old, new])
+                    self.positions[symbol_id] = merged[np.argsort(ts[merged], kind="stable")]
+            self.count = count
+
+    def records(self, symbol_id):
+        import numpy as np
+        self.refresh()
+        positions = self.positions.get(symbol_id)
+        if positions is None or not self.count:
+            return np.empty(0, dtype=RECORD)
+        return self._mapped(self.count)[positions]
+
+
+class QuoteJournal:
+    """
+    journal แบบ append-only ของราคาทุกครั้งที่ refresh (snapshot refresher + poller ของ SSE/WebSocket)
+    - storage/journal/quotes-YYYYMMDD.bin: record ขนาดคงที่ (RECORD) หมุนไฟล์ทุกวัน เก็บ JOURNAL_RETENTION_DAYS วัน
+    - storage/journal/symbols.txt: symbol id ของ journal (บรรทัดที่ n = id n) เพิ่มต่อท้ายอย่างเดียว id จึงไม่เปลี่ยนข้ามวัน
+      ให้ id ใหม่ภายใต้ flock ของไฟล์นี้หลังอ่านบรรทัดที่ process อื่นเพิ่มไว้ id จึงตรงกันทุก worker
+    - ราคาที่เท่ากับ record ล่าสุดของ symbol นั้นในวันเดียวกันไม่ถูกเขียนซ้ำ
+    อ่านผ่าน np.memmap + DayIndex ไม่ต้องโหลดทั้งไฟล์และไม่เรียก upstream
+    ผู้เรียกบน event loop ใช้ submit (เขียนบน writer thread) แทน append ที่ block ระหว่างเขียน/หมุนไฟล์
+    """
+
+    def __init__(self, folder=JOURNAL_FOLDER, retention_days=JOURNAL_RETENTION_DAYS):
+        self.folder = folder
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._symbols = None
+        self._ids = {}
+        self._file = None
+        self._day = None
+        self._last = {}
+        self._indexes = OrderedDict()
+        self._queue = queue.Queue(maxsize=JOURNAL_QUEUE_SIZE)
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self.appended = 0
+        self.dropped = 0
+
+    @property
+    def symbols_path(self):
+        return os.path.join(self.folder, "symbols.txt")
+
+    def day_path(self, day):
+        return os.path.join(self.folder, f"quotes-{day}.bin")
+
+    def _read_symbols(self, f):
+        f.seek(0)
+        self._symbols = [line.strip() for line in f if line.strip()]
+        self._ids = {symbol: i for i, symbol in enumerate(self._symbols)}
+
+    def _reload_symbols(self):
+        """อ่าน symbols.txt ใหม่ทั้งไฟล์ (process อื่นอาจเพิ่ม symbol ไว้)"""
+        if not os.path.exists(self.symbols_path):
+            self._symbols, self._ids = [], {}
+            return
+        with open(self.symbols_path, "r", encoding="utf-8") as f:
+            self._read_symbols(f)
+
+    def _load_symbols(self):
+        if self._symbols is None:
+            self._reload_symbols()
+
+    def symbol_id(self, full_symbol):
+        key = full_symbol.upper()
+        with self._lock:
+            self._load_symbols()
+            if key not in self._ids:
+                self._reload_symbols()
+            return self._ids.get(key)
+
+    def _assign_id(self, full_symbol):
+        key = full_symbol.upper()
+        symbol_id = self._ids.get(key)
+        if symbol_id is None:
+            os.makedirs(self.folder, exist_ok=True)
+            with open(self.symbols_path, "a+", encoding="utf-8") as f, file_lock(f):
+                self._read_symbols(f)
+                symbol_id = self._ids.get(key)
+                if symbol_id is None:
+                    f.write(key + "\n")
+                    symbol_id = self._ids[key] = len(self._symbols)
+                    self._symbols.append(key)
+        return symbol_id
+
+    def _rotate(self, day):
+        if self._file is not None:
+            self._file.close()
+        os.makedirs(self.folder, exist_ok=True)
+        self._file = open(self.day_path(day), "ab")
+        self._day = day
+        # record แรกของแต่ละวันเขียนเสมอ series ของวันจะได้มีจุดเริ่ม
+        self._last = {}
+        self._cleanup(day)
+
+    def _cleanup(self, today):
+        cutoff = day_of(calendar.timegm(time.strptime(today, "%Y%m%d")) - self.retention_days * 86400)
+        for day in self.days():
+            if day < cutoff:
+                try:
+                    os.remove(self.day_path(day))
+                    self._indexes.pop(day, None)
+                    logger.info(f"🗑️ ลบ journal วันที่ {day}")
+                except OSError as e:
+                    logger.warning(f"⚠️ ลบ journal {day} ไม่ได้: {e}")
+
+    def append(self, quotes, now=None):
+        """เขียน quote (dict แบบ fetch_one_stock) ที่ไม่ error และราคาเปลี่ยน คืนจำนวน record ที่เขียน"""
+        import numpy as np
+        now = int(now or time.time())
+        day = day_of(now)
+        with self._lock:
+            self._load_symbols()
+            if day != self._day:
+                self._rotate(day)
+            rows = []
+            for quote in quotes:
+                price = quote.get("stockPrice")
+                if quote.get("error") or price is None:
+                    continue
+                symbol_id = self._assign_id(f"{quote.get('stockMarket')}:{quote.get('stockSymbol')}")
+                values = (price, quote.get("changePct") or 0.0)
+                if self._last.get(symbol_id) == values:
+                    continue
+                self._last[symbol_id] = values
+                rows.append((symbol_id, now, *values))
+            if not rows:
+                return 0
+            # เขียนทั้งก้อนใน write เดียว ผู้อ่านนับเฉพาะ record ที่ครบ 16 byte
+            with file_lock(self._file):
+                self._file.write(np.array(rows, dtype=RECORD).tobytes())
+                self._file.flush()
+            self.appended += len(rows)
+        return len(rows)
+
+    def submit(self, quotes, now=None):
+        """ส่งให้ writer thread เขียน (ไม่ block) เวลาของ record คือเวลาที่ submit"""
+        if self._writer is None:
+            self._start_writer()
+        try:
+            self._queue.put_nowait((quotes, int(now or time.time())))
+        except queue.Full:
+            self.dropped += 1
+
+    def _start_writer(self):
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="quote-journal", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            quotes, now = self._queue.get()
+            try:
+                self.append(quotes, now)
+            except Exception as e:
+                logger.warning(f"⚠️ เขียน journal ไม่ได้: {e}")
+
+    def days(self):
+        if not os.path.isdir(self.folder):
+            return []
+        return sorted(m.group(1) for m in map(DAY_FILE_RE.match, os.listdir(self.folder)) if m)
+
+    def _index(self, day):
+        with self._lock:
+            index = self._indexes.get(day)
+            if index is None:
+                index = self._indexes[day] = DayIndex(self.day_path(day))
+                while len(self._indexes) > JOURNAL_CACHED_DAYS:
+                    self._indexes.popitem(last=False)
+            else:
+                self._indexes.move_to_end(day)
+            return index
+
+    def records(self, full_symbol, start=None, end=None):
+        """record ของ symbol ในช่วง [start, end] (epoch) ไม่ระบุช่วง = วันล่าสุดที่มีข้อมูลของ symbol นี้"""
+        import numpy as np
+        symbol_id = self.symbol_id(full_symbol)
+        if symbol_id is None:
+            return np.empty(0, dtype=RECORD)
+        days = self.days()
+        if start is None and end is None:
+            for day in reversed(days):
+                records = self._index(day).records(symbol_id)
+                if len(records):
+                    return records
+            return np.empty(0, dtype=RECORD)
+
+        first = day_of(start) if start is not None else days[0] if days else ""
+        last = day_of(end) if end is not None else days[-1] if days else ""
+        chunks = [self._index(day).records(symbol_id) for day in days if first <= day <= last]
+        records = np.concatenate(chunks) if chunks else np.empty(0, dtype=RECORD)
+        mask = np.ones(len(records), dtype=bool)
+        if start is not None:
+            mask &= records["ts"] >= start
+        if end is not None:
+            mask &= records["ts"] <= end
+        return records[mask]
+
+    def quote_at(self, full_symbol, ts, lookback_days=7):
+        """ราคาล่าสุด ณ เวลา ts (record สุดท้ายที่ไม่หลัง ts)"""
+        records = self.records(full_symbol, ts - lookback_days * 86400, ts)
+        return records[-1] if len(records) else None
+
+    def sparkline(self, full_symbol, points=50):
+        """series ของวันล่าสุดย่อเหลือไม่เกิน points จุด (ราคาสุดท้ายของแต่ละช่วงเวลาเท่าๆ กัน)"""
+        import numpy as np
+        records = self.records(full_symbol)
+        if len(records) > points:
+            ts = records["ts"]
+            edges = np.linspace(int(ts[0]), int(ts[-1]), points)
+            picks = np.unique(np.searchsorted(ts, edges, side="right") - 1)
+            records = records[picks]
+        return records
+
+    def stats(self):
+        return {"folder": self.folder, "days": self.days(), "symbols": len(self._symbols or ()),
+                "appended": self.appended, "queued": self._queue.qsize(), "dropped": self.dropped}
+
+
+def to_series(full_symbol, records):
+    """แปลง record เป็น column แบบ format=columns ของ /getHistData"""
+    import numpy as np
+    return {
+        "symbol": full_symbol,
+        "timestamp": records["ts"].astype(np.int64).tolist(),
+        "stockPrice": np.round(records["price"].astype(np.float64), 4).tolist(),
+        "changePct": np.round(records["change"].astype(np.float64), 4).tolist(),
+    }
+
+
+quote_journal = QuoteJournal()
@@ -0,0 +1,159 @@
+import os
+import math
+import time
+import heapq
+import threading
+import logging
+from Scraper.SymbolUniverse import symbol_universe
+
+logger = logging.getLogger(__name__)
+
+DEMAND_HALF_LIFE_MINUTES = float(os.getenv("DEMAND_HALF_LIFE_MINUTES", "30"))
+# น้ำหนักของแต่ละแหล่ง demand
+SUBSCRIBER_WEIGHT = float(os.getenv("DEMAND_SUBSCRIBER_WEIGHT", "5"))
+MARKET_WEIGHT = float(os.getenv("DEMAND_MARKET_WEIGHT", "0.05"))
+# symbol ที่ยังไม่เคยดึงถือว่าเก่าเท่านี้ (วินาที)
+NEVER_FETCHED_AGE = 24 * 3600
+# ดึงหลังปิดตลาดไม่สำเร็จ รออย่างน้อยเท่านี้ก่อนลองใหม่
+CLOSED_RETRY_SECONDS = float(os.getenv("CLOSED_RETRY_SECONDS", "900"))
+
+
+class DemandTracker:
+    """
+    นับความสนใจต่อ symbol (และต่อตลาด) แบบ decay ตามเวลา (half-life)
+    - symbol: request ที่เจาะจงหุ้นตัวเดียว (/getHistData/{symbol}, /signals/{symbol}, /CompanyData/{symbol}) และ SSE
+    - market: /StockData?stockMarket=... (ทั้งตลาดได้ demand เท่ากันแต่น้อยกว่า)
+    คะแนนเก็บเป็น (ค่า, เวลาที่อัปเดต) decay ตอนอ่าน/เขียน ไม่ต้องมี job คอยลด
+    """
+
+    def __init__(self, half_life_minutes=DEMAND_HALF_LIFE_MINUTES):
+        self.rate = math.log(2) / (half_life_minutes * 60)
+        self._symbols = {}
+        self._markets = {}
+        self._lock = threading.Lock()
+
+    def _add(self, table, key, weight, now):
+        value, at = table.get(key, (0.0, now))
+        table[key] = (value * math.exp(-self.rate * (now - at)) + weight, now)
+
+    def _get(self, table, key, now):
+        value, at = table.get(key, (0.0, now))
+        return value * math.exp(-self.rate * (now - at))
+
+    def hit(self, full_symbols, weight=1.0):
+        now = time.time()
+        with self._lock:
+            for symbol in full_symbols:
+                self._add(self._symbols, symbol.upper(), weight, now)
+
+    def watch(self, symbols, weight=1.0):
+        """เหมือน hit แต่รับ symbol ที่ผู้ใช้พิมพ์มา ("PTT", "SET:PTT") แล้ว resolve ให้เอง"""
+        full_symbols = []
+        for symbol in symbols:
+            row = symbol_universe.resolve(symbol)
+            if row is not None:
+                full_symbols.append(row["symbol"])
+        self.hit(full_symbols, weight)
+
+    def hit_market(self, markets, weight=1.0):
+        now = time.time()
+        with self._lock:
+            for market in markets:
+                self._add(self._markets, market.strip().upper(), weight, now)
+
+    def scores(self, now=None):
+        """(symbol -> คะแนน, market -> คะแนน) ณ now"""
+        now = now or time.time()
+        with self._lock:
+            symbols = {key: self._get(self._symbols, key, now) for key in self._symbols}
+            markets = {key: self._get(self._markets, key, now) for key in self._markets}
+            # ทิ้ง key ที่ decay จนไม่มีผลแล้ว dict จะได้ไม่โตไปเรื่อยๆ
+            for table, current in ((self._symbols, symbols), (self._markets, markets)):
+                for key in [k for k, v in current.items() if v < 0.01]:
+                    del table[key]
+                    del current[key]
+        return symbols, markets
+
+    def top(self, n=20):
+        symbols, markets = self.scores()
+        top_symbols = heapq.nlargest(n, symbols.items(), key=lambda item: item[1])
+        return {
+            "symbols": [{"symbol": s, "score": round(v, 3)} for s, v in top_symbols],
+            "markets": {m: round(v, 3) for m, v in markets.items()},
+        }
+
+
+class QuoteScheduler:
+    """
+    เลือกว่า shard ถัดไปของ snapshot refresher ควรดึงราคาตัวไหน แทนการวนทีละ shard ตามลำดับไฟล์
+    - ตลาดที่ปิดแล้วและดึงราคาหลัง close ไปแล้ว: ข้าม (ราคาไม่เปลี่ยนจนกว่าจะเปิดใหม่)
+    - ตลาดที่ปิดแต่ยังไม่มีราคาหลัง close: ดึงครั้งเดียว
+    - ตลาดที่เปิดอยู่: เรียงตาม (1 + demand) x อายุของราคา
+      ตัวที่คนดูเยอะได้ดึงบ่อยกว่า แต่ตัวที่ไม่มีใครดูก็ยังถูกดึงเมื่อเก่าพอ (ไม่อด)
+    """
+
+    def __init__(self, market_hours, demand, live_subscribers=None):
+        self.market_hours = market_hours
+        self.demand = demand
+        self.live_subscribers = live_subscribers  # live_subscribers() -> {full symbol: จำนวน SSE subscriber}
+        self.attempted_at = {}
+        self.last_plan = {}
+
+    def plan(self, symbols, size, fetched_at, now=None):
+        """
+        symbols: full symbol ทั้งหมด, fetched_at: full symbol -> epoch ที่ได้ราคาสำเร็จล่าสุด
+        คืน symbol ไม่เกิน size ตัว เรียงตามลำดับความสำคัญ
+        """
+        now = now or time.time()
+        symbol_scores, market_scores = self.demand.scores(now)
+        subscribers = self.live_subscribers() if self.live_subscribers is not None else {}
+
+        markets = {}
+        candidates = []
+        skipped = 0
+        for position, symbol in enumerate(symbols):
+            exchange = symbol.split(":", 1)[0]
+            state = markets.get(exchange)
+            if state is None:
+                state = markets[exchange] = (self.market_hours.is_live(exchange, now),
+                                             self.market_hours.settled_close(exchange, now))
+            live, close = state
+            attempted = self.attempted_at.get(symbol)
+
+            if not live and close is not None:
+                if fetched_at.get(symbol, 0) >= close:
+                    skipped += 1
+                    continue
+                if attempted is not None and attempted >= close and now - attempted < CLOSED_RETRY_SECONDS:
+                    skipped += 1
+                    continue
+
+            key = symbol.upper()
+            score = (symbol_scores.get(key, 0.0) + SUBSCRIBER_WEIGHT * subscribers.get(symbol, 0)
+                     + MARKET_WEIGHT * market_scores.get(exchange, 0.0))
+            # หลัง restart ยังไม่มี attempted_at ใช้เวลาของราคาใน snapshot แทน
+            last = attempted if attempted is not None else fetched_at.get(symbol)
+            age = now - last if last else NEVER_FETCHED_AGE
+            # คะแนนเท่ากันเรียงตามลำดับใน StockData.csv
+            candidates.append(((1 + score) * age, -position, symbol))
+
+        batch = [symbol for _, _, symbol in heapq.nlargest(size, candidates)]
+        self.last_plan = {
+            "at": now,
+            "live_markets": sorted(m for m, (live, _) in markets.items() if live),
+            "candidates": len(candidates),
+            "skipped_closed": skipped,
+            "planned": len(batch),
+        }
+        return batch
+
+    def record(self, symbols, now=None):
+        now = now or time.time()
+        for symbol in symbols:
+            self.attempted_at[symbol] = now
+
+    def stats(self):
+        return {"last_plan": self.last_plan, "demand": self.demand.top(10)}
+
+
+demand_tracker = DemandTracker()
@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+from dateutil.tz import tzlocal
+from tvDatafeed import Interval
+from Scraper.MarketHours import MARKET_SESSIONS
+
+# interval ที่หยาบกว่า base series สร้างได้จากการ resample (pandas offset alias)
+RESAMPLE_RULES = {
+    Interval.in_1_hour: "1h",
+    Interval.in_2_hour: "2h",
+    Interval.in_3_hour: "3h",
+    Interval.in_4_hour: "4h",
+    Interval.in_daily: "1D",
+    Interval.in_weekly: "W-MON",
+    Interval.in_monthly: "MS",
+}
+
+# interval ที่ tradingview จัดแท่งตาม session ของตลาดเอง (แท่งรายวันรวม closing auction ที่ไม่อยู่ในแท่ง 1h)
+# ดึงตรงจาก upstream เสมอ ไม่สร้างจาก base series
+NATIVE_INTERVALS = {Interval.in_4_hour, Interval.in_daily, Interval.in_weekly, Interval.in_monthly}
+
+OHLCV_AGG = {
+    "open": "first",
+    "high": "max",
+    "low": "min",
+    "close": "last",
+    "volume": "sum",
+}
+
+
+def is_coarser(interval, base_interval):
+    """interval หยาบกว่า base_interval และสร้างจากการ resample ได้หรือไม่"""
+    order = list(RESAMPLE_RULES)
+    if interval in NATIVE_INTERVALS:
+        return False
+    if interval not in RESAMPLE_RULES or base_interval not in RESAMPLE_RULES:
+        return False
+    return order.index(interval) > order.index(base_interval)
+
+
+def base_bars_needed(interval, base_interval, bars_count):
+    """จำนวนแท่ง base ที่พอสำหรับ bars_count แท่งของ interval (ช่วงพักเที่ยง/ปิดตลาดทำให้ใช้น้อยกว่านี้จริง)"""
+    ratio = pd.Timedelta(RESAMPLE_RULES[interval]) / pd.Timedelta(RESAMPLE_RULES[base_interval])
+    return int(bars_count * ratio)
+
+
+def session_anchor(exchange):
+    """(timezone, เวลาเปิด session แรกของวัน) ของ exchange ไม่รู้จักคืน None"""
+    market = MARKET_SESSIONS.get(exchange)
+    if market is None:
+        return None
+    timezone, sessions = market[0], market[1]
+    return timezone, pd.Timedelta(f"{sessions[0][0]}:00")
+
+
+def _convert_naive(index, from_tz, to_tz, ambiguous="NaT"):
+    return index.tz_localize(from_tz, ambiguous=ambiguous, nonexistent="shift_forward").tz_convert(to_tz).tz_localize(None)
+
+
+def epoch_seconds(index):
+    """
+    index naive เวลาท้องถิ่นของ server (แบบที่ tvDatafeed สร้าง) -> epoch วินาที UTC
+    ชั่วโมงที่ซ้ำกันตอนออกจาก DST ถือเป็นเวลามาตรฐาน
+    """
+    utc = _convert_naive(index, tzlocal(), "UTC", ambiguous=np.zeros(len(index), dtype=bool))
+    return utc.asi8 // 10**9
+
+
+def resample_ohlcv(df, interval, exchange=None):
+    """
+    รวมแท่งเทียนละเอียดเป็น interval ที่หยาบกว่า (vectorized ทั้งก้อนด้วย pandas)
+    index ของ tvDatafeed เป็นเวลาท้องถิ่นของ server ถ้ารู้จัก exchange จะแบ่งช่วงตามเวลาท้องถิ่นของตลาด
+    โดยเริ่มนับจากเวลาเปิด session (เช่น SET 4h = 10:00, 14:00 / US 1D = 09:30 ถึง 09:30 วันถัดไป)
+    label ของแท่งคือเวลาเปิดของช่วงนั้นแปลงกลับเป็นเวลาท้องถิ่นของ server เหมือนแท่งที่ดึงตรง
+    """
+    rule = RESAMPLE_RULES[interval]
+    if df.empty:
+        return df
+    frame = df[list(OHLCV_AGG)]
+    anchor = session_anchor(exchange)
+    offset = None
+    if anchor is not None:
+        timezone, offset = anchor
+        server_tz = tzlocal()
+        frame = frame.set_axis(_convert_naive(frame.index, server_tz, timezone))
+        frame = frame[frame.index.notna()]
+
+    if rule.startswith("W") or rule == "MS":
+        out = frame.resample(rule, label="left", closed="left").agg(OHLCV_AGG)
+        if offset is not None:
+            out.index = out.index + offset
+    else:
+        out = frame.resample(rule, offset=offset).agg(OHLCV_AGG)
+    out = out.dropna(subset=["open"])
+
+    if anchor is not None:
+        out.index = _convert_naive(out.index, timezone, server_tz)
+    out.insert(0, "symbol", df["symbol"].iloc[0])
+    out.index.name = df.index.name
+    return out
+
+
+def to_timestamp(value, timezone=None):
+    """
+    รับ ISO date/datetime หรือ epoch วินาที คืน Timestamp แบบ naive UTC
+    ISO ที่ไม่มี offset ถือเป็นเวลาใน timezone (ถ้าระบุ ไม่งั้นถือเป็น UTC)
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)) or str(value).isdigit():
+        return pd.Timestamp(int(value), unit="s")
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None and timezone is not None:
+        ts = ts.tz_localize(timezone)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert(None)
+    return ts
+
+
+def to_server_time(ts):
+    """Timestamp naive UTC -> naive เวลาท้องถิ่นของ server (frame เดียวกับ index ของ tvDatafeed)"""
+    return ts.tz_localize("UTC").tz_convert(tzlocal()).tz_localize(None)
+
+
+def slice_range(df, start=None, end=None, timezone=None):
+    """
+    ตัดช่วงวันที่ด้วย binary search บน index (index ต้องเรียงจากเก่าไปใหม่)
+    start/end แปลงเป็นเวลาท้องถิ่นของ server ก่อนค้น ISO ที่ไม่มี offset ถือเป็นเวลาใน timezone
+    """
+    if start is None and end is None:
+        return df
+    index = df.index.asi8
+    if start is not None:
+        lo = np.searchsorted(index, to_server_time(to_timestamp(start, timezone)).value, side="left")
+    else:
+        lo = 0
+    if end is not None:
+        hi = np.searchsorted(index, to_server_time(to_timestamp(end, timezone)).value, side="right")
+    else:
+        hi = len(index)
+    return df.iloc[lo:hi]
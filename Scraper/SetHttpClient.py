@@ -0,0 +1,95 @@
+import threading
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from Scraper.Upstream import set_upstream
+from core.metrics import observe_upstream
+
+logger = logging.getLogger(__name__)
+
+SET_BASE_URL = "https://www.set.or.th"
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36"
+
+
+class SetCookiesExpired(Exception):
+    pass
+
+
+def set_api_urls(symbol):
+    return {
+        'highlight_data': f'{SET_BASE_URL}/api/set/stock/{symbol}/highlight-data?lang=th',
+        'profile_data': f'{SET_BASE_URL}/api/set/company/{symbol}/profile?lang=th',
+        'board_of_director': f'{SET_BASE_URL}/api/set/company/{symbol}/board-of-director?lang=th',
+    }
+
+
+class SetHttpClient:
+    """
+    เรียก JSON API ของ set.or.th ตรงๆ ผ่าน requests.Session แบบ keep-alive
+    ใช้ cookie ที่เก็บมาจาก browser (ผ่าน load_cookies_from_driver) ครั้งเดียวแล้วใช้ซ้ำ
+    ยิงทั้ง 3 endpoint พร้อมกัน
+    """
+
+    def __init__(self, pool_size=16, timeout=10):
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "User-Agent": DEFAULT_USER_AGENT,
+            "Accept": "application/json, text/plain, */*",
+            "Referer": f"{SET_BASE_URL}/th/home",
+        })
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="set-http")
+        self._lock = threading.Lock()
+        self.has_cookies = False
+
+    def load_cookies_from_driver(self, driver):
+        cookies = driver.get_cookies()
+        user_agent = driver.execute_script("return navigator.userAgent")
+        with self._lock:
+            self.session.cookies.clear()
+            for cookie in cookies:
+                self.session.cookies.set(cookie['name'], cookie['value'],
+                                         domain=cookie.get('domain'), path=cookie.get('path', '/'))
+            if user_agent:
+                self.session.headers["User-Agent"] = user_agent.replace("HeadlessChrome", "Chrome")
+            self.has_cookies = bool(cookies)
+        logger.info(f"🍪 เก็บ cookie จาก browser {len(cookies)} ตัว")
+
+    def invalidate(self):
+        with self._lock:
+            self.has_cookies = False
+
+    def _get_json(self, url):
+        # cookie หมดอายุไม่ใช่ความผิดของ upstream ไม่นับเข้า circuit breaker
+        return set_upstream.call(self._request_json, url, neutral=(SetCookiesExpired,))
+
+    def _request_json(self, url):
+        with observe_upstream("set", "requests_get"):
+            response = self.session.get(url, timeout=self.timeout)
+        if response.status_code in (401, 403):
+            raise SetCookiesExpired(f"HTTP {response.status_code} for {url}")
+        response.raise_for_status()
+        try:
+            return response.json()
+        except ValueError:
+            # ได้ HTML (หน้า challenge) กลับมาแทน JSON แปลว่า cookie หมดอายุ
+            raise SetCookiesExpired(f"Non-JSON response for {url}")
+
+    def fetch_company(self, symbol):
+        if not self.has_cookies:
+            raise SetCookiesExpired("No SET cookies harvested yet")
+
+        futures = {key: self.executor.submit(self._get_json, url) for key, url in set_api_urls(symbol).items()}
+        try:
+            data = {key: future.result() for key, future in futures.items()}
+        except SetCookiesExpired:
+            self.invalidate()
+            raise
+
+        return {'symbol': symbol, **data}
+
+
+set_http = SetHttpClient()
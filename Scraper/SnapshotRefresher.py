@@ -0,0 +1,130 @@
+import os
+import json
+import time
+import threading
+import logging
+from Scraper.SymbolUniverse import symbol_universe
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_SHARD_SIZE = int(os.getenv("SNAPSHOT_SHARD_SIZE", "250"))
+SNAPSHOT_REFRESH_MINUTES = float(os.getenv("SNAPSHOT_REFRESH_MINUTES", "5"))
+
+
+def snapshot_key(quote):
+    return f"{quote.get('stockMarket')}:{quote.get('stockSymbol')}"
+
+
+def write_json_atomic(path, data):
+    # เขียนลงไฟล์ชั่วคราวก่อนแล้วค่อย rename ทับ API จะไม่มีวันเห็นไฟล์ที่เขียนไม่เสร็จ
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class SnapshotRefresher:
+    """
+    รีเฟรชราคาหุ้นใน storage/StockData.json ทีละ shard
+    แทนการดึงทั้ง ~10k ตัวพร้อมกันทุก 4 ชั่วโมง
+    ผลลัพธ์ถูก merge ลง snapshot ใน memory (พร้อม updatedAt) แล้วเขียนไฟล์แบบ atomic
+    ถ้ามี journal (QuoteJournal) ผลทุก shard จะถูกต่อท้าย journal ด้วย (snapshot เก็บแค่ราคาล่าสุด)
+    ถ้ามี scheduler (QuoteScheduler) จะให้ scheduler เลือก shard ตามเวลาเปิดตลาดและ demand
+    ไม่งั้นวนตามลำดับใน StockData.csv
+    """
+
+    def __init__(self, storage_folder, fetch, filename="StockData.json", shard_size=SNAPSHOT_SHARD_SIZE, on_write=None,
+                 scheduler=None, journal=None):
+        self.path = os.path.join(storage_folder, filename)
+        self.fetch = fetch  # fetch(symbols) -> (result, failed_symbols) แบบ get_cron_stock_price
+        self.on_write = on_write  # เรียกหลังเขียนไฟล์เสร็จ เช่นให้ cache ของ /StockData สร้าง body ใหม่
+        self.shard_size = shard_size
+        self.scheduler = scheduler
+        self.journal = journal
+        self.cursor = 0
+        self.snapshot = {}
+        self.updated_at = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.snapshot = {snapshot_key(q): q for q in data}
+            self.updated_at = os.path.getmtime(self.path)
+            logger.info(f"📂 โหลด snapshot เดิม {len(self.snapshot)} ตัวจาก {self.path}")
+        except Exception as e:
+            logger.warning(f"⚠️ โหลด snapshot เดิมไม่ได้: {e}")
+
+    def next_shard(self):
+        symbols = symbol_universe.symbols()
+        if not symbols:
+            return []
+        if self.scheduler is not None:
+            fetched_at = {key: q.get("updatedAt", 0) for key, q in self.snapshot.items() if not q.get("error")}
+            return self.scheduler.plan(symbols, self.shard_size, fetched_at)
+        if self.cursor >= len(symbols):
+            self.cursor = 0
+        shard = symbols[self.cursor:self.cursor + self.shard_size]
+        self.cursor += len(shard)
+        return shard
+
+    def merge(self, results):
+        updated = 0
+        now = int(time.time())
+        for quote in results:
+            key = snapshot_key(quote)
+            previous = self.snapshot.get(key)
+            # ไม่เอาผลที่ error ไปทับราคาที่ดีอยู่แล้ว
+            if quote.get("error") and previous is not None and not previous.get("error"):
+                continue
+            if not quote.get("error"):
+                quote["updatedAt"] = now
+            self.snapshot[key] = quote
+            updated += 1
+        return updated
+
+    def write(self):
+        order = {symbol: i for i, symbol in enumerate(symbol_universe.symbols())}
+        data = sorted(self.snapshot.values(), key=lambda q: order.get(snapshot_key(q), len(order)))
+        write_json_atomic(self.path, data)
+        self.updated_at = time.time()
+        if self.on_write is not None:
+            self.on_write()
+
+    def refresh_next_shard(self):
+        # กันไม่ให้ job ซ้อนกันถ้ารอบก่อนยังไม่เสร็จ
+        if not self._lock.acquire(blocking=False):
+            logger.info("⏭️ รอบก่อนยังไม่เสร็จ ข้าม shard นี้")
+            return
+        try:
+            shard = self.next_shard()
+            if not shard:
+                return
+
+            start = time.monotonic()
+            result, failed_symbols = self.fetch(shard)
+            if self.scheduler is not None:
+                self.scheduler.record(shard)
+            if self.journal is not None:
+                # ผ่านคิวเดียวกับ QuoteHub record ในไฟล์จะเรียงตามเวลาที่ส่งเข้ามา
+                self.journal.submit(result)
+            updated = self.merge(result)
+
+            if updated:
+                self.write()
+
+            label = f"{len(shard)} ตัว" if self.scheduler is not None else f"{self.cursor - len(shard)}-{self.cursor}"
+            logger.info(
+                f"📊 shard {label}: อัปเดต {updated} ตัว | "
+                f"ล้มเหลว {len(failed_symbols)} ตัว | {time.monotonic() - start:.1f}s"
+            )
+        except Exception as e:
+            logger.error(f"Error in stock data routine: {e}")
+        finally:
+            self._lock.release()
@@ -1,13 +1,21 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from bs4 import BeautifulSoup
 import json
 import time
 import re
+import logging
 import requests
+from Scraper.DriverPool import driver_pool, DriverPoolTimeout
+from Scraper.SetHttpClient import set_http, SetCookiesExpired
+from core.metrics import observe_upstream, upstream_retries
+from core.executors import UpstreamUnavailable
+import os
+
+logger = logging.getLogger(__name__)
+
+# "http" = เรียก JSON API ตรง (fallback เป็น browser), "browser" = ใช้ Chrome อย่างเดียว
+SET_FETCH_MODE = os.getenv("SET_FETCH_MODE", "http")
 
 def return_json_from_html(html_content):
+    from bs4 import BeautifulSoup  # import ตอนใช้ครั้งแรก ไม่ให้ถ่วงเวลา start server
     soup = BeautifulSoup(html_content, 'html.parser')
     pre_tag = soup.find('pre')
     if pre_tag:
@@ -57,39 +65,43 @@ def return_json_from_html(html_content):
 #     finally:
 #         driver.quit()
 
+def load_page(driver, url):
+    with observe_upstream("set", "selenium_page"):
+        driver.get(url)
+
 def is_data_invalid(data):
     return data is None or data == {} or data == []
 
-def scrape_stock_data(symbol, max_retries=3):
+def scrape_stock_data_browser(symbol, max_retries=3):
     for attempt in range(1, max_retries + 1):
-        chrome_options = Options()
-        chrome_options.add_argument("--headless=new")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--no-sandbox")
-
-        service = Service("chromedriver-win64/chromedriver.exe")
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-
         try:
-            driver.get(f'https://www.set.or.th/th/market/product/stock/quote/{symbol}/price')
-            # time.sleep(1)
-
-            driver.get(f'https://www.set.or.th/api/set/stock/{symbol}/highlight-data?lang=th')
-            # time.sleep(0.5)
-            data_highlight = return_json_from_html(driver.page_source)
-
-            driver.get(f'https://www.set.or.th/api/set/company/{symbol}/profile?lang=th')
-            # time.sleep(0.5)
-            data_profile = return_json_from_html(driver.page_source)
-
-            driver.get(f'https://www.set.or.th/th/market/product/stock/quote/{symbol}/company-profile/board-of-directors')
-            driver.get(f'https://www.set.or.th/api/set/company/{symbol}/board-of-director?lang=th')
-            # time.sleep(0.5)
-            data_board = return_json_from_html(driver.page_source)
+            # ยืม Chrome ที่เปิดค้างไว้จาก pool แทนการเปิดใหม่ทุกครั้ง
+            with driver_pool.lease() as driver:
+                load_page(driver, f'https://www.set.or.th/th/market/product/stock/quote/{symbol}/price')
+                # time.sleep(1)
+
+                load_page(driver, f'https://www.set.or.th/api/set/stock/{symbol}/highlight-data?lang=th')
+                # time.sleep(0.5)
+                data_highlight = return_json_from_html(driver.page_source)
+
+                load_page(driver, f'https://www.set.or.th/api/set/company/{symbol}/profile?lang=th')
+                # time.sleep(0.5)
+                data_profile = return_json_from_html(driver.page_source)
+
+                load_page(driver, f'https://www.set.or.th/th/market/product/stock/quote/{symbol}/company-profile/board-of-directors')
+                load_page(driver, f'https://www.set.or.th/api/set/company/{symbol}/board-of-director?lang=th')
+                # time.sleep(0.5)
+                data_board = return_json_from_html(driver.page_source)
+
+                # เก็บ cookie ของ session นี้ไว้ให้ fast path ใช้ครั้งถัดไป
+                try:
+                    set_http.load_cookies_from_driver(driver)
+                except Exception as e:
+                    logger.warning(f"[{symbol}] Failed to harvest cookies: {e}")
 
             # ตรวจสอบว่า field สำคัญว่างหรือไม่
             if is_data_invalid(data_highlight) or is_data_invalid(data_profile) or is_data_invalid(data_board):
-                print(f"[{symbol}] Attempt {attempt}: Incomplete data:")
+                logger.warning(f"[{symbol}] Attempt {attempt}: Incomplete data")
                 # print("  Highlight:", data_highlight)
                 # print("  Profile:", data_profile)
                 # print("  Board:", data_board)
@@ -103,15 +115,52 @@ def scrape_stock_data(symbol, max_retries=3):
                 'board_of_director': data_board
             }
 
+        except DriverPoolTimeout as e:
+            # ทุก session ไม่ว่าง ไม่ต้อง retry ให้คิวยาวขึ้นอีก
+            logger.warning(f"[{symbol}] Attempt {attempt} no driver available: {e}")
+            return None
         except Exception as e:
-            print(f"[{symbol}] Attempt {attempt} failed with error: {e}")
+            logger.warning(f"[{symbol}] Attempt {attempt} failed with error: {e}")
+            upstream_retries.labels("set", "browser").inc()
             time.sleep(2)  # รอ 2 วินาทีแล้วลองใหม่
-        finally:
-            driver.quit()
 
-    print(f"[{symbol}] Failed after {max_retries} attempts.")
+    logger.error(f"[{symbol}] Failed after {max_retries} attempts.")
     return None
 
+def harvest_set_cookies():
+    """เปิดหน้า SET ด้วย Chrome หนึ่งครั้งเพื่อเก็บ cookie ให้ fast path (ใช้เป็น job ของ scheduler)"""
+    if SET_FETCH_MODE != "http":
+        return
+    try:
+        with driver_pool.lease() as driver:
+            load_page(driver, 'https://www.set.or.th/th/market/product/stock/quote/PTT/price')
+            set_http.load_cookies_from_driver(driver)
+    except Exception as e:
+        logger.warning(f"Failed to harvest SET cookies: {e}")
+
+def scrape_stock_data_http(symbol):
+    data = set_http.fetch_company(symbol)
+    if any(is_data_invalid(data[key]) for key in ('highlight_data', 'profile_data', 'board_of_director')):
+        return None
+    return data
+
+def scrape_stock_data(symbol, max_retries=3):
+    # fast path: เรียก JSON API ตรงด้วย cookie ที่มีอยู่ ใช้ Chrome เฉพาะตอน cookie หมดอายุหรือข้อมูลไม่ครบ
+    if SET_FETCH_MODE == "http":
+        try:
+            data = scrape_stock_data_http(symbol)
+            if data:
+                return data
+        except UpstreamUnavailable:
+            # circuit เปิด/รอ rate limit ไม่ทัน: ห้ามเปิด Chrome ไปยิง host เดียวกันต่อ
+            raise
+        except SetCookiesExpired as e:
+            logger.info(f"[{symbol}] SET cookies expired, falling back to browser: {e}")
+        except Exception as e:
+            logger.warning(f"[{symbol}] HTTP fast path failed, falling back to browser: {e}")
+
+    return scrape_stock_data_browser(symbol, max_retries)
+
 def parse_value_string(value_str):
     # ล้าง control characters
     # cleaned = ''.join(c for c in value_str if not unicodedata.category(c).startswith('C'))
@@ -138,12 +187,14 @@ def trading_view_stock_data(symbol):
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36"
     }
 
-    response = requests.get(url, headers=headers)
+    with observe_upstream("tradingview", "requests_get"):
+        response = requests.get(url, headers=headers)
 
     if response.status_code != 200:
-        print("❌ Failed to fetch page:", response.status_code)
+        logger.warning(f"❌ Failed to fetch page {url}: {response.status_code}")
         return {}
 
+    from bs4 import BeautifulSoup
     soup = BeautifulSoup(response.text, "html.parser")
 
     key_stats_div = soup.find("div", attrs={
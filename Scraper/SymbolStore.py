@@ -0,0 +1,318 @@
+import os
+import re
+import csv
+import time
+import sqlite3
+import threading
+import logging
+import unicodedata
+from array import array
+
+logger = logging.getLogger(__name__)
+
+SYMBOL_STORE_PATH = os.getenv("SYMBOL_STORE_PATH", os.path.join("storage", "symbols.sqlite"))
+
+# (ไฟล์, exchange ที่ใช้เมื่อ symbol ไม่มี prefix, column ชื่ออังกฤษ, column ชื่อไทย, column logo)
+# ไฟล์ที่อยู่ก่อนมีลำดับความสำคัญสูงกว่า ไฟล์หลังใช้เติม field ที่ยังว่าง และเพิ่มชื่อเรียกอื่นให้ค้นหาได้
+SYMBOL_SOURCES = [
+    ("StockData.csv", None, "EngCompanyName", "ThaiCompanyName", "logo"),
+    ("completed_th_stock.csv", "SET", "EngCompanyName", "ThaiCompanyName", "logo"),
+    ("ThaiCompanyData.csv", "SET", "EngCompanyName", "ThaiCompanyName", "logo"),
+    ("completed_us_stock.csv", None, "companyName", None, "logo_url"),
+]
+
+NON_WORD_RE = re.compile(r"[^\w\u0E00-\u0E7F]+")
+
+
+def normalize(text):
+    """ตัวเล็ก, NFKC, เครื่องหมายวรรคตอนกลายเป็นช่องว่างเดียว (สระ/วรรณยุกต์ไทยคงไว้)"""
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return NON_WORD_RE.sub(" ", text).strip()
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def word_start_trigrams(text):
+    """trigram ที่อยู่ต้นคำ (ใช้หาชื่อที่มีคำขึ้นต้นด้วย query ก่อนชื่อที่มี query อยู่กลางคำ)"""
+    return {text[i:i + 3] for i in range(len(text) - 2) if i == 0 or text[i - 1] == " "}
+
+
+def read_sources(sources=SYMBOL_SOURCES):
+    """รวมทุกไฟล์เป็น list ของ dict (ลำดับตามไฟล์แรกที่เจอ symbol) พร้อม search_text ของทุกชื่อที่เจอ"""
+    merged = {}
+    for path, default_exchange, name_col, thai_col, logo_col in sources:
+        if not os.path.exists(path):
+            logger.warning(f"⚠️ ไม่พบไฟล์ {path}")
+            continue
+        with open(path, newline="", encoding="utf-8") as csvfile:
+            for row in csv.DictReader(csvfile):
+                symbol = (row.get("symbol") or "").strip().upper()
+                if not symbol:
+                    continue
+                if ":" not in symbol:
+                    if not default_exchange:
+                        continue
+                    symbol = f"{default_exchange}:{symbol}"
+                name = (row.get(name_col) or "").strip()
+                thai_name = (row.get(thai_col) or "").strip() if thai_col else ""
+                logo = (row.get(logo_col) or "").strip()
+
+                item = merged.get(symbol)
+                if item is None:
+                    exchange, ticker = symbol.split(":", 1)
+                    item = merged[symbol] = {"symbol": symbol, "exchange": exchange, "ticker": ticker,
+                                             "name": name, "thai_name": thai_name, "logo": logo, "names": []}
+                item["name"] = item["name"] or name
+                item["thai_name"] = item["thai_name"] or thai_name
+                item["logo"] = item["logo"] or logo
+                for text in (name, thai_name):
+                    text = normalize(text)
+                    if text and text not in item["names"]:
+                        item["names"].append(text)
+
+    items = list(merged.values())
+    for item in items:
+        item["search_text"] = " | ".join(item.pop("names"))
+    return items
+
+
+def build_symbol_store(path=SYMBOL_STORE_PATH, sources=SYMBOL_SOURCES):
+    """
+    compile ทุกไฟล์เป็น SQLite ไฟล์เดียว
+    - symbols:  id ตามลำดับความสำคัญ + field ที่ normalize แล้ว
+    - prefixes: ทุก prefix ของ ticker -> id ที่เรียงแล้ว (ตรงตัวก่อน, ticker สั้นก่อน, แล้วตาม id)
+    - trigrams: trigram ของชื่อไทย/อังกฤษ -> id เรียงจากน้อยไปมาก
+    - word_trigrams: เหมือน trigrams แต่เฉพาะ trigram ต้นคำ
+    id list เก็บเป็น uint32 blob
+    """
+    start = time.monotonic()
+    items = read_sources(sources)
+
+    prefixes = {}
+    grams = {}
+    word_grams = {}
+    for i, item in enumerate(items):
+        ticker = item["ticker"]
+        for n in range(1, len(ticker) + 1):
+            prefixes.setdefault(ticker[:n], []).append(i)
+        for gram in trigrams(item["search_text"]):
+            grams.setdefault(gram, []).append(i)
+        for gram in word_start_trigrams(item["search_text"]):
+            word_grams.setdefault(gram, []).append(i)
+
+    def prefix_rank(prefix):
+        return lambda i: (items[i]["ticker"] != prefix, len(items[i]["ticker"]), i)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # tmp แยกต่อ process (หลาย uvicorn worker อาจ build พร้อมกัน) os.replace ตัวสุดท้ายชนะ ไฟล์ที่ได้เหมือนกัน
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript("""
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE symbols (
+                id INTEGER PRIMARY KEY, symbol TEXT NOT NULL UNIQUE, exchange TEXT NOT NULL, ticker TEXT NOT NULL,
+                name TEXT, thai_name TEXT, logo TEXT, search_text TEXT
+            );
+            CREATE INDEX symbols_ticker ON symbols (ticker);
+            CREATE TABLE prefixes (prefix TEXT PRIMARY KEY, ids BLOB NOT NULL) WITHOUT ROWID;
+            CREATE TABLE trigrams (gram TEXT PRIMARY KEY, ids BLOB NOT NULL) WITHOUT ROWID;
+            CREATE TABLE word_trigrams (gram TEXT PRIMARY KEY, ids BLOB NOT NULL) WITHOUT ROWID;
+        """)
+        conn.executemany(
+            "INSERT INTO symbols VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            ((i, it["symbol"], it["exchange"], it["ticker"], it["name"], it["thai_name"], it["logo"], it["search_text"])
+             for i, it in enumerate(items)),
+        )
+        conn.executemany(
+            "INSERT INTO prefixes VALUES (?, ?)",
+            ((prefix, array("I", sorted(ids, key=prefix_rank(prefix))).tobytes()) for prefix, ids in prefixes.items()),
+        )
+        conn.executemany(
+            "INSERT INTO trigrams VALUES (?, ?)",
+            ((gram, array("I", ids).tobytes()) for gram, ids in grams.items()),
+        )
+        conn.executemany(
+            "INSERT INTO word_trigrams VALUES (?, ?)",
+            ((gram, array("I", ids).tobytes()) for gram, ids in word_grams.items()),
+        )
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("built_at", str(time.time())),
+            ("sources", ",".join(source[0] for source in sources)),
+        ])
+        conn.commit()
+    except Exception:
+        conn.close()
+        os.remove(tmp_path)
+        raise
+    conn.close()
+    os.replace(tmp_path, path)
+
+    logger.info(f"📚 compile symbol store {len(items)} ตัว, {len(prefixes)} prefix, {len(grams)} trigram "
+                f"-> {path} ({time.monotonic() - start:.1f}s)")
+    return len(items)
+
+
+class SymbolStore:
+    """
+    ค้นหา symbol แบบ type-ahead จาก store ที่ compile ไว้ (ดู build_symbol_store)
+    ตอนเปิดโหลด index ทั้งหมดขึ้น memory ครั้งเดียว (~หลาย MB) แล้วค้นหาโดยไม่แตะ disk
+    - ticker: prefix index ที่เรียงลำดับไว้แล้ว
+    - ชื่อ:   intersect trigram posting list (ตัวที่สั้นสุดก่อน) แล้วตรวจ substring จริงอีกรอบ
+    build ใหม่อัตโนมัติเมื่อ store ยังไม่มี หรือไฟล์ CSV ต้นทางใหม่กว่า store
+    """
+
+    def __init__(self, path=SYMBOL_STORE_PATH, sources=SYMBOL_SOURCES, check_interval=5.0):
+        self.path = path
+        self.sources = sources
+        self.check_interval = check_interval
+        self._load_lock = threading.Lock()
+        self._last_check = 0.0
+        self._index = None
+        self.loaded = False
+
+    def _sources_mtime(self):
+        mtimes = [os.path.getmtime(source[0]) for source in self.sources if os.path.exists(source[0])]
+        return max(mtimes) if mtimes else 0.0
+
+    def _stale(self):
+        return not os.path.exists(self.path) or os.path.getmtime(self.path) < self._sources_mtime()
+
+    def load(self):
+        import numpy as np  # import ตอนโหลด store ครั้งแรก (warm-up) ไม่ใช่ตอน start server
+        if self._stale():
+            build_symbol_store(self.path, self.sources)
+
+        start = time.monotonic()
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            rows = conn.execute(
+                "SELECT symbol, exchange, ticker, name, thai_name, logo, search_text FROM symbols ORDER BY id"
+            ).fetchall()
+            prefixes = {p: np.frombuffer(ids, dtype=np.uint32) for p, ids in conn.execute("SELECT prefix, ids FROM prefixes")}
+            grams = {g: np.frombuffer(ids, dtype=np.uint32) for g, ids in conn.execute("SELECT gram, ids FROM trigrams")}
+            word_grams = {g: np.frombuffer(ids, dtype=np.uint32)
+                          for g, ids in conn.execute("SELECT gram, ids FROM word_trigrams")}
+        finally:
+            conn.close()
+
+        self._index = {
+            "rows": rows,
+            "exchange": np.array([row[1] for row in rows]),
+            "texts": [row[6] for row in rows],
+            "prefixes": prefixes,
+            "grams": grams,
+            "word_grams": word_grams,
+        }
+        self._last_check = time.monotonic()
+        self.loaded = True
+        logger.info(f"📚 โหลด symbol store {len(rows)} ตัว ({time.monotonic() - start:.2f}s)")
+
+    def ensure_loaded(self):
+        if self.loaded:
+            return
+        with self._load_lock:
+            if not self.loaded:
+                self.load()
+
+    def _maybe_reload(self):
+        if not self.loaded:
+            self.ensure_loaded()
+            return
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        if self._stale() and self._load_lock.acquire(blocking=False):
+            try:
+                self.load()
+            finally:
+                self._load_lock.release()
+
+    def stats(self):
+        index = self._index
+        if index is None:
+            return {"loaded": False, "path": self.path}
+        return {"loaded": True, "path": self.path, "symbols": len(index["rows"]),
+                "prefixes": len(index["prefixes"]), "trigrams": len(index["grams"]),
+                "word_trigrams": len(index["word_grams"])}
+
+    def _name_candidates(self, index, query):
+        """
+        id ที่อาจมี query อยู่ในชื่อ (เรียงตาม id) แบ่งเป็น 2 กลุ่ม: ชื่อที่มีคำขึ้นต้นด้วย query, และทั้งหมด
+        trigram intersection ยังมี false positive ผู้เรียกต้องตรวจ substring อีกรอบ
+        """
+        import numpy as np
+        postings = []
+        for gram in trigrams(query):
+            ids = index["grams"].get(gram)
+            if ids is None:
+                return None, None
+            postings.append(ids)
+        postings.sort(key=len)
+        candidates = postings[0]
+        for ids in postings[1:]:
+            candidates = np.intersect1d(candidates, ids, assume_unique=True)
+            if not len(candidates):
+                return None, None
+        word_ids = index["word_grams"].get(query[:3])
+        word_candidates = np.intersect1d(candidates, word_ids, assume_unique=True) if word_ids is not None else None
+        return word_candidates, candidates
+
+    def search(self, query, market=None, limit=10):
+        """
+        query: ticker ("PT", "SET:PTT") หรือบางส่วนของชื่อไทย/อังกฤษ ("ปตท", "apple")
+        เรียง ticker ที่ตรง/ขึ้นต้นด้วย query ก่อน แล้วตามด้วยชื่อที่มีคำขึ้นต้นด้วย query และชื่อที่มี query อยู่
+        หยุดตรวจทันทีเมื่อได้ครบ limit (query สั้นอย่าง "inc" จึงไม่ต้องไล่ตรวจหลายพันชื่อ)
+        """
+        import numpy as np
+        self._maybe_reload()
+        index = self._index
+        query = (query or "").strip()
+        if ":" in query:
+            exchange, query = query.split(":", 1)
+            market = exchange
+        if not query:
+            return []
+        markets = [m.strip().upper() for m in market.split(",") if m.strip()] if market else None
+
+        texts = index["texts"]
+        name_query = normalize(query)
+        word_start = " " + name_query
+        tiers = [(index["prefixes"].get(query.upper()), None)]
+        if len(name_query) >= 3:
+            word_candidates, candidates = self._name_candidates(index, name_query)
+            tiers.append((word_candidates, lambda text: text.startswith(name_query) or word_start in text))
+            tiers.append((candidates, lambda text: name_query in text))
+
+        rows = index["rows"]
+        result = []
+        seen = set()
+        for ids, matches in tiers:
+            if ids is None:
+                continue
+            if markets:
+                ids = ids[np.isin(index["exchange"][ids], markets)]
+            for i in ids.tolist():
+                if i in seen or (matches is not None and not matches(texts[i])):
+                    continue
+                seen.add(i)
+                symbol, exchange, ticker, name, thai_name, logo, _ = rows[i]
+                result.append({"stockSymbol": ticker, "stockMarket": exchange, "companyName": name,
+                               "ThaiCompanyName": thai_name, "logo": logo})
+                if len(result) >= limit:
+                    return result
+        return result
+
+
+symbol_store = SymbolStore()
+
+
+if __name__ == "__main__":
+    # python -m Scraper.SymbolStore  (รันจาก root ของ repo เพื่อ compile store ล่วงหน้า)
+    logging.basicConfig(level=logging.INFO)
+    build_symbol_store()
@@ -0,0 +1,122 @@
+import csv
+import os
+import time
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+STOCK_DATA_CSV = "StockData.csv"
+
+
+class SymbolUniverse:
+    """
+    โหลด StockData.csv ครั้งเดียวแล้วเก็บ index ไว้ใน memory
+    - full:   "SET:PTT" -> row
+    - ticker: "PTT"     -> row
+    - suffix: ทุก suffix ของ symbol -> row แรกตามลำดับในไฟล์ (แทน row['symbol'].endswith(...))
+    จะโหลดใหม่เฉพาะตอนที่ mtime ของไฟล์เปลี่ยน
+    โหลดครั้งแรกตอนถูกใช้ครั้งแรก (หรือตอน warm-up หลัง server เปิด) ไม่ใช่ตอน import
+    """
+
+    def __init__(self, csv_path=STOCK_DATA_CSV, check_interval=5.0):
+        self.csv_path = csv_path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._mtime = None
+        self._last_check = 0.0
+        self.rows = []
+        self.by_full = {}
+        self.by_ticker = {}
+        self.by_suffix = {}
+        self.position = {}
+        self.loaded = False
+
+    def reload(self):
+        try:
+            mtime = os.path.getmtime(self.csv_path)
+        except OSError:
+            logger.warning(f"⚠️ ไม่พบไฟล์ {self.csv_path}")
+            return
+
+        rows = []
+        by_full, by_ticker, by_suffix, position = {}, {}, {}, {}
+
+        with open(self.csv_path, newline='', encoding='utf-8') as csvfile:
+            for row in csv.DictReader(csvfile):
+                full_symbol = (row.get('symbol') or '').strip()
+                if not full_symbol:
+                    continue
+                key = full_symbol.upper()
+                if key in by_full:
+                    continue
+
+                position[key] = len(rows)
+                rows.append(row)
+                by_full[key] = row
+
+                ticker = key.split(':', 1)[-1]
+                by_ticker.setdefault(ticker, row)
+
+                for i in range(len(key)):
+                    by_suffix.setdefault(key[i:], row)
+
+        with self._lock:
+            self.rows = rows
+            self.by_full = by_full
+            self.by_ticker = by_ticker
+            self.by_suffix = by_suffix
+            self.position = position
+            self._mtime = mtime
+            self._last_check = time.monotonic()
+            self.loaded = True
+
+        logger.info(f"📚 โหลด symbol universe {len(rows)} ตัวจาก {self.csv_path}")
+
+    def ensure_loaded(self):
+        if self.loaded:
+            return
+        with self._load_lock:
+            if not self.loaded:
+                self.reload()
+
+    def _maybe_reload(self):
+        if not self.loaded:
+            self.ensure_loaded()
+            return
+        # stat ไฟล์ไม่เกิน 1 ครั้งต่อ check_interval วินาที
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        try:
+            mtime = os.path.getmtime(self.csv_path)
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self.reload()
+
+    def resolve(self, symbol):
+        """หา row จาก "EXCHANGE:TICKER", "TICKER" หรือ suffix ของ symbol"""
+        if not symbol:
+            return None
+        self._maybe_reload()
+        key = symbol.strip().upper()
+        return self.by_full.get(key) or self.by_ticker.get(key) or self.by_suffix.get(key)
+
+    def symbols(self):
+        """full symbol ทั้งหมดเรียงตามลำดับในไฟล์"""
+        self._maybe_reload()
+        return [row['symbol'] for row in self.rows]
+
+    def get_rows(self, symbol_list):
+        """คืน row ของ full symbol ที่ระบุ เรียงตามลำดับในไฟล์ (เหมือน df[df['symbol'].isin(...)])"""
+        self._maybe_reload()
+        keys = {s.strip().upper() for s in symbol_list if s and s.strip()}
+        found = [k for k in keys if k in self.by_full]
+        found.sort(key=self.position.__getitem__)
+        return [self.by_full[k] for k in found]
+
+
+symbol_universe = SymbolUniverse()
@@ -0,0 +1,178 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+CACHE_STORAGE_FOLDER = os.path.join("./storage", "cache")
+
+# refresh เบื้องหลังของทุก cache ใช้ pool เล็กๆ ร่วมกัน
+_refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cache-refresh")
+
+
+def is_empty(value):
+    return value is None or value == {} or value == []
+
+
+class TtlCache:
+    """
+    cache แบบ TTL + LRU สำหรับผลลัพธ์จาก upstream
+    - อายุ < ttl: ตอบจาก cache
+    - ttl <= อายุ < ttl + stale_ttl: ตอบข้อมูลเก่าไปก่อน แล้ว refresh เบื้องหลัง (stale-while-revalidate)
+    - miss พร้อมกันหลาย request ของ key เดียวกันจะรอผลจากการ fetch ครั้งเดียว
+    - ถ้ากำหนด disk=True จะเก็บเป็นไฟล์ json ไว้ใน storage/cache/<name> ด้วย (อยู่รอดหลัง restart)
+    ผลลัพธ์ว่าง (None, {}, []) ไม่ถูกเก็บ เว้นแต่กำหนด negative_ttl (เก็บผลว่างไว้สั้นๆ กันยิงซ้ำ)
+    """
+
+    def __init__(self, name, ttl, stale_ttl=0, max_entries=1000, disk=False, negative_ttl=0):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.disk_dir = os.path.join(CACHE_STORAGE_FOLDER, name) if disk else None
+        self._entries = OrderedDict()  # key -> (value, fetched_at)
+        self._inflight = {}            # key -> Future
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "inflight": len(self._inflight),
+            }
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1(str(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, f"{digest}.json")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+            return record["value"], record["fetched_at"]
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"⚠️ อ่าน cache {path} ไม่ได้: {e}")
+            return None
+
+    def _write_disk(self, key, value, fetched_at):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"key": str(key), "fetched_at": fetched_at, "value": value}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"⚠️ เขียน cache {path} ไม่ได้: {e}")
+
+    def _store(self, key, value, fetched_at):
+        with self._lock:
+            self._entries[key] = (value, fetched_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _lookup(self, key, memory_only=False):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        if memory_only:
+            return None
+        entry = self._read_disk(key)
+        if entry is not None:
+            self._store(key, *entry)
+        return entry
+
+    def _load(self, key, loader, future):
+        try:
+            value = loader()
+            if not is_empty(value):
+                fetched_at = time.time()
+            elif self.negative_ttl > 0 and value is not None:
+                # ผลว่างให้หมดอายุหลัง negative_ttl แทน ttl ปกติ
+                fetched_at = time.time() - max(0, self.ttl - self.negative_ttl)
+            else:
+                fetched_at = None
+            if fetched_at is not None:
+                self._store(key, value, fetched_at)
+                self._write_disk(key, value, fetched_at)
+            future.set_result(value)
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _start_load(self, key):
+        """คืน (future, is_owner) ถ้ามีคนกำลังโหลด key นี้อยู่แล้วจะได้ future เดียวกัน"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future, False
+            future = self._inflight[key] = Future()
+            return future, True
+
+    def peek(self, key, loader=None, memory_only=False):
+        """
+        คืนค่าที่อยู่ใน cache (สดหรือ stale) โดยไม่ block รอ upstream, ไม่มีคืน None
+        ถ้าข้อมูล stale และส่ง loader มาด้วย จะ refresh เบื้องหลังให้
+        memory_only=True ไม่อ่านไฟล์บน disk (เรียกจาก event loop ได้)
+        """
+        entry = self._lookup(key, memory_only)
+        if entry is None:
+            return None
+        value, fetched_at = entry
+        age = time.time() - fetched_at
+        if age < self.ttl:
+            self.hits += 1
+            return value
+        if age < self.ttl + self.stale_ttl:
+            self.stale_hits += 1
+            if loader is not None:
+                future, is_owner = self._start_load(key)
+                if is_owner:
+                    _refresh_executor.submit(self._load, key, loader, future)
+            return value
+        return None
+
+    def get(self, key, loader):
+        value = self.peek(key, loader)
+        if value is not None:
+            return value
+
+        self.misses += 1
+        future, is_owner = self._start_load(key)
+        if is_owner:
+            self._load(key, loader, future)
+        return future.result()
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.disk_dir:
+            try:
+                os.remove(self._disk_path(key))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,229 @@
+import os
+import time
+import threading
+import logging
+from contextlib import contextmanager
+from Scraper.Upstream import tradingview_upstream
+from core.metrics import observe_upstream, upstream_retries
+
+logger = logging.getLogger(__name__)
+
+# ไม่ตั้ง TV_USER/TV_PASS จะใช้ TvDatafeed แบบไม่ login (ข้อมูลบางตลาดจำกัด/ดีเลย์)
+TV_USER = os.getenv("TV_USER")
+TV_PASS = os.getenv("TV_PASS")
+TV_POOL_SIZE = int(os.getenv("TV_POOL_SIZE", "8"))
+TV_ACQUIRE_TIMEOUT = float(os.getenv("TV_ACQUIRE_TIMEOUT", "30"))
+TV_SESSION_MAX_AGE = float(os.getenv("TV_SESSION_MAX_AGE", str(6 * 3600)))
+# get_hist ของ tvDatafeed คืน None แทนการ raise เมื่อ websocket/token มีปัญหา
+# ถ้า session เดียวได้ None ติดกันหลายครั้ง ถือว่า session เสียแล้ว login ใหม่
+TV_MAX_EMPTY_STREAK = int(os.getenv("TV_MAX_EMPTY_STREAK", "5"))
+# None ของ symbol ที่ไม่เคยได้ข้อมูลอาจเป็น symbol ที่ไม่มีข้อมูลจริง (delist/ไม่มีการซื้อขาย) ไม่นับ
+# None ของ symbol ที่เคยได้ข้อมูลแล้วติดกันตั้งแต่เท่านี้ครั้งใน session เดียวนับเป็น error ของ upstream
+# (throttle/token หมดอายุ) ให้ rate limiter ลด rate และ circuit breaker นับ
+TV_EMPTY_FAILURE_STREAK = int(os.getenv("TV_EMPTY_FAILURE_STREAK", "2"))
+# จำนวน session ที่ login ล่วงหน้าตอน server เปิด (ที่เหลือ login ตอนถูกยืมครั้งแรก)
+TV_WARM_SESSIONS = int(os.getenv("TV_WARM_SESSIONS", "2"))
+
+if not TV_USER or not TV_PASS:
+    logger.warning("⚠️ ไม่ได้ตั้ง TV_USER/TV_PASS ใช้ TvDatafeed แบบไม่ login")
+
+
+def new_tv_client():
+    # tvDatafeed โหลด pandas ด้วย import ตอน login ครั้งแรก (warm-up) ไม่ใช่ตอน start server
+    from tvDatafeed import TvDatafeed
+    if not TV_USER or not TV_PASS:
+        return TvDatafeed()
+    return TvDatafeed(username=TV_USER, password=TV_PASS)
+
+
+class TvSessionPoolTimeout(Exception):
+    pass
+
+
+class TvSession:
+    def __init__(self, session_id):
+        self.id = session_id
+        self.client = None
+        self.logged_in_at = None
+        self.logins = 0
+        self.calls = 0
+        self.errors = 0
+        self.empty = 0
+        self.empty_streak = 0
+        self.busy_seconds = 0.0
+        self.last_error = None
+
+    def expired(self, max_age):
+        return self.client is None or time.monotonic() - self.logged_in_at > max_age
+
+    def stats(self):
+        return {
+            "id": self.id,
+            "connected": self.client is not None,
+            "age_seconds": round(time.monotonic() - self.logged_in_at, 1) if self.logged_in_at else None,
+            "logins": self.logins,
+            "calls": self.calls,
+            "errors": self.errors,
+            "empty": self.empty,
+            "avg_seconds": round(self.busy_seconds / self.calls, 3) if self.calls else None,
+            "last_error": self.last_error,
+        }
+
+
+class TvSessionPool:
+    """
+    pool ของ TvDatafeed ที่ login แล้ว size ตัว แต่ละตัวถูกยืมได้ทีละ thread
+    - login ตอนยืมครั้งแรก (lazy) และ login ใหม่เมื่อ error, ได้ None ของ symbol ที่เคยมีข้อมูลติดกันเกิน max_empty_streak หรืออายุเกิน max_age
+    - get_hist ที่ล้มด้วย exception จะ login ใหม่แล้วลองซ้ำอีกหนึ่งครั้งโดยผู้เรียกไม่ต้องรู้
+    - ทุก call ผ่าน rate limiter + circuit breaker ของ upstream (circuit เปิดอยู่จะ raise CircuitOpen ก่อนยืม session)
+    - ถ้าทุก session ไม่ว่าง จะรอในคิวไม่เกิน acquire_timeout วินาที
+    """
+
+    def __init__(self, factory=new_tv_client, size=TV_POOL_SIZE, acquire_timeout=TV_ACQUIRE_TIMEOUT,
+                 max_age=TV_SESSION_MAX_AGE, max_empty_streak=TV_MAX_EMPTY_STREAK, upstream=tradingview_upstream):
+        self.factory = factory
+        self.upstream = upstream
+        self.size = size
+        self.acquire_timeout = acquire_timeout
+        self.max_age = max_age
+        self.max_empty_streak = max_empty_streak
+        self.sessions = [TvSession(i) for i in range(size)]
+        # (exchange, symbol) ที่ upstream เคยคืนข้อมูลให้แล้ว
+        self._seen = set()
+        self._idle = list(reversed(self.sessions))
+        self._waiting = 0
+        self._cond = threading.Condition()
+
+    def stats(self):
+        with self._cond:
+            pool = {"size": self.size, "idle": len(self._idle), "waiting": self._waiting}
+        pool["sessions"] = [session.stats() for session in self.sessions]
+        return pool
+
+    def ready(self):
+        """มีอย่างน้อยหนึ่ง session ที่ login แล้ว"""
+        return any(session.client is not None for session in self.sessions)
+
+    def warm(self, count=TV_WARM_SESSIONS):
+        """login session แรก count ตัวไว้ล่วงหน้า (ตัวที่ถูกยืมอยู่ข้ามไป)"""
+        warmed = 0
+        for session in self.sessions[:count]:
+            with self._cond:
+                if session not in self._idle:
+                    continue
+                self._idle.remove(session)
+            try:
+                if session.expired(self.max_age):
+                    self._login(session)
+                warmed += 1
+            except Exception as e:
+                session.errors += 1
+                session.last_error = str(e)
+                logger.warning(f"⚠️ warm tv session {session.id} ไม่สำเร็จ: {e}")
+            finally:
+                self._release(session)
+        logger.info(f"🔑 tv pool พร้อม {warmed}/{count} session")
+        return warmed
+
+    def _login(self, session):
+        start = time.monotonic()
+        session.client = None
+        session.client = self.factory()
+        session.logged_in_at = time.monotonic()
+        session.logins += 1
+        session.empty_streak = 0
+        logger.info(f"🔑 tv session {session.id} login ({time.monotonic() - start:.1f}s)")
+
+    def _acquire(self):
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            self._waiting += 1
+            try:
+                while not self._idle:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TvSessionPoolTimeout(f"No TvDatafeed session available after {self.acquire_timeout}s")
+                    self._cond.wait(remaining)
+                session = self._idle.pop()
+            finally:
+                self._waiting -= 1
+
+        try:
+            if session.expired(self.max_age):
+                self._login(session)
+        except Exception as e:
+            session.errors += 1
+            session.last_error = str(e)
+            self._release(session)
+            raise
+        return session
+
+    def _release(self, session):
+        with self._cond:
+            self._idle.append(session)
+            self._cond.notify()
+
+    @contextmanager
+    def lease(self):
+        """ยืม session (ได้ TvSession ที่ login แล้ว) exception ระหว่างใช้จะทำให้ login ใหม่ในการยืมครั้งถัดไป"""
+        session = self._acquire()
+        try:
+            yield session
+        except Exception as e:
+            session.errors += 1
+            session.last_error = str(e)
+            session.client = None
+            raise
+        finally:
+            self._release(session)
+
+    def _call(self, session, kwargs):
+        start = time.monotonic()
+        try:
+            with observe_upstream("tradingview", "get_hist"):
+                data = session.client.get_hist(**kwargs)
+        except Exception:
+            self.upstream.record(False)
+            raise
+        finally:
+            session.calls += 1
+            session.busy_seconds += time.monotonic() - start
+        latency = time.monotonic() - start
+        key = (kwargs.get("exchange"), kwargs.get("symbol"))
+        if data is None or data.empty:
+            session.empty += 1
+            if key in self._seen:
+                session.empty_streak += 1
+                self.upstream.record(session.empty_streak < TV_EMPTY_FAILURE_STREAK, latency)
+            else:
+                self.upstream.record(True, latency)
+        else:
+            self._seen.add(key)
+            session.empty_streak = 0
+            self.upstream.record(True, latency)
+        return data
+
+    def get_hist(self, **kwargs):
+        # รอ token ก่อนยืม session จะได้ไม่ถือ session ค้างไว้ระหว่างรอ
+        self.upstream.check()
+        self.upstream.acquire()
+        with self.lease() as session:
+            try:
+                data = self._call(session, kwargs)
+            except Exception as e:
+                logger.warning(f"⚠️ tv session {session.id} ผิดพลาด ({e}) login ใหม่แล้วลองอีกครั้ง")
+                session.errors += 1
+                session.last_error = str(e)
+                upstream_retries.labels("tradingview", "relogin").inc()
+                self._login(session)
+                self.upstream.check()
+                self.upstream.acquire()
+                data = self._call(session, kwargs)
+
+            if session.empty_streak >= self.max_empty_streak:
+                logger.warning(f"⚠️ tv session {session.id} ไม่ได้ข้อมูล {session.empty_streak} ครั้งติด จะ login ใหม่")
+                session.client = None
+            return data
+
+
+tv_pool = TvSessionPool()
@@ -0,0 +1,231 @@
+import os
+import time
+import random
+import threading
+import logging
+from core.executors import UpstreamUnavailable, UpstreamBusy
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpen(UpstreamBusy):
+    """upstream ล่มอยู่ (circuit เปิด) ไม่ยิงเพิ่มจนกว่าจะครบ cooldown -> 503 + Retry-After ถ้าหลุดถึง route"""
+
+    def __init__(self, name, retry_after):
+        super().__init__(name, max(1, int(retry_after + 0.999)))
+        self.detail = f"Upstream '{name}' is unavailable, please retry later"
+
+
+class RateLimitTimeout(UpstreamUnavailable):
+    """รอ token ของ rate limiter เกิน timeout -> 503 + Retry-After ถ้าหลุดถึง route"""
+
+    def __init__(self, timeout, retry_after):
+        super().__init__(503, f"No rate-limit token within {timeout}s, please retry later",
+                         max(1, int(retry_after + 0.999)))
+
+
+def backoff_delay(attempt, base=1.0, cap=60.0):
+    """exponential backoff แบบ full jitter: สุ่มในช่วง 0..min(cap, base * 2^attempt)"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class AdaptiveRateLimiter:
+    """
+    token bucket ที่ปรับ rate เองแบบ AIMD
+    - สำเร็จและเร็วกว่า target_latency -> เพิ่ม rate ทีละ increase
+    - error -> ลด rate ลงครึ่งหนึ่ง, ช้ากว่า target_latency -> ลด 10%
+      (ลดได้ไม่เกินหนึ่งครั้งต่อ decrease_interval วินาที กันลดซ้ำจาก request ที่ยิงไปพร้อมกัน)
+    """
+
+    def __init__(self, rate, min_rate, max_rate, burst=5, target_latency=3.0, increase=None, decrease_interval=1.0):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.target_latency = target_latency
+        self.increase = increase if increase is not None else max_rate / 100
+        self.decrease_interval = decrease_interval
+        self.tokens = float(burst)
+        self._updated = time.monotonic()
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout=None):
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                raise RateLimitTimeout(timeout, wait)
+            time.sleep(wait)
+            self.waited_seconds += wait
+
+    def record(self, ok, latency=None):
+        with self._lock:
+            now = time.monotonic()
+            slow = latency is not None and latency > self.target_latency
+            if ok and not slow:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+                return
+            if now - self._last_decrease < self.decrease_interval:
+                return
+            self._last_decrease = now
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate * (0.9 if ok else 0.5))
+
+    def stats(self):
+        with self._lock:
+            return {"rate": round(self.rate, 3), "tokens": round(self.tokens, 2),
+                    "waited_seconds": round(self.waited_seconds, 1)}
+
+
+class CircuitBreaker:
+    """
+    error ติดกัน failure_threshold ครั้ง -> เปิด circuit (ปฏิเสธทุก call) เป็นเวลา cooldown
+    ครบแล้วเป็น half-open ปล่อย probe ทีละหนึ่ง call: สำเร็จ = ปิด, ล้ม = เปิดใหม่ด้วย cooldown สองเท่า (ไม่เกิน max_cooldown)
+    """
+
+    def __init__(self, failure_threshold=10, cooldown=30.0, max_cooldown=300.0):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_until = 0.0
+        self.probe_started = None
+        self.trips = 0
+        self._lock = threading.Lock()
+
+    def retry_in(self):
+        with self._lock:
+            if self.state != "open":
+                return 0.0
+            return max(0.0, self.opened_until - time.monotonic())
+
+    def allow(self):
+        with self._lock:
+            now = time.monotonic()
+            if self.state == "open":
+                if now < self.opened_until:
+                    return False
+                self.state = "half_open"
+                self.probe_started = None
+            if self.state == "half_open":
+                # probe ที่ค้าง (ไม่ได้ record) นานเกิน cooldown ให้ปล่อยตัวใหม่ได้
+                if self.probe_started is not None and now - self.probe_started < self.cooldown:
+                    return False
+                self.probe_started = now
+            return True
+
+    def _open(self, now):
+        self.state = "open"
+        self.opened_until = now + self.cooldown
+        self.trips += 1
+
+    def record(self, ok):
+        with self._lock:
+            now = time.monotonic()
+            if ok:
+                self.failures = 0
+                if self.state == "half_open":
+                    self.state = "closed"
+                    self.cooldown = self.base_cooldown
+                return
+            self.failures += 1
+            if self.state == "half_open":
+                self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+                self._open(now)
+            elif self.state == "closed" and self.failures >= self.failure_threshold:
+                self._open(now)
+
+    def stats(self):
+        retry_in = self.retry_in()
+        with self._lock:
+            return {"state": self.state, "failures": self.failures, "trips": self.trips,
+                    "retry_in": round(retry_in, 1)}
+
+
+class Upstream:
+    """rate limiter + circuit breaker ของ upstream หนึ่งตัว ใช้ร่วมกันทั้ง process"""
+
+    def __init__(self, name, limiter, breaker, acquire_timeout=60.0):
+        self.name = name
+        self.limiter = limiter
+        self.breaker = breaker
+        self.acquire_timeout = acquire_timeout
+        self.calls = 0
+        self.failures = 0
+
+    def check(self):
+        if not self.breaker.allow():
+            raise CircuitOpen(self.name, self.breaker.retry_in())
+
+    def acquire(self):
+        self.limiter.acquire(self.acquire_timeout)
+
+    def record(self, ok, latency=None):
+        self.calls += 1
+        if not ok:
+            self.failures += 1
+        was_open = self.breaker.state != "closed"
+        self.limiter.record(ok, latency)
+        self.breaker.record(ok)
+        if self.breaker.state == "open" and not was_open:
+            logger.warning(f"🔌 {self.name} error ติดกัน {self.breaker.failures} ครั้ง พักการดึง {self.breaker.cooldown:.0f}s")
+        elif was_open and self.breaker.state == "closed":
+            logger.info(f"🔌 {self.name} กลับมาใช้งานได้")
+
+    def call(self, fn, *args, neutral=(), **kwargs):
+        """เรียก fn ผ่าน breaker + limiter, exception ใน neutral ไม่นับเป็นความผิดของ upstream"""
+        self.check()
+        self.acquire()
+        start = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except neutral:
+            self.record(True)
+            raise
+        except Exception:
+            self.record(False)
+            raise
+        self.record(True, time.monotonic() - start)
+        return result
+
+    def stats(self):
+        return {"calls": self.calls, "failures": self.failures,
+                **self.limiter.stats(), "circuit": self.breaker.stats()}
+
+
+tradingview_upstream = Upstream(
+    "tradingview",
+    AdaptiveRateLimiter(
+        rate=float(os.getenv("TV_RATE", "5")),
+        min_rate=float(os.getenv("TV_MIN_RATE", "0.5")),
+        max_rate=float(os.getenv("TV_MAX_RATE", "20")),
+        burst=int(os.getenv("TV_BURST", "8")),
+        target_latency=float(os.getenv("TV_TARGET_LATENCY", "3")),
+    ),
+    CircuitBreaker(failure_threshold=int(os.getenv("TV_BREAKER_THRESHOLD", "10"))),
+)
+
+set_upstream = Upstream(
+    "set",
+    AdaptiveRateLimiter(rate=4, min_rate=0.5, max_rate=10, burst=6, target_latency=5.0),
+    CircuitBreaker(failure_threshold=5, cooldown=60.0, max_cooldown=600.0),
+)
+
+upstreams = {
+    "tradingview": tradingview_upstream,
+    "set": set_upstream,
+}
@@ -0,0 +1,132 @@
+import io
+import json
+from fastapi.responses import Response, StreamingResponse
+from Scraper.Resample import epoch_seconds
+
+try:
+    import msgpack
+except ImportError:  # optional
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional
+    pa = None
+
+MEDIA_TYPES = {
+    "json": "application/json",
+    "columns": "application/vnd.stocksignal.columns+json",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "msgpack": "application/msgpack",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+ACCEPT_ALIASES = {
+    "application/x-msgpack": "msgpack",
+    "application/vnd.msgpack": "msgpack",
+    "application/vnd.apache.arrow.file": "arrow",
+    "application/jsonl": "ndjson",
+}
+
+
+class UnsupportedFormat(Exception):
+    pass
+
+
+def negotiate_format(format_param, accept_header):
+    """query ?format= มาก่อน ไม่งั้นดูจาก Accept header, ไม่ระบุ = json แบบเดิม (list of records)"""
+    if format_param:
+        fmt = format_param.lower()
+        if fmt not in MEDIA_TYPES:
+            raise UnsupportedFormat(f"Unknown format '{format_param}'")
+        return fmt
+
+    by_media_type = {media_type: fmt for fmt, media_type in MEDIA_TYPES.items()}
+    by_media_type.update(ACCEPT_ALIASES)
+    for part in (accept_header or "").split(","):
+        media_type = part.split(";")[0].strip().lower()
+        if media_type in by_media_type:
+            return by_media_type[media_type]
+    return "json"
+
+
+def value_fields(df):
+    """OHLCV + column ของ indicator (ถ้ามี)"""
+    return [col for col in df.columns if col != "symbol"]
+
+
+def column_values(series):
+    # NaN (ช่วง warm-up ของ indicator) -> None เพื่อให้เป็น JSON ที่ถูกต้อง
+    if series.isna().any():
+        return series.astype(object).where(series.notna(), None).tolist()
+    return series.tolist()
+
+
+def to_columns(df):
+    """หนึ่ง array ต่อ field, timestamp เป็น epoch วินาที (UTC)"""
+    return {
+        "symbol": str(df["symbol"].iloc[0]) if len(df) else None,
+        "timestamp": epoch_seconds(df.index).tolist(),
+        **{field: column_values(df[field]) for field in value_fields(df)},
+    }
+
+
+def iter_ndjson(df, chunk_size=500):
+    symbol = str(df["symbol"].iloc[0]) if len(df) else None
+    timestamps = epoch_seconds(df.index).tolist()
+    fields = value_fields(df)
+    values = [column_values(df[field]) for field in fields]
+    for start in range(0, len(timestamps), chunk_size):
+        lines = []
+        for i in range(start, min(start + chunk_size, len(timestamps))):
+            record = {"symbol": symbol, "timestamp": timestamps[i]}
+            for field, column in zip(fields, values):
+                record[field] = column[i]
+            lines.append(json.dumps(record, separators=(",", ":")))
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def to_csv(df):
+    out = df[["symbol"] + value_fields(df)].copy()
+    out.insert(0, "timestamp", epoch_seconds(df.index))
+    buffer = io.StringIO()
+    out.to_csv(buffer, index=False)
+    return buffer.getvalue().encode("utf-8")
+
+
+def to_msgpack(df):
+    if msgpack is None:
+        raise UnsupportedFormat("msgpack is not installed on this server")
+    return msgpack.packb(to_columns(df), use_bin_type=True)
+
+
+def to_arrow(df):
+    if pa is None:
+        raise UnsupportedFormat("pyarrow is not installed on this server")
+    table = pa.Table.from_pydict({
+        "timestamp": pa.array(epoch_seconds(df.index), type=pa.int64()),
+        "symbol": pa.array(df["symbol"].astype(str)),
+        **{field: pa.array(df[field].to_numpy(), from_pandas=True) for field in value_fields(df)},
+    })
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def hist_response(df, fmt):
+    """สร้าง Response ของ /getHistData ตาม format ที่ตกลงกันได้ (ยกเว้น json แบบเดิม)"""
+    media_type = MEDIA_TYPES[fmt]
+    if fmt == "columns":
+        body = json.dumps(to_columns(df), separators=(",", ":")).encode("utf-8")
+        return Response(content=body, media_type=media_type)
+    if fmt == "ndjson":
+        return StreamingResponse(iter_ndjson(df), media_type=media_type)
+    if fmt == "csv":
+        return Response(content=to_csv(df), media_type=media_type)
+    if fmt == "msgpack":
+        return Response(content=to_msgpack(df), media_type=media_type)
+    if fmt == "arrow":
+        return Response(content=to_arrow(df), media_type=media_type)
+    raise UnsupportedFormat(f"Unknown format '{fmt}'")
@@ -0,0 +1,89 @@
+from prometheus_client import Histogram, CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from core.metrics import registry, LATENCY_BUCKETS
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Time to produce a response per route",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS, registry=registry,
+)
+
+
+class StatsCollector:
+    """
+    แปลง stats() ที่แต่ละ component มีอยู่แล้วเป็น metric ตอน scrape
+    (ไม่ต้องไปเพิ่ม code นับใน hot path ของ pool/cache เดิม)
+    caches/executors/upstreams เป็น dict ชื่อ -> object ที่มี stats()
+    """
+
+    def __init__(self, caches, executors, upstreams, tv_pool, driver_pool, quote_hub):
+        self.caches = caches
+        self.executors = executors
+        self.upstreams = upstreams
+        self.tv_pool = tv_pool
+        self.driver_pool = driver_pool
+        self.quote_hub = quote_hub
+
+    def describe(self):
+        return []
+
+    def collect(self):
+        cache_total = CounterMetricFamily("ttl_cache_requests", "TTL cache lookups by result", labels=["cache", "result"])
+        cache_entries = GaugeMetricFamily("ttl_cache_entries", "Entries held in memory", labels=["cache"])
+        for name, cache in self.caches.items():
+            stats = cache.stats()
+            cache_total.add_metric([name, "hit"], stats["hits"])
+            cache_total.add_metric([name, "stale"], stats["stale_hits"])
+            cache_total.add_metric([name, "miss"], stats["misses"])
+            cache_entries.add_metric([name], stats["entries"])
+        yield cache_total
+        yield cache_entries
+
+        queue_depth = GaugeMetricFamily("executor_queue_depth", "Jobs waiting for a worker", labels=["executor"])
+        pending = GaugeMetricFamily("executor_pending", "Jobs queued or running", labels=["executor"])
+        rejected = CounterMetricFamily("executor_rejected", "Jobs rejected with 503", labels=["executor"])
+        timeouts = CounterMetricFamily("executor_timeouts", "Jobs that exceeded the executor timeout", labels=["executor"])
+        for name, executor in self.executors.items():
+            stats = executor.stats()
+            queue_depth.add_metric([name], stats["queued"])
+            pending.add_metric([name], stats["pending"])
+            rejected.add_metric([name], stats["rejected"])
+            timeouts.add_metric([name], stats["timeouts"])
+        yield queue_depth
+        yield pending
+        yield rejected
+        yield timeouts
+
+        rate = GaugeMetricFamily("upstream_rate_limit", "Current token bucket rate (calls/s)", labels=["upstream"])
+        circuit = GaugeMetricFamily("upstream_circuit_open", "1 when the circuit breaker is not closed", labels=["upstream"])
+        errors = CounterMetricFamily("upstream_errors", "Failed upstream calls", labels=["upstream"])
+        calls = CounterMetricFamily("upstream_calls", "Upstream calls through the rate limiter", labels=["upstream"])
+        for name, upstream in self.upstreams.items():
+            stats = upstream.stats()
+            rate.add_metric([name], stats["rate"])
+            circuit.add_metric([name], 0 if stats["circuit"]["state"] == "closed" else 1)
+            errors.add_metric([name], stats["failures"])
+            calls.add_metric([name], stats["calls"])
+        yield rate
+        yield circuit
+        yield errors
+        yield calls
+
+        tv_stats = self.tv_pool.stats()
+        yield GaugeMetricFamily("tv_sessions_idle", "Idle TvDatafeed sessions", value=tv_stats["idle"])
+        yield GaugeMetricFamily("tv_sessions_waiting", "Threads waiting for a TvDatafeed session", value=tv_stats["waiting"])
+        logins = CounterMetricFamily("tv_session_logins", "TvDatafeed logins per session", labels=["session"])
+        for session in tv_stats["sessions"]:
+            logins.add_metric([str(session["id"])], session["logins"])
+        yield logins
+
+        driver_stats = self.driver_pool.stats()
+        yield GaugeMetricFamily("webdriver_open", "Open Chrome sessions", value=driver_stats["open"])
+        yield GaugeMetricFamily("webdriver_waiting", "Threads waiting for a Chrome session", value=driver_stats["waiting"])
+
+        yield GaugeMetricFamily("sse_subscribers", "Open /streamStockPrice subscriptions",
+                                value=self.quote_hub.subscriber_count())
+        yield GaugeMetricFamily("quote_pollers", "Active per-symbol quote pollers", value=len(self.quote_hub.pollers))
+
+
+def render_metrics():
+    return generate_latest(registry), CONTENT_TYPE_LATEST
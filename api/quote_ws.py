@@ -0,0 +1,161 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from starlette.websockets import WebSocketDisconnect
+from Scraper.QuoteHub import CoalescingSubscription
+
+logger = logging.getLogger(__name__)
+
+WS_MAX_SYMBOLS = int(os.getenv("WS_MAX_SYMBOLS", "200"))
+WS_MAX_THROTTLE_MS = 60_000
+
+
+def encode(message):
+    return json.dumps(message, ensure_ascii=False, separators=(",", ":"))
+
+
+class QuoteSocket:
+    """
+    WebSocket ราคาหุ้นหนึ่ง connection บน QuoteHub เดียวกับ SSE (poller ต่อ symbol ใช้ร่วมกัน)
+
+    client -> server
+      {"op": "subscribe", "symbols": ["PTT", "NASDAQ:AAPL"]}
+      {"op": "unsubscribe", "symbols": ["PTT", 123]}       (ใช้ symbol หรือ id ก็ได้)
+      {"op": "throttle", "ms": 1000}                        (ส่งไม่บ่อยกว่านี้ ราคาระหว่างรอถูกรวมเหลือล่าสุด)
+
+    server -> client
+      {"type": "snapshot", "data": [{"id": 123, "stockSymbol": ..., "logo": ..., "stockPrice": ..., "changePct": ...}]}
+          ข้อมูลเต็มครั้งเดียวตอน subscribe (id = เลขประจำ symbol ใช้ใน quotes)
+          id ออกตามลำดับที่ subscribe และคงที่ตลอด connection (subscribe ซ้ำได้ id เดิม)
+          ไม่ผูกกับลำดับแถวของ symbol universe ที่เลื่อนได้เมื่อโหลด CSV ใหม่
+      {"type": "quotes", "data": [[123, 35.25, 1.44], ...]}
+          เฉพาะ symbol ที่ราคาหรือ % เปลี่ยนจากที่ส่งไปล่าสุด
+      {"type": "unsubscribed", "ids": [123]}, {"type": "error", "message": ...}
+    """
+
+    def __init__(self, websocket, hub, universe, throttle_ms=0, max_symbols=WS_MAX_SYMBOLS):
+        self.websocket = websocket
+        self.hub = hub
+        self.universe = universe
+        self.throttle = min(max(throttle_ms, 0), WS_MAX_THROTTLE_MS) / 1000
+        self.max_symbols = max_symbols
+        self.sub = CoalescingSubscription()
+        self.ids = {}      # full symbol -> id (ไม่ลบตอน unsubscribe)
+        self.symbols = {}  # id -> full symbol
+        self.sent = {}     # id -> (stockPrice, changePct) ที่ client มีอยู่
+        self._send_lock = asyncio.Lock()
+
+    async def run(self):
+        await self.websocket.accept()
+        sender = asyncio.create_task(self._send_quotes())
+        try:
+            while True:
+                try:
+                    message = json.loads(await self.websocket.receive_text())
+                    await self.handle(message)
+                except (ValueError, TypeError, AttributeError) as e:
+                    await self._send({"type": "error", "message": f"Invalid message: {e}"})
+        except WebSocketDisconnect:
+            pass
+        finally:
+            sender.cancel()
+            self.hub.remove(self.sub, list(self.sub.symbols))
+
+    async def handle(self, message):
+        op = message.get("op")
+        if op in ("subscribe", "unsubscribe"):
+            symbols = message.get("symbols")
+            # string ตัวเดียว ("PTT") ห้ามวนทีละตัวอักษร ต้องเป็น list เท่านั้น
+            if not isinstance(symbols, list):
+                await self._send({"type": "error", "message": "'symbols' must be a list, e.g. [\"PTT\"]"})
+            elif op == "subscribe":
+                await self.subscribe(symbols)
+            else:
+                await self.unsubscribe(symbols)
+        elif op == "throttle":
+            self.throttle = min(max(float(message.get("ms") or 0), 0), WS_MAX_THROTTLE_MS) / 1000
+        else:
+            await self._send({"type": "error", "message": f"Unknown op '{op}'"})
+
+    async def subscribe(self, symbols):
+        rows, unknown = [], []
+        for symbol in symbols:
+            row = self.universe.resolve(str(symbol))
+            if row is None:
+                unknown.append(symbol)
+            elif row["symbol"] not in self.sub.symbols and row not in rows:
+                rows.append(row)
+        if len(self.sub.symbols) + len(rows) > self.max_symbols:
+            await self._send({"type": "error", "message": f"Too many symbols (max {self.max_symbols})"})
+            return
+
+        async with self._send_lock:
+            self.hub.add(self.sub, rows)
+            snapshot = []
+            for row in rows:
+                full_symbol = row["symbol"]
+                symbol_id = self.ids.get(full_symbol)
+                if symbol_id is None:
+                    symbol_id = self.ids[full_symbol] = len(self.ids) + 1
+                    self.symbols[symbol_id] = full_symbol
+                exchange, ticker = full_symbol.split(":", 1)
+                item = {"id": symbol_id, "stockSymbol": ticker, "stockMarket": exchange,
+                        "ThaiCompanyName": row.get("ThaiCompanyName"), "companyName": row.get("EngCompanyName"),
+                        "logo": row.get("logo"), "stockPrice": None, "changePct": None}
+                quote = self.hub.last_quotes.get(full_symbol)
+                if quote is not None and not quote.get("error"):
+                    item["stockPrice"] = quote.get("stockPrice")
+                    item["changePct"] = quote.get("changePct")
+                    self.sent[symbol_id] = (item["stockPrice"], item["changePct"])
+                snapshot.append(item)
+            message = {"type": "snapshot", "data": snapshot}
+            if unknown:
+                message["unknown"] = unknown
+            await self.websocket.send_text(encode(message))
+
+    async def unsubscribe(self, symbols):
+        removed = []
+        for symbol in symbols:
+            if isinstance(symbol, int):
+                full_symbol = self.symbols.get(symbol)
+            else:
+                row = self.universe.resolve(str(symbol))
+                full_symbol = row["symbol"] if row is not None else None
+            if full_symbol is None or full_symbol not in self.sub.symbols:
+                continue
+            symbol_id = self.ids[full_symbol]
+            self.sent.pop(symbol_id, None)
+            self.sub.pending.pop(full_symbol, None)
+            self.hub.remove(self.sub, [full_symbol])
+            removed.append(symbol_id)
+        await self._send({"type": "unsubscribed", "ids": removed})
+
+    async def _send(self, message):
+        async with self._send_lock:
+            await self.websocket.send_text(encode(message))
+
+    async def _send_quotes(self):
+        last_sent = 0.0
+        while True:
+            await self.sub.ready.wait()
+            wait = last_sent + self.throttle - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            async with self._send_lock:
+                rows = []
+                for full_symbol, quote in self.sub.drain().items():
+                    symbol_id = self.ids.get(full_symbol)
+                    # ราคาที่ error ไม่ส่ง client ยังเห็นราคาดีล่าสุดอยู่
+                    if symbol_id is None or quote.get("error"):
+                        continue
+                    values = (quote.get("stockPrice"), quote.get("changePct"))
+                    if self.sent.get(symbol_id) == values:
+                        continue
+                    self.sent[symbol_id] = values
+                    rows.append([symbol_id, *values])
+                if rows:
+                    await self.websocket.send_text(encode({"type": "quotes", "data": rows}))
+                    last_sent = time.monotonic()
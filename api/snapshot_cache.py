@@ -0,0 +1,164 @@
+import os
+import json
+import gzip
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+
+try:
+    import brotli
+except ImportError:  # brotli เป็น optional ถ้าไม่มีจะส่งแค่ gzip/identity
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+VARIANT_CACHE_SIZE = 128
+
+
+def encode_json(payload):
+    # รูปแบบเดียวกับ JSONResponse ของ starlette
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class EncodedBody:
+    """body ที่ serialize แล้ว พร้อม gzip/brotli (สร้างครั้งเดียวแล้วเก็บไว้)"""
+
+    def __init__(self, body, etag, eager=False):
+        self.identity = body
+        self.etag = etag
+        self._gzip = None
+        self._br = None
+        if eager:
+            self.encoded("gzip")
+            self.encoded("br")
+
+    def encoded(self, encoding):
+        if encoding == "gzip":
+            if self._gzip is None:
+                self._gzip = gzip.compress(self.identity, compresslevel=6)
+            return self._gzip
+        if encoding == "br" and brotli is not None:
+            if self._br is None:
+                self._br = brotli.compress(self.identity, quality=5)
+            return self._br
+        return self.identity
+
+    def negotiate(self, accept_encoding):
+        accepted = {part.split(";")[0].strip().lower() for part in (accept_encoding or "").split(",")}
+        if "br" in accepted and brotli is not None:
+            return "br", self.encoded("br")
+        if "gzip" in accepted:
+            return "gzip", self.encoded("gzip")
+        return None, self.identity
+
+
+class SnapshotCache:
+    """
+    เก็บ storage/StockData.json ในรูปที่ serialize + บีบอัดไว้แล้ว
+    สร้างใหม่เฉพาะตอนที่ไฟล์เปลี่ยน (mtime/size) และรองรับ ETag / Last-Modified
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._signature = None
+        self.data = []
+        self.by_market = {}
+        self.version = None
+        self.last_modified = None
+        self.full = None
+        self._variants = OrderedDict()
+
+    def _file_signature(self):
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def refresh(self):
+        """โหลดไฟล์ใหม่ถ้าเปลี่ยน (เรียกจาก refresher หลังเขียนไฟล์ได้ด้วย)"""
+        signature = self._file_signature()
+        if signature == self._signature:
+            return
+        with self._lock:
+            if signature == self._signature:
+                return
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)  # data เป็น list of dict
+
+            by_market = {}
+            for row in data:
+                by_market.setdefault(str(row.get("stockMarket", "")).upper(), []).append(row)
+
+            body = encode_json({"data": data})
+            version = hashlib.blake2b(body, digest_size=12).hexdigest()
+
+            self.data = data
+            self.by_market = by_market
+            self.version = version
+            self.last_modified = signature[0] / 1e9
+            self.full = EncodedBody(body, f'"{version}"', eager=True)
+            self._variants = OrderedDict()
+            self._signature = signature
+            logger.info(f"🗜️ สร้าง /StockData cache ใหม่ {len(data)} ตัว ({len(body)} bytes)")
+
+    def get(self, stock_market=None, page=None, page_size=None, fields=None):
+        self.refresh()
+
+        if not stock_market and page is None and not fields:
+            return self.full
+
+        key = (self.version, stock_market, page, page_size, fields)
+        with self._lock:
+            cached = self._variants.get(key)
+            if cached is not None:
+                self._variants.move_to_end(key)
+                return cached
+
+        if stock_market:
+            rows = []
+            for market in stock_market.split(","):
+                rows.extend(self.by_market.get(market.strip().upper(), []))
+        else:
+            rows = self.data
+
+        payload = {}
+        if page is not None:
+            total = len(rows)
+            start = (page - 1) * page_size
+            rows = rows[start:start + page_size]
+            payload.update({"total": total, "page": page, "page_size": page_size})
+
+        if fields:
+            wanted = [f.strip() for f in fields.split(",") if f.strip()]
+            rows = [{f: row[f] for f in wanted if f in row} for row in rows]
+
+        payload = {"data": rows, **payload}
+        tag = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=6).hexdigest()
+        variant = EncodedBody(encode_json(payload), f'"{self.version}-{tag}"')
+
+        with self._lock:
+            self._variants[key] = variant
+            while len(self._variants) > VARIANT_CACHE_SIZE:
+                self._variants.popitem(last=False)
+        return variant
+
+    def is_not_modified(self, etag, if_none_match, if_modified_since):
+        if if_none_match:
+            candidates = [c.strip() for c in if_none_match.split(",")]
+            return "*" in candidates or any(c.removeprefix("W/") == etag for c in candidates)
+        if if_modified_since and self.last_modified is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(self.last_modified) <= since
+        return False
+
+    def headers(self, etag):
+        return {
+            "ETag": etag,
+            "Last-Modified": formatdate(self.last_modified, usegmt=True),
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
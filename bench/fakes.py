@@ -0,0 +1,259 @@
+"""
+upstream ปลอมแบบ in-process สำหรับ benchmark (ไม่มี network ออกไปข้างนอกเลย)
+
+- FakeTvDatafeed: แทน TvDatafeed.get_hist ตั้ง latency / jitter / อัตรา error / อัตราคืน None ได้
+- FakeWebDriver: แทน Chrome ของ driver pool (หน้า JSON ของ SET ห่อด้วย <pre> แบบที่ browser แสดง)
+- fake_request: แทน requests.Session.request (SET JSON API, หน้า symbol ของ TradingView, หน้าเว็บข่าวสำหรับหา favicon)
+- fake_feedparser_parse: แทน feedparser.parse (Google News RSS)
+"""
+import json
+import math
+import time
+import random
+import zlib
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
+import numpy as np
+import pandas as pd
+import requests
+import feedparser
+
+from Scraper.BarStore import INTERVAL_SECONDS, interval_name
+
+
+@dataclass
+class FakeConfig:
+    tv_latency: float = 0.05       # วินาที (ค่าเฉลี่ยต่อ call)
+    tv_jitter: float = 0.5         # สัดส่วนการแกว่งของ latency (lognormal sigma)
+    tv_failure_rate: float = 0.0   # โอกาสที่ get_hist จะ raise
+    tv_empty_rate: float = 0.0     # โอกาสที่ get_hist จะคืน None (แบบที่ tvDatafeed ทำตอนโดน throttle)
+    http_latency: float = 0.03
+    rss_latency: float = 0.08
+    page_latency: float = 0.2      # Selenium page load
+    seed: int = 42
+
+
+def sample_latency(mean, jitter, rng=random):
+    if mean <= 0:
+        return 0.0
+    if jitter <= 0:
+        return mean
+    # lognormal ที่มีค่าเฉลี่ยเท่ากับ mean
+    return rng.lognormvariate(math.log(mean) - jitter ** 2 / 2, jitter)
+
+
+def symbol_seed(symbol):
+    return zlib.crc32(symbol.encode("utf-8"))
+
+
+def fake_bars(exchange, symbol, interval, n_bars, now=None):
+    """
+    แท่งเทียนที่ราคาเป็นฟังก์ชันของ timestamp (ไม่ใช่ random walk ต่อ call)
+    จึงดึงซ้ำ/ดึงต่อท้ายกี่ครั้งก็ได้ค่าเดิม เหมือน upstream จริง
+    """
+    step = INTERVAL_SECONDS.get(interval_name(interval), 3600)
+    now = int(now if now is not None else time.time())
+    end = now // step * step
+    ts = end - step * np.arange(n_bars)[::-1]
+
+    seed = symbol_seed(f"{exchange}:{symbol}")
+    base = 5 + seed % 500
+    phase = (seed % 1000) / 1000 * 2 * math.pi
+    t = ts / 86400.0
+    close = base * (1 + 0.15 * np.sin(t / 40 + phase) + 0.05 * np.sin(t / 6 + 2 * phase) + 0.01 * np.sin(t * 3 + phase))
+    spread = close * 0.01
+    df = pd.DataFrame({
+        "symbol": f"{exchange}:{symbol}",
+        "open": close - spread * np.sin(t * 7 + phase),
+        "high": close + spread,
+        "low": close - spread,
+        "close": close,
+        "volume": 1000 + (seed % 97) * 100 * (1 + np.cos(t * 5 + phase) ** 2),
+    }, index=pd.to_datetime(ts, unit="s"))
+    df.index.name = "datetime"
+    return df
+
+
+class FakeTvDatafeed:
+    def __init__(self, config):
+        self.config = config
+        self.rng = random.Random()
+        self.calls = 0
+
+    def get_hist(self, symbol, exchange="NSE", interval=None, n_bars=10, fut_contract=None, extended_session=False):
+        self.calls += 1
+        time.sleep(sample_latency(self.config.tv_latency, self.config.tv_jitter, self.rng))
+        roll = self.rng.random()
+        if roll < self.config.tv_failure_rate:
+            raise ConnectionError("fake tradingview websocket closed")
+        if roll < self.config.tv_failure_rate + self.config.tv_empty_rate:
+            return None
+        return fake_bars(exchange, symbol, interval, n_bars)
+
+
+# ---------- SET / TradingView / เว็บข่าว ----------
+
+def set_highlight(symbol):
+    seed = symbol_seed(symbol)
+    return {
+        "symbol": symbol,
+        "marketCap": 1e9 + seed % 10**9,
+        "peRatio": round(5 + seed % 30 + 0.25, 2),
+        "pbRatio": round(0.5 + seed % 5 / 2, 2),
+        "dividendYield": round(seed % 9 / 2, 2),
+        "beta": round(0.5 + seed % 10 / 10, 2),
+    }
+
+
+def set_profile(symbol):
+    return {"symbol": symbol, "name": f"{symbol} PUBLIC COMPANY LIMITED", "sector": "SERVICE",
+            "industry": "SERVICES", "website": f"https://www.{symbol.lower()}.example.com",
+            "address": "Bangkok 10110", "establishedDate": "1995-01-01"}
+
+
+def set_board(symbol):
+    return [{"name": f"Director {i} of {symbol}", "position": "DIRECTOR"} for i in range(1, 9)]
+
+
+def set_api_payload(url):
+    parts = urlparse(url).path.strip("/").split("/")
+    # /api/set/stock/{symbol}/highlight-data, /api/set/company/{symbol}/profile, .../board-of-director
+    symbol = parts[3] if len(parts) > 3 else "PTT"
+    if url.split("?")[0].endswith("highlight-data"):
+        return set_highlight(symbol)
+    if url.split("?")[0].endswith("profile"):
+        return set_profile(symbol)
+    return set_board(symbol)
+
+
+def tradingview_symbol_page(url):
+    symbol = urlparse(url).path.strip("/").split("/")[-1]
+    seed = symbol_seed(symbol)
+
+    def block(label, value):
+        return (f'<div class="block-QCJM7wcY"><div class="apply-overflow-tooltip label-QCJM7wcY">{label}</div>'
+                f'<div class="apply-overflow-tooltip value-QCJM7wcY">{value}</div></div>')
+
+    key_stats = "".join([
+        block("Market capitalization", f"{seed % 900 + 10}.{seed % 100:02d} B USD"),
+        block("Dividend yield (indicated)", f"{seed % 5}.{seed % 10}0%"),
+        block("Price to earnings Ratio (TTM)", f"{seed % 60}.{seed % 100:02d}"),
+        block("Basic EPS (TTM)", f"{seed % 12}.{seed % 100:02d} USD"),
+        block("Revenue (FY)", f"{seed % 400}.{seed % 10}0 B USD"),
+    ])
+    company = "".join([
+        block("Sector", "Technology"),
+        block("Industry", "Software"),
+        block("CEO", "Jane Doe"),
+        block("Website", f"{symbol.lower()}.example.com"),
+        block("Employees (FY)", f"{seed % 90 + 1} K"),
+    ])
+    filler = "<div class='filler'>" + ("lorem ipsum " * 2000) + "</div>"
+    return (
+        "<html><head><title>{0}</title></head><body>{1}"
+        "<div data-cms-base-widget=\"true\" data-container-name=\"key-stats-id\"><div class=\"container-RUwl8xXG\">{2}</div></div>"
+        "<div data-cms-base-widget=\"true\" data-container-name=\"company-info-id\"><div class=\"container-RUwl8xXG\">{3}</div></div>"
+        "</body></html>"
+    ).format(symbol, filler, key_stats, company)
+
+
+def news_site_page(url):
+    return ('<html><head><link rel="icon" href="/favicon.ico"><link rel="apple-touch-icon" href="/apple-touch-icon.png">'
+            f'<title>{urlparse(url).netloc}</title></head><body>article</body></html>')
+
+
+def make_response(url, body, content_type, status=200):
+    response = requests.models.Response()
+    response.status_code = status
+    response._content = body.encode("utf-8") if isinstance(body, str) else body
+    response.headers["Content-Type"] = content_type
+    response.encoding = "utf-8"
+    response.url = url
+    return response
+
+
+class FakeHttp:
+    def __init__(self, config):
+        self.config = config
+        self.rng = random.Random()
+        self.calls = 0
+
+    def request(self, session, method, url, *args, **kwargs):
+        self.calls += 1
+        host = urlparse(url).netloc
+        time.sleep(sample_latency(self.config.http_latency, 0.5, self.rng))
+        if "set.or.th" in host and "/api/" in url:
+            return make_response(url, json.dumps(set_api_payload(url)), "application/json")
+        if "tradingview.com" in host:
+            return make_response(url, tradingview_symbol_page(url), "text/html")
+        return make_response(url, news_site_page(url), "text/html")
+
+
+class FakeWebDriver:
+    def __init__(self, config):
+        self.config = config
+        self.page_source = ""
+        self.rng = random.Random()
+
+    def get(self, url):
+        time.sleep(sample_latency(self.config.page_latency, 0.3, self.rng))
+        if "/api/" in url:
+            self.page_source = f"<html><body><pre>{json.dumps(set_api_payload(url))}</pre></body></html>"
+        else:
+            self.page_source = "<html><body>SET</body></html>"
+
+    def get_cookies(self):
+        return [{"name": "bench", "value": "1", "domain": ".set.or.th", "path": "/"}]
+
+    def execute_script(self, script):
+        if "userAgent" in script:
+            return "Mozilla/5.0 (X11; Linux x86_64) HeadlessChrome/134.0 Safari/537.36"
+        return 1
+
+    def quit(self):
+        pass
+
+
+def fake_feed(url, config, rng):
+    time.sleep(sample_latency(config.rss_latency, 0.5, rng))
+    seed = symbol_seed(url)
+    now = time.time()
+    entries = []
+    for i in range(10):
+        published = now - (seed % 3600) - i * 1800
+        source_host = f"news{(seed + i) % 7}.example.com"
+        entries.append(feedparser.FeedParserDict(
+            title=f"Headline {i} for {seed}",
+            link=f"https://{source_host}/article/{seed}/{i}",
+            published=time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(published)),
+            published_parsed=time.gmtime(published),
+            source=feedparser.FeedParserDict(title=source_host, href=f"https://{source_host}"),
+        ))
+    return feedparser.FeedParserDict(entries=entries, bozo=False)
+
+
+def install(config):
+    """
+    แทนที่ upstream ทั้งหมดด้วยของปลอม ต้องเรียกหลัง import main แล้ว (pool เป็น singleton ของ module)
+    คืน dict ของตัวปลอม (ไว้ดูจำนวน call)
+    """
+    from Scraper.TvSessionPool import tv_pool
+    from Scraper.DriverPool import driver_pool
+    from Scraper.SetHttpClient import set_http
+
+    fakes = {"http": FakeHttp(config), "tv": [], "rss_rng": random.Random(config.seed)}
+    random.seed(config.seed)
+
+    def tv_factory():
+        client = FakeTvDatafeed(config)
+        fakes["tv"].append(client)
+        return client
+
+    tv_pool.factory = tv_factory
+    driver_pool.factory = lambda: FakeWebDriver(config)
+    requests.Session.request = lambda session, method, url, *args, **kwargs: fakes["http"].request(session, method, url, *args, **kwargs)
+    feedparser.parse = lambda url, *args, **kwargs: fake_feed(url, config, fakes["rss_rng"])
+    # เหมือนเก็บ cookie จาก browser มาแล้ว /CompanyData จะใช้ fast path
+    set_http.has_cookies = True
+    return fakes
@@ -0,0 +1,483 @@
+"""
+Benchmark ของ API แบบ offline (upstream ทุกตัวเป็นของปลอมใน bench/fakes.py)
+
+รัน server จริง (uvicorn, lifespan ปิด = ไม่มี scheduler) ใน process เดียวกันแล้วยิง workload ผ่าน HTTP:
+  cron        refresh ราคาทั้งชุดด้วย snapshot refresher (วัดจำนวน symbol ต่อวินาที)
+  stockdata   client หลายตัว poll /StockData (แบ่งหน้า + ETag)
+  hist        /getHistData เป็นชุดๆ (burst) หลาย symbol/interval/format
+  sse         subscriber /streamStockPrice พร้อมกันหลายตัว (latency = เวลาถึง event แรก)
+  news        /news แบบ batch
+  profile     /CompanyProfile (หน้า HTML ของ TradingView)
+
+ใช้:
+  python bench/run.py                                   # ทุก workload ค่า default
+  python bench/run.py -w hist,sse --sse-clients 500
+  python bench/run.py --save bench/baseline.json
+  python bench/run.py --baseline bench/baseline.json    # exit 1 ถ้าช้าลงเกิน --max-regression
+
+ต้องมี httpx (pip install -r bench/requirements.txt)
+peak RSS เป็นของทั้ง process (server + client ของ benchmark)
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+import shutil
+import threading
+import resource
+import socket
+from dataclasses import asdict
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKLOADS = ["cron", "stockdata", "hist", "sse", "news", "profile"]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark ของ stockSignalAPI")
+    parser.add_argument("-w", "--workloads", default=",".join(WORKLOADS))
+    parser.add_argument("--cron-symbols", type=int, default=2000)
+    parser.add_argument("--stockdata-clients", type=int, default=50)
+    parser.add_argument("--stockdata-requests", type=int, default=5000)
+    parser.add_argument("--hist-bursts", type=int, default=10)
+    parser.add_argument("--hist-burst-size", type=int, default=50)
+    parser.add_argument("--sse-clients", type=int, default=200)
+    parser.add_argument("--sse-seconds", type=float, default=10)
+    parser.add_argument("--sse-refresh", type=float, default=1.0, help="QUOTE_REFRESH_SECONDS ระหว่าง benchmark")
+    parser.add_argument("--news-requests", type=int, default=200)
+    parser.add_argument("--profile-requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20, help="จำนวน request พร้อมกันของ news/profile")
+    parser.add_argument("--tv-latency", type=float, default=0.05)
+    parser.add_argument("--tv-failure-rate", type=float, default=0.0)
+    parser.add_argument("--tv-empty-rate", type=float, default=0.0)
+    parser.add_argument("--http-latency", type=float, default=0.03)
+    parser.add_argument("--rss-latency", type=float, default=0.08)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--keep-workdir", action="store_true", help="ไม่ลบ storage ชั่วคราวหลังจบ")
+    parser.add_argument("--save", help="เขียนผลเป็น JSON")
+    parser.add_argument("--baseline", help="เทียบกับผลเดิม (JSON จาก --save)")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="ยอมให้ throughput ลด / p95 เพิ่มได้ไม่เกินสัดส่วนนี้")
+    return parser.parse_args(argv)
+
+
+# ---------- วัดผล ----------
+
+class RssSampler:
+    """อ่าน RSS ของ process ทุก interval วินาที เก็บค่าสูงสุดของแต่ละ workload"""
+
+    def __init__(self, interval=0.02):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._page = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+    def current(self):
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * self._page
+        except OSError:
+            # macOS รายงานเป็น byte, Linux เป็น KB
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return rss if sys.platform == "darwin" else rss * 1024
+
+    def reset(self):
+        self.peak = self.current()
+
+    def run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.current())
+            self._stop.wait(self.interval)
+
+    def start(self):
+        threading.Thread(target=self.run, name="bench-rss", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * q / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(name, latencies, errors, elapsed, peak_rss, items=None, extra=None):
+    values = sorted(latencies)
+    count = items if items is not None else len(values)
+    result = {
+        "workload": name,
+        "count": count,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput": round(count / elapsed, 2) if elapsed > 0 else None,
+        "p50_ms": None, "p95_ms": None, "p99_ms": None,
+        "peak_rss_mb": round(peak_rss / 2**20, 1),
+    }
+    for q in (50, 95, 99):
+        value = percentile(values, q)
+        result[f"p{q}_ms"] = round(value * 1000, 2) if value is not None else None
+    if extra:
+        result.update(extra)
+    return result
+
+
+def print_table(results):
+    columns = ["workload", "count", "errors", "seconds", "throughput", "p50_ms", "p95_ms", "p99_ms", "peak_rss_mb"]
+    widths = {c: max(len(c), *(len(str(r.get(c))) for r in results)) for c in columns}
+    print("  ".join(c.rjust(widths[c]) for c in columns))
+    for r in results:
+        print("  ".join(str(r.get(c)).rjust(widths[c]) for c in columns))
+
+
+def compare(results, baseline, max_regression):
+    """คืน list ของข้อความ regression (throughput ลด หรือ p95 เพิ่ม เกิน max_regression)"""
+    previous = {r["workload"]: r for r in baseline.get("results", [])}
+    problems = []
+    for r in results:
+        base = previous.get(r["workload"])
+        if not base:
+            continue
+        if base.get("throughput") and r.get("throughput") is not None:
+            if r["throughput"] < base["throughput"] * (1 - max_regression):
+                problems.append(f"{r['workload']}: throughput {r['throughput']} < baseline {base['throughput']}")
+        # p95 ต่ำกว่า 1ms แกว่งตาม noise ของเครื่อง ไม่นำมาเทียบ
+        if base.get("p95_ms") and base["p95_ms"] >= 1 and r.get("p95_ms") is not None:
+            if r["p95_ms"] > base["p95_ms"] * (1 + max_regression):
+                problems.append(f"{r['workload']}: p95 {r['p95_ms']}ms > baseline {base['p95_ms']}ms")
+    return problems
+
+
+# ---------- server ----------
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(app):
+    import uvicorn
+
+    port = free_port()
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, lifespan="off", log_level="warning",
+                            access_log=False, timeout_keep_alive=30)
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, name="bench-server", daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 30
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("uvicorn did not start")
+        time.sleep(0.05)
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+async def timed_get(client, url, latencies, **kwargs):
+    start = time.perf_counter()
+    response = await client.get(url, **kwargs)
+    latencies.append(time.perf_counter() - start)
+    return response
+
+
+async def run_pool(jobs, concurrency):
+    """รัน coroutine factory ใน jobs ไม่เกิน concurrency ตัวพร้อมกัน คืนจำนวนที่ error"""
+    queue = list(jobs)
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while queue:
+            job = queue.pop()
+            try:
+                response = await job()
+                if response is not None and response.status_code >= 400:
+                    errors += 1
+            except Exception:
+                errors += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return errors
+
+
+# ---------- workloads ----------
+
+def workload_cron(ctx):
+    """refresh ราคา --cron-symbols ตัวแรกของ universe ครั้งเดียว (เท่ากับหนึ่ง shard ขนาดใหญ่)"""
+    import Scraper.HistoricalData as historical
+
+    latencies = []
+    original = historical.fetch_one_stock
+
+    def timed_fetch(row):
+        start = time.perf_counter()
+        try:
+            return original(row)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    refresher = ctx["main"].snapshot_refresher
+    refresher.cursor = 0
+    refresher.shard_size = ctx["args"].cron_symbols
+    historical.fetch_one_stock = timed_fetch
+    try:
+        start = time.perf_counter()
+        refresher.refresh_next_shard()
+        elapsed = time.perf_counter() - start
+    finally:
+        historical.fetch_one_stock = original
+
+    errors = sum(1 for quote in refresher.snapshot.values() if quote.get("error"))
+    return latencies, errors, elapsed, {"items": len(latencies)}
+
+
+async def workload_stockdata(ctx, client):
+    args = ctx["args"]
+    latencies = []
+    etags = {}
+    page_size = 100
+    total = len(ctx["main"].snapshot_cache.data or [])
+    pages = max(1, (total + page_size - 1) // page_size)
+
+    def job():
+        page = random.randint(1, pages)
+        market = random.choice([None, None, "SET", "NASDAQ"])
+        params = {"page": page, "page_size": page_size}
+        if market:
+            params["stockMarket"] = market
+        key = (page, market)
+        headers = {"Accept-Encoding": "gzip"}
+        # ครึ่งหนึ่งของ client ส่ง ETag เดิมกลับมา (แบบ browser ที่ poll ซ้ำ)
+        if key in etags and random.random() < 0.5:
+            headers["If-None-Match"] = etags[key]
+
+        async def run():
+            response = await timed_get(client, "/StockData", latencies, params=params, headers=headers)
+            if "etag" in response.headers:
+                etags[key] = response.headers["etag"]
+            return response
+        return run
+
+    start = time.perf_counter()
+    errors = await run_pool([job() for _ in range(args.stockdata_requests)], args.stockdata_clients)
+    return latencies, errors, time.perf_counter() - start, {}
+
+
+async def workload_hist(ctx, client):
+    args = ctx["args"]
+    symbols = ctx["symbols"]
+    latencies = []
+    errors = 0
+    intervals = ["1h", "4h", "1d", "1w"]
+    formats = ["json", "columns", "columns", "ndjson", "csv"]
+
+    start = time.perf_counter()
+    for _ in range(args.hist_bursts):
+        jobs = []
+        for i in range(args.hist_burst_size):
+            if i % 10 == 9:
+                batch = ",".join(random.sample(symbols, 10))
+                jobs.append(timed_get(client, "/getHistData", latencies,
+                                      params={"symbols": batch, "interval": random.choice(intervals), "bars": 200,
+                                              "format": "columns"}))
+            else:
+                jobs.append(timed_get(client, f"/getHistData/{random.choice(symbols)}", latencies,
+                                      params={"interval": random.choice(intervals), "bars": 500,
+                                              "format": random.choice(formats)}))
+        responses = await asyncio.gather(*jobs, return_exceptions=True)
+        errors += sum(1 for r in responses if isinstance(r, Exception) or r.status_code >= 400)
+    return latencies, errors, time.perf_counter() - start, {}
+
+
+async def workload_sse(ctx, client):
+    args = ctx["args"]
+    hot = ctx["symbols"][:50]
+    first_event = []
+    events = 0
+    errors = 0
+
+    async def subscriber():
+        nonlocal events, errors
+        symbols = ",".join(random.sample(hot, 5))
+        start = time.perf_counter()
+        got_first = False
+        try:
+            async with client.stream("GET", "/streamStockPrice", params={"symbols": symbols}) as response:
+                if response.status_code != 200:
+                    errors += 1
+                    return
+                async for line in response.aiter_lines():
+                    if line.startswith("data:"):
+                        events += 1
+                        if not got_first:
+                            got_first = True
+                            first_event.append(time.perf_counter() - start)
+        except Exception:
+            errors += 1
+
+    tasks = [asyncio.create_task(subscriber()) for _ in range(args.sse_clients)]
+    start = time.perf_counter()
+    await asyncio.sleep(args.sse_seconds)
+    subscribers = ctx["main"].quote_hub.subscriber_count()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    # throughput = event ที่ส่งถึง client ต่อวินาที, latency = เวลาถึง event แรก
+    return first_event, errors, elapsed, {"items": events, "extra": {"subscribers": subscribers}}
+
+
+async def workload_news(ctx, client):
+    args = ctx["args"]
+    set_symbols = [s for s in ctx["symbols"] if s.startswith("SET:")] or ctx["symbols"]
+    latencies = []
+
+    def job():
+        symbols = ",".join(s.split(":", 1)[1] for s in random.sample(set_symbols[:100], 5))
+        return lambda: timed_get(client, "/news", latencies, params={"symbols": symbols})
+
+    start = time.perf_counter()
+    errors = await run_pool([job() for _ in range(args.news_requests)], args.concurrency)
+    return latencies, errors, time.perf_counter() - start, {}
+
+
+async def workload_profile(ctx, client):
+    args = ctx["args"]
+    us_symbols = [s for s in ctx["symbols"] if s.split(":", 1)[0] in ("NASDAQ", "NYSE")] or ctx["symbols"]
+    latencies = []
+
+    def job():
+        symbol = random.choice(us_symbols[:200]).split(":", 1)[1]
+        return lambda: timed_get(client, f"/CompanyProfile/{symbol}", latencies)
+
+    start = time.perf_counter()
+    errors = await run_pool([job() for _ in range(args.profile_requests)], args.concurrency)
+    return latencies, errors, time.perf_counter() - start, {}
+
+
+ASYNC_WORKLOADS = {
+    "stockdata": workload_stockdata,
+    "hist": workload_hist,
+    "sse": workload_sse,
+    "news": workload_news,
+    "profile": workload_profile,
+}
+
+
+# ---------- main ----------
+
+def prepare_workdir():
+    """storage/ ของ benchmark อยู่ใน temp dir แยก (ไฟล์ข้อมูล CSV/JSON เช่น market_holidays.json ลิงก์มาจาก repo)"""
+    workdir = tempfile.mkdtemp(prefix="stocksignal-bench-")
+    for name in os.listdir(REPO_ROOT):
+        if name.endswith((".csv", ".json")) and os.path.isfile(os.path.join(REPO_ROOT, name)):
+            os.symlink(os.path.join(REPO_ROOT, name), os.path.join(workdir, name))
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_ROOT)
+    return workdir
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    selected = [w.strip() for w in args.workloads.split(",") if w.strip()]
+    unknown = set(selected) - set(WORKLOADS)
+    if unknown:
+        raise SystemExit(f"Unknown workload(s): {', '.join(sorted(unknown))}")
+
+    invocation_dir = os.getcwd()
+    workdir = prepare_workdir()
+    os.environ["QUOTE_REFRESH_SECONDS"] = str(args.sse_refresh)
+    random.seed(args.seed)
+
+    import httpx
+    import main as app_main
+    from bench.fakes import FakeConfig, install
+
+    logging.getLogger().setLevel(args.log_level)
+    for name in list(logging.root.manager.loggerDict):
+        logging.getLogger(name).setLevel(args.log_level)
+
+    config = FakeConfig(tv_latency=args.tv_latency, tv_failure_rate=args.tv_failure_rate,
+                        tv_empty_rate=args.tv_empty_rate, http_latency=args.http_latency,
+                        rss_latency=args.rss_latency, seed=args.seed)
+    fakes = install(config)
+
+    server, thread, base_url = start_server(app_main.app)
+    ctx = {"args": args, "main": app_main, "symbols": app_main.symbol_universe.symbols()}
+
+    # /StockData ต้องมี snapshot ก่อน ถ้าไม่ได้เลือก cron ให้ refresh ชุดเล็กๆ ไว้ก่อน
+    if "stockdata" in selected and "cron" not in selected:
+        app_main.snapshot_refresher.shard_size = 500
+        app_main.snapshot_refresher.refresh_next_shard()
+
+    sampler = RssSampler()
+    sampler.start()
+    results = []
+    print(f"benchmark: {', '.join(selected)} | workdir {workdir} | {base_url}")
+
+    async def run_async(name):
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        timeout = httpx.Timeout(120.0)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+            return await ASYNC_WORKLOADS[name](ctx, client)
+
+    try:
+        for name in WORKLOADS:
+            if name not in selected:
+                continue
+            sampler.reset()
+            if name == "cron":
+                latencies, errors, elapsed, info = workload_cron(ctx)
+            else:
+                latencies, errors, elapsed, info = asyncio.run(run_async(name))
+            result = summarize(name, latencies, errors, elapsed, sampler.peak,
+                               items=info.get("items"), extra=info.get("extra"))
+            results.append(result)
+            print(f"  {name}: {result['throughput']}/s p95 {result['p95_ms']}ms errors {errors}")
+    finally:
+        sampler.stop()
+        server.should_exit = True
+        thread.join(timeout=10)
+        os.chdir(invocation_dir)
+        if not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print()
+    print_table(results)
+    upstream_calls = {"tradingview": sum(client.calls for client in fakes["tv"]), "http": fakes["http"].calls}
+    print(f"\nupstream calls: {upstream_calls}")
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "args": vars(args),
+        "fakes": asdict(config),
+        "upstream_calls": upstream_calls,
+        "results": results,
+    }
+    if args.save:
+        with open(os.path.join(invocation_dir, args.save), "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(os.path.join(invocation_dir, args.baseline)) as f:
+            problems = compare(results, json.load(f), args.max_regression)
+        if problems:
+            print("\n❌ performance regression:")
+            for problem in problems:
+                print(f"  - {problem}")
+            return 1
+        print("\n✅ ไม่มี regression เกิน baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import asyncio
+import threading
+import logging
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamUnavailable(Exception):
+    """
+    upstream รับงานไม่ได้ตอนนี้ (ไม่ผูกกับ web framework)
+    main.py แปลงเป็น response ด้วย status_code + header Retry-After เมื่อหลุดถึง route
+    """
+
+    def __init__(self, status_code, detail, retry_after=None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+    @property
+    def headers(self):
+        return {"Retry-After": str(self.retry_after)} if self.retry_after is not None else None
+
+
+class UpstreamBusy(UpstreamUnavailable):
+    def __init__(self, name, retry_after):
+        super().__init__(503, f"Upstream '{name}' is busy, please retry later", retry_after)
+
+
+class UpstreamTimeout(UpstreamUnavailable):
+    def __init__(self, name, timeout):
+        super().__init__(504, f"Upstream '{name}' did not respond within {timeout}s")
+
+
+class BoundedExecutor:
+    """
+    thread pool แยกต่อ upstream พร้อมจำกัดจำนวนงานที่รอคิว
+    งานเกิน max_workers + max_queue จะถูกปฏิเสธทันทีด้วย 503 + Retry-After
+    เพื่อไม่ให้ code ที่ block (selenium, requests, feedparser, tv.get_hist) ไปค้าง event loop
+    """
+
+    def __init__(self, name, max_workers, max_queue, timeout, retry_after=5):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"upstream-{name}")
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "pending": self.pending,
+                "queued": max(0, self.pending - self.max_workers),
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+            }
+
+    def _release(self, _future):
+        # นับคืนเมื่อ thread ทำงานเสร็จจริง (ไม่ใช่ตอน timeout) จะได้ไม่รับงานเกินจำนวน thread ที่ว่าง
+        with self._lock:
+            self.pending -= 1
+
+    def submit(self, fn, *args, **kwargs):
+        with self._lock:
+            if self.pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise UpstreamBusy(self.name, self.retry_after)
+            self.pending += 1
+        try:
+            future = self.executor.submit(partial(fn, *args, **kwargs))
+        except Exception:
+            with self._lock:
+                self.pending -= 1
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, fn, *args, **kwargs):
+        future = asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+        try:
+            return await asyncio.wait_for(future, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            logger.warning(f"⏱️ {self.name}: {getattr(fn, '__name__', fn)} เกิน {self.timeout}s")
+            raise UpstreamTimeout(self.name, self.timeout)
+
+    async def run_batch(self, fn, arg_list):
+        """
+        รันงานหลายชิ้นบน thread pool เดียวกันกับ run()
+        รับหรือปฏิเสธทั้ง batch ครั้งเดียวตอนเข้า (batch ที่ใหญ่กว่าคิวจึงไม่โดน 503 ครึ่งทาง)
+        แต่ละชิ้นยังนับใน pending จนกว่า thread จะทำเสร็จ คืนผลตามลำดับ arg_list (exception คืนเป็นค่า)
+        """
+        with self._lock:
+            if self.pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise UpstreamBusy(self.name, self.retry_after)
+            self.pending += len(arg_list)
+        futures = []
+        try:
+            for args in arg_list:
+                future = self.executor.submit(partial(fn, *args))
+                future.add_done_callback(self._release)
+                futures.append(future)
+        except Exception:
+            with self._lock:
+                self.pending -= len(arg_list) - len(futures)
+            for future in futures:
+                future.cancel()
+            raise
+
+        gathered = asyncio.gather(*(asyncio.wrap_future(f) for f in futures), return_exceptions=True)
+        try:
+            return await asyncio.wait_for(gathered, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            logger.warning(f"⏱️ {self.name}: batch {getattr(fn, '__name__', fn)} x{len(arg_list)} เกิน {self.timeout}s")
+            raise UpstreamTimeout(self.name, self.timeout)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+# หนึ่ง pool ต่อ upstream
+set_pool = BoundedExecutor("set", max_workers=4, max_queue=8, timeout=90, retry_after=10)
+tradingview_pool = BoundedExecutor("tradingview", max_workers=8, max_queue=32, timeout=20)
+tvdatafeed_pool = BoundedExecutor("tvdatafeed", max_workers=5, max_queue=20, timeout=30)
+news_pool = BoundedExecutor("news", max_workers=8, max_queue=32, timeout=20)
+# poller ราคาของ SSE/WebSocket แยกจาก tvdatafeed_pool จะได้ไม่แย่งคิวกับ request ของผู้ใช้
+# คิวยาวเพราะ poll ที่รออยู่แค่ช้าลง ไม่มีใครรอ response
+quote_poller_pool = BoundedExecutor("quote_poller", max_workers=4, max_queue=200, timeout=60)
+
+upstream_pools = {pool.name: pool for pool in [set_pool, tradingview_pool, tvdatafeed_pool, news_pool, quote_poller_pool]}
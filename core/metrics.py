@@ -0,0 +1,41 @@
+import time
+from contextlib import contextmanager
+from prometheus_client import Counter, Histogram, CollectorRegistry
+
+# registry แยกของแอป (ไม่เอา metric ของ process/platform default มาปน)
+registry = CollectorRegistry(auto_describe=True)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+upstream_request_duration = Histogram(
+    "upstream_request_duration_seconds", "Latency of calls to upstream services",
+    ["upstream", "operation", "outcome"], buckets=LATENCY_BUCKETS, registry=registry,
+)
+upstream_retries = Counter(
+    "upstream_retries_total", "Retries of upstream calls",
+    ["upstream", "reason"], registry=registry,
+)
+cache_requests = Counter(
+    "cache_requests_total", "Cache lookups by result",
+    ["cache", "result"], registry=registry,
+)
+
+
+@contextmanager
+def observe_upstream(upstream, operation):
+    """จับเวลา call ไป upstream แยก outcome ok/error"""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        upstream_request_duration.labels(upstream, operation, outcome).observe(time.perf_counter() - start)
+
+
+def timed_upstream(upstream, operation, fn):
+    """ห่อ fn ให้จับเวลาทุกครั้งที่เรียก (ใช้กับ executor.map ได้)"""
+    def wrapper(*args, **kwargs):
+        with observe_upstream(upstream, operation):
+            return fn(*args, **kwargs)
+    return wrapper
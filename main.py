@@ -1,16 +1,34 @@
-from fastapi import FastAPI, HTTPException, Request, status
-from fastapi.responses import StreamingResponse, JSONResponse
-import pandas as pd
-from Scraper.StockFundamental import scrape_stock_data, trading_view_stock_data
-from Scraper.HistoricalData import get_historical_data, get_stock_price, event_generator, get_cron_stock_price
-from news.news import get_news
+from fastapi import FastAPI, HTTPException, Request, Query, WebSocket, status
+from fastapi.responses import StreamingResponse, JSONResponse, Response
+from fastapi.concurrency import run_in_threadpool
+from typing import Optional
+from functools import partial
+import threading
+from Scraper.StockFundamental import scrape_stock_data, trading_view_stock_data, harvest_set_cookies
+from Scraper.DriverPool import driver_pool
+from Scraper.TvSessionPool import tv_pool
+from Scraper.Upstream import upstreams
+from Scraper.FundamentalsCache import get_company_data, get_company_profile, peek_company_data, peek_company_profile, company_data_cache, company_profile_cache
+from Scraper.HistoricalData import quote_hub, get_historical_data, get_historical_frame, get_historical_data_batch, get_stock_signals, get_stock_price, event_generator, get_cron_stock_price, parse_interval, MAX_BARS
+from Scraper.SymbolUniverse import symbol_universe
+from Scraper.SymbolStore import symbol_store
+from Scraper.SnapshotRefresher import SnapshotRefresher, SNAPSHOT_REFRESH_MINUTES
+from Scraper.MarketHours import market_hours
+from Scraper.QuoteScheduler import QuoteScheduler, demand_tracker
+from Scraper.QuoteJournal import quote_journal, to_series
+from news.news import get_news, get_news_cached, get_news_batch, news_cache, favicon_cache
+from api.snapshot_cache import SnapshotCache
+from core.executors import UpstreamUnavailable, set_pool, tradingview_pool, tvdatafeed_pool, news_pool, upstream_pools
+from api.quote_ws import QuoteSocket
+from api.metrics import registry, StatsCollector, http_request_duration, render_metrics
 import logging
+import time
 from apscheduler.schedulers.background import BackgroundScheduler
 from datetime import datetime
 import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-import csv, json
+import json
 
 #uvicorn main:app --reload --port 3007
 
@@ -33,6 +51,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# metric ของ pool/cache/upstream อ่านจาก stats() ตอน /metrics ถูก scrape
+registry.register(StatsCollector(
+    caches={cache.name: cache for cache in (company_data_cache, company_profile_cache, news_cache, favicon_cache)},
+    executors=upstream_pools,
+    upstreams=upstreams,
+    tv_pool=tv_pool,
+    driver_pool=driver_pool,
+    quote_hub=quote_hub,
+))
+
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # ใช้ path template ของ route (เช่น /getHistData/{symbol}) ไม่ให้ label แตกตาม symbol
+        route = request.scope.get("route")
+        route_path = route.path if route is not None else "unmatched"
+        http_request_duration.labels(request.method, route_path, str(status_code)).observe(time.perf_counter() - start)
+
 # โหลดข้อมูล CSV ตอนเริ่มเซิร์ฟเวอร์
 # df = pd.read_csv("StockData.csv")
 
@@ -41,75 +83,139 @@ logger = logging.getLogger("uvicorn.error")
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# def load_symbols_from_csv():
-#     symbols = []
-#     csv_file = "StockData.csv"
-#     with open(csv_file, mode="r", encoding="utf-8") as file:
-#         reader = csv.DictReader(file)
-#         symbols = [row["symbol"] for row in reader if row.get("symbol")]
-#     return symbols
-
-# def fetch_stock_data_routine():
-#     try:
-#         # symbols = [
-#         #     "ADVANC", "AOT", "AWC", "BANPU", "BBL", "BCP", "BDMS", "BEM", "BH", "BJC",
-#         #     "BTS", "CBG", "CCET", "COM7", "CPALL", "CPF", "CPN", "CRC", "DELTA", "EGCO",
-#         #     "GPSC", "GULF", "HMPRO", "IVL", "KBANK", "KKP", "KTB", "KTC", "LH", "MINT",
-#         #     "MTC", "OR", "OSP", "PTT", "PTTEP", "PTTGC", "RATCH", "SCB", "SCC", "SCGP",
-#         #     "TCAP", "TIDLOR", "TISCO", "TLI", "TOP", "TRUE", "TTB", "TU", "VGI", "WHA"
-#         # ]
-
-#         symbols = load_symbols_from_csv()
-
-#         result, failed_symbols = get_cron_stock_price(symbols, max_retries=5)
-
-#         if failed_symbols:
-#             logger.warning(f"❌ ยังมี {len(failed_symbols)} ตัวที่ดึงข้อมูลไม่สำเร็จหลัง retry: {failed_symbols}")
-
-#         if not result:
-#             logger.warning("No stock data fetched.")
-#             return
-
-#         filename = 'StockData.json'
-#         filepath = os.path.join(STORAGE_FOLDER, filename)
-
-#         with open(filepath, "w", encoding="utf-8") as f:
-#             json.dump(result, f, ensure_ascii=False, indent=4)
-
-#         logger.info(f"📊 บันทึกข้อมูลหุ้นทั้งหมด {len(result)} ตัวลงไฟล์ {filename}")
-
-#     except Exception as e:
-#         logger.error(f"Error in stock data routine: {e}")
-
+# รีเฟรชราคาหุ้นทีละ shard แล้ว merge ลง storage/StockData.json
+# shard เลือกตามเวลาเปิดตลาด + demand (/StockData, SSE, request รายตัว) แทนการวนตามลำดับไฟล์
+snapshot_cache = SnapshotCache(os.path.join(STORAGE_FOLDER, 'StockData.json'))
+quote_scheduler = QuoteScheduler(market_hours, demand_tracker, live_subscribers=quote_hub.subscriber_counts)
+snapshot_refresher = SnapshotRefresher(
+    STORAGE_FOLDER,
+    fetch=lambda symbols: get_cron_stock_price(symbols, max_retries=3),
+    on_write=snapshot_cache.refresh,
+    scheduler=quote_scheduler,
+    journal=quote_journal,
+)
 
-# # เริ่ม Scheduler เมื่อแอปเปิดใช้งาน
-# @app.on_event("startup")
-# def start_scheduler():
-#     # 1️⃣ ดึงข้อมูลทันทีเมื่อแอปเริ่มทำงาน
-#     logger.info("Fetching stock data immediately at startup...")
-#     fetch_stock_data_routine()
+# สถานะสำหรับ /readyz: server เปิดรับ request ได้ทันที แต่จะบอก load balancer ว่าพร้อม
+# ก็ต่อเมื่อ warm-up เบื้องหลังเสร็จ (โหลด symbol, login TvDatafeed) และยังไม่ได้เริ่ม shutdown
+startup_state = {"warmed_at": None, "shutting_down": False}
 
-#     # 2️⃣ ค่อยเริ่ม routine ทำงานทุก 5 นาทีตามปกติ
-#     scheduler.add_job(fetch_stock_data_routine, "interval", hours=4)
-#     scheduler.start()
-#     logger.info("Scheduler started.")
+def warm_up():
+    start = time.monotonic()
+    try:
+        symbol_universe.ensure_loaded()
+        symbol_store.ensure_loaded()
+        # library ที่ import ช้า (pandas/numpy ของ data path, bs4, feedparser) โหลดไว้ก่อน request แรกที่ต้องใช้
+        import bs4, feedparser  # noqa: F401
+        import api.hist_formats, Scraper.BarStore  # noqa: F401
+        schedule_screener()
+        tv_pool.warm()
+    except Exception as e:
+        logger.error(f"Error in warm-up: {e}")
+    startup_state["warmed_at"] = time.time()
+    logger.info(f"🔥 warm-up เสร็จใน {time.monotonic() - start:.1f}s")
+
+def schedule_screener():
+    # เติม matrix ของ screener ทีละ shard จากแท่งรายวันใน bar store
+    # เพิ่ม job จาก warm-up เพราะ screener import numpy/pandas
+    from signals.screener import screener, SCREENER_REFRESH_MINUTES
+    scheduler.add_job(
+        screener.refresh_next_shard,
+        "interval",
+        minutes=SCREENER_REFRESH_MINUTES,
+        next_run_time=datetime.now(),
+        max_instances=1,
+        coalesce=True,
+    )
 
-# @app.on_event("shutdown")
-# def shutdown_scheduler():
-#     scheduler.shutdown()
-#     logger.info("Scheduler stopped.")
+# เริ่ม Scheduler เมื่อแอปเปิดใช้งาน
+@app.on_event("startup")
+def start_scheduler():
+    # shard แรกเริ่มทันทีใน background ไม่ block การเปิด server
+    scheduler.add_job(
+        snapshot_refresher.refresh_next_shard,
+        "interval",
+        minutes=SNAPSHOT_REFRESH_MINUTES,
+        next_run_time=datetime.now(),
+        max_instances=1,
+        coalesce=True,
+    )
+    # เก็บ cookie ของ set.or.th ให้ /CompanyData เรียก JSON API ตรงได้โดยไม่ต้องเปิด browser
+    scheduler.add_job(
+        harvest_set_cookies,
+        "interval",
+        minutes=30,
+        next_run_time=datetime.now(),
+        max_instances=1,
+        coalesce=True,
+    )
+    scheduler.start()
+    logger.info("Scheduler started.")
+
+    # เปิด Chrome สำหรับ /CompanyData รอไว้ล่วงหน้า
+    driver_pool.warm_in_background()
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+@app.on_event("shutdown")
+def shutdown_scheduler():
+    startup_state["shutting_down"] = True
+    scheduler.shutdown(wait=False)
+    logger.info("Scheduler stopped.")
+    driver_pool.close()
+    for pool in upstream_pools.values():
+        pool.shutdown()
 
 @app.get("/")
 async def hello_world():
     return {"message": "This is G2 StockSignal Project API any issue please contact Punt Web dev"}
 
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    checks = {
+        "warmed": startup_state["warmed_at"] is not None,
+        "symbols_loaded": symbol_universe.loaded and symbol_store.loaded,
+        "tv_session": tv_pool.ready(),
+        "accepting": not startup_state["shutting_down"],
+    }
+    ready = all(checks.values())
+    return JSONResponse(status_code=200 if ready else 503,
+                        content={"status": "ready" if ready else "starting", "checks": checks})
+
+@app.get("/tvSessions")
+async def get_tv_sessions():
+    # สถานะของ TvDatafeed session แต่ละตัวใน pool (จำนวนครั้งที่ login, error, เวลาเฉลี่ยต่อ call)
+    return tv_pool.stats()
+
+@app.get("/metrics")
+async def get_metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/upstreams")
+async def get_upstreams():
+    # rate ปัจจุบันของ token bucket และสถานะ circuit breaker ของแต่ละ upstream
+    return {name: upstream.stats() for name, upstream in upstreams.items()}
+
+@app.get("/markets")
+async def get_markets():
+    return {"markets": market_hours.status(), "scheduler": quote_scheduler.stats()}
+
 @app.get("/CompanyData/{symbol}")
 async def get_live_stock_data(symbol: str):
+    demand_tracker.watch([symbol])
     try:
-        data = scrape_stock_data(symbol)
+        # cache hit ใน memory ตอบได้เลย ไม่ต้องเข้าคิว thread pool (cache บน disk อ่านใน pool ผ่าน get)
+        data = peek_company_data(symbol)
+        if data is None:
+            data = await set_pool.run(get_company_data, symbol)
         if not data:
             raise HTTPException(status_code=404, detail=f"No live stock data found for symbol '{symbol}'")
         return data
+    except (HTTPException, UpstreamUnavailable):
+        raise
     except Exception as e:
         logger.error(f"Error fetching live stock data for {symbol}: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
@@ -117,34 +223,226 @@ async def get_live_stock_data(symbol: str):
 @app.get("/CompanyProfile/{symbol}")
 async def trading_view_scraper(symbol: str):
     try:
-        matched_row = None
-        with open('StockData.csv', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                if row['symbol'].endswith(symbol):
-                    matched_row = row
-                    break
-        
+        matched_row = symbol_universe.resolve(symbol)
+        if matched_row is None:
+            raise HTTPException(status_code=404, detail=f"Unknown symbol '{symbol}'")
+
         stock_symbol = matched_row['symbol'].replace(':', '-')
-        data = trading_view_stock_data(stock_symbol)
+        data = peek_company_profile(stock_symbol)
+        if data is None:
+            data = await tradingview_pool.run(get_company_profile, stock_symbol)
         if not data:
             raise HTTPException(status_code=404, detail=f"No live stock data found for symbol '{symbol}'")
         return data
+    except (HTTPException, UpstreamUnavailable):
+        raise
     except Exception as e:
         logger.error(f"Error fetching live stock data for {symbol}: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
+def get_historical_columns(symbol, bars_count, interval, start=None, end=None, indicators=None):
+    from api.hist_formats import to_columns
+    df = get_historical_frame(symbol, bars_count, interval, start, end, indicators)
+    if df is None or df.empty:
+        return None
+    return to_columns(df)
+
+@app.get("/getHistData")
+async def get_stock_historical_data_batch(
+    symbols: str,
+    bars: int = Query(1000, ge=1, le=MAX_BARS),
+    interval: str = "4h",
+    format: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    indicators: Optional[str] = None,
+):
+    # เช่น /getHistData?symbols=PTT,CPALL,NASDAQ:AAPL&bars=500&interval=1d&format=columns&start=2025-01-01&indicators=sma20,rsi
+    from Scraper.Resample import to_timestamp
+    from signals.signals import parse_indicators
+    symbol_list = [s.strip() for s in symbols.split(",") if s.strip()]
+
+    if not symbol_list:
+        raise HTTPException(status_code=400, detail="No symbols provided")
+    if len(symbol_list) > 50:
+        raise HTTPException(status_code=400, detail="Too many symbols (max 50)")
+    if format not in (None, "json", "columns"):
+        raise HTTPException(status_code=400, detail="Batch endpoint supports format=json or format=columns")
+    # รายการ symbol ที่ client ขอพร้อมกันคือ watchlist ของผู้ใช้
+    demand_tracker.watch(symbol_list)
+    try:
+        interval = parse_interval(interval)
+        to_timestamp(start), to_timestamp(end)
+        indicator_list = parse_indicators(indicators)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    loader = get_historical_columns if format == "columns" else get_historical_data
+    loader = partial(loader, indicators=indicator_list)
+    return await get_historical_data_batch(symbol_list, bars, interval, loader, start, end)
+
 @app.get("/getHistData/{symbol}")
-async def get_stock_historical_data(symbol: str):
+async def get_stock_historical_data(
+    request: Request,
+    symbol: str,
+    bars: int = Query(1000, ge=1, le=MAX_BARS),
+    interval: str = "4h",
+    format: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    indicators: Optional[str] = None,
+):
+    from Scraper.Resample import to_timestamp
+    from signals.signals import parse_indicators
+    from api.hist_formats import negotiate_format, hist_response, UnsupportedFormat
+
+    try:
+        interval = parse_interval(interval)
+        to_timestamp(start), to_timestamp(end)
+        indicator_list = parse_indicators(indicators)
+        fmt = negotiate_format(format, request.headers.get("accept"))
+    except (ValueError, UnsupportedFormat) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    demand_tracker.watch([symbol])
     try:
-        data = get_historical_data(symbol)
+        if fmt == "json":
+            data = await tvdatafeed_pool.run(get_historical_data, symbol, bars, interval, start, end, indicator_list)
+        else:
+            # columns / ndjson / csv / msgpack / arrow ใช้ timestamp เป็น epoch วินาที
+            data = await tvdatafeed_pool.run(get_historical_frame, symbol, bars, interval, start, end, indicator_list)
+            if data is not None and not data.empty:
+                return hist_response(data, fmt)
+            data = None
         if not data:
             raise HTTPException(status_code=404, detail=f"No historical data found for symbol '{symbol}'")
         return data
+    except (HTTPException, UpstreamUnavailable):
+        raise
+    except UnsupportedFormat as e:
+        raise HTTPException(status_code=406, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching historical data for {symbol}: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
+@app.get("/signals/{symbol}")
+async def get_signals_endpoint(
+    symbol: str,
+    interval: str = "1d",
+    bars: int = Query(1000, ge=50, le=MAX_BARS),
+    lookback: int = Query(50, ge=1, le=MAX_BARS),
+    indicators: Optional[str] = None,
+):
+    # เช่น /signals/PTT?interval=1d&indicators=sma50,sma200,rsi,macd
+    from signals.signals import parse_indicators, DEFAULT_SIGNAL_INDICATORS
+    try:
+        interval = parse_interval(interval)
+        indicator_list = parse_indicators(indicators or DEFAULT_SIGNAL_INDICATORS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    demand_tracker.watch([symbol])
+
+    try:
+        data = await tvdatafeed_pool.run(get_stock_signals, symbol, interval, bars, lookback, indicator_list)
+        if not data:
+            raise HTTPException(status_code=404, detail=f"No historical data found for symbol '{symbol}'")
+        return data
+    except (HTTPException, UpstreamUnavailable):
+        raise
+    except Exception as e:
+        logger.error(f"Error computing signals for {symbol}: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+@app.get("/search")
+def search_symbols(
+    q: str,
+    market: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=50),
+):
+    # เช่น /search?q=ptt, /search?q=ธนาคาร&market=SET (def ธรรมดา: ครั้งแรกอาจต้อง compile store ไม่ให้ block event loop)
+    try:
+        return {"query": q, "data": symbol_store.search(q, market, limit)}
+    except Exception as e:
+        logger.error(f"Error in symbol search: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+@app.get("/intraday/{symbol}")
+def get_intraday(symbol: str, start: Optional[str] = None, end: Optional[str] = None, at: Optional[str] = None):
+    # อ่านจาก journal อย่างเดียว ไม่เรียก TradingView
+    # เวลาที่ไม่มี offset เป็นเวลาท้องถิ่นของตลาด (exchange ที่ไม่รู้จักเป็น UTC) ระบุ offset เองหรือใช้ epoch ก็ได้
+    # เช่น /intraday/PTT (วันล่าสุด), /intraday/PTT?start=2026-10-19T10:00&end=2026-10-19T12:00, /intraday/PTT?at=2026-10-19T11:00
+    from Scraper.Resample import to_timestamp
+    matched_row = symbol_universe.resolve(symbol)
+    if matched_row is None:
+        raise HTTPException(status_code=404, detail="Symbol not found")
+    full_symbol = matched_row["symbol"]
+
+    timezone = market_hours.timezone(full_symbol.split(":", 1)[0])
+    try:
+        start_ts, end_ts, at_ts = (to_timestamp(v, timezone) for v in (start, end, at))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        if at_ts is not None:
+            record = quote_journal.quote_at(full_symbol, at_ts.value // 10**9)
+            if record is None:
+                raise HTTPException(status_code=404, detail="No journaled quote before this time")
+            return {"symbol": full_symbol, "timestamp": int(record["ts"]),
+                    "stockPrice": round(float(record["price"]), 4), "changePct": round(float(record["change"]), 4)}
+
+        records = quote_journal.records(
+            full_symbol,
+            start_ts.value // 10**9 if start_ts is not None else None,
+            end_ts.value // 10**9 if end_ts is not None else None,
+        )
+        return to_series(full_symbol, records)
+    except (HTTPException, UpstreamUnavailable):
+        raise
+    except Exception as e:
+        logger.error(f"Error reading quote journal: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+@app.get("/sparklines")
+def get_sparklines(symbols: str, points: int = Query(50, ge=2, le=500)):
+    # เช่น /sparklines?symbols=PTT,CPALL,NASDAQ:AAPL (series ระหว่างวันล่าสุดของแต่ละตัวจาก journal)
+    symbol_list = [s.strip() for s in symbols.split(",") if s.strip()]
+    if not symbol_list:
+        raise HTTPException(status_code=400, detail="No symbols provided")
+    if len(symbol_list) > 200:
+        raise HTTPException(status_code=400, detail="Too many symbols (max 200)")
+
+    try:
+        data = {}
+        for symbol in symbol_list:
+            matched_row = symbol_universe.resolve(symbol)
+            if matched_row is None:
+                data[symbol] = None
+                continue
+            full_symbol = matched_row["symbol"]
+            data[symbol] = to_series(full_symbol, quote_journal.sparkline(full_symbol, points))
+        return {"data": data}
+    except Exception as e:
+        logger.error(f"Error reading quote journal: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+@app.get("/screener")
+async def get_screener(
+    filter: Optional[str] = None,
+    sort: Optional[str] = "-change_pct",
+    market: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=1000),
+):
+    # เช่น /screener?market=SET&sort=-change_pct (top movers), /screener?filter=rsi14<30,close>sma50
+    from signals.screener import screener
+    try:
+        return screener.query(filter, sort, market, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in screener query: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
 # @app.get("/StockData/{symbol_list}")
 # async def get_favorite_stocks(symbol_list: str):
 #     try:
@@ -165,49 +463,102 @@ async def get_stock_historical_data(symbol: str):
 #         logger.error(f"Error fetching favorite stocks: {e}")
 #         raise HTTPException(status_code=500, detail="Internal Server Error")
 
-@app.get("/StockData")
-async def get_all_stock_data():
-    file_path = os.path.join(STORAGE_FOLDER, 'StockData.json')
-
-    if not os.path.exists(file_path):
+def encode_stock_data(stock_market, page, page_size, fields, accept_encoding):
+    if not os.path.exists(snapshot_cache.path):
         raise HTTPException(status_code=404, detail="Data file not found")
+    body = snapshot_cache.get(stock_market, page, page_size, fields)
+    if not snapshot_cache.data:
+        raise HTTPException(status_code=404, detail="No stock data available")
+    encoding, content = body.negotiate(accept_encoding)
+    return body, encoding, content
 
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)  # data เป็น list of dict
-
-        if not data:
-            raise HTTPException(status_code=404, detail="No stock data available")
+@app.get("/StockData")
+async def get_all_stock_data(
+    request: Request,
+    stockMarket: Optional[str] = None,
+    page: Optional[int] = Query(None, ge=1),
+    page_size: int = Query(500, ge=1, le=5000),
+    fields: Optional[str] = None,
+):
+    if stockMarket:
+        demand_tracker.hit_market(stockMarket.split(","))
 
-        return JSONResponse(content={"data": data})
+    try:
+        # stat ไฟล์ / rebuild snapshot / gzip-brotli ของ variant ใหม่ ทำใน threadpool ไม่ให้ค้าง event loop
+        body, encoding, content = await run_in_threadpool(
+            encode_stock_data, stockMarket, page, page_size if page is not None else None, fields,
+            request.headers.get("accept-encoding"),
+        )
+
+        headers = snapshot_cache.headers(body.etag)
+        if snapshot_cache.is_not_modified(
+            body.etag,
+            request.headers.get("if-none-match"),
+            request.headers.get("if-modified-since"),
+        ):
+            return Response(status_code=304, headers=headers)
+
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(content=content, media_type="application/json", headers=headers)
+
+    except (HTTPException, UpstreamUnavailable):
+        raise
 
     except json.JSONDecodeError:
         raise HTTPException(status_code=500, detail="Data file is corrupted")
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {e}")
-    
+
 @app.get("/streamStockPrice")
 async def stream_stock_price(symbols: str):
     symbol_list = symbols.split(",")
+    demand_tracker.watch(symbol_list)
     return StreamingResponse(event_generator(symbol_list), media_type="text/event-stream")
 
+@app.websocket("/ws/quotes")
+async def quote_socket(websocket: WebSocket, throttle_ms: int = 0):
+    # subscribe/unsubscribe ได้ตลอดบน connection เดียว ส่ง snapshot ครั้งแรกแล้วตามด้วยเฉพาะราคาที่เปลี่ยน (ดู api/quote_ws.py)
+    await QuoteSocket(websocket, quote_hub, symbol_universe, throttle_ms).run()
+
 @app.get("/news/{symbol}/{stock_market}/{thai_name}/{eng_name}")
 async def get_news_endpoint(symbol: str, stock_market: str, thai_name: str, eng_name: str): #symbol, stock_market, thai_name, eng_name
     try:
         logger.info(f"📥 Getting news for symbol={symbol}, stock_market={stock_market}, eng_name={eng_name}, thai_name={thai_name}")
-        data = get_news(symbol, stock_market, thai_name, eng_name)
+        data = await news_pool.run(get_news_cached, symbol, stock_market, thai_name, eng_name)
         return data
     except Exception as e:
         logger.error(f"❌ Error fetching news data for {symbol}: {e}")
         raise
 
+@app.get("/news")
+async def get_news_batch_endpoint(symbols: str, limit: int = Query(3, ge=1, le=20)):
+    # เช่น /news?symbols=SET:PTT,CPALL,NASDAQ:AAPL
+    symbol_list = [s.strip() for s in symbols.split(",") if s.strip()]
+
+    if not symbol_list:
+        raise HTTPException(status_code=400, detail="No symbols provided")
+    if len(symbol_list) > 50:
+        raise HTTPException(status_code=400, detail="Too many symbols (max 50)")
+
+    return await news_pool.run(get_news_batch, symbol_list, limit)
+
 # จัดการ error ทั่วไปไม่ถูกจับใน route
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     return JSONResponse(
         status_code=exc.status_code,
         content={"error": exc.detail},
+        headers=getattr(exc, "headers", None),
+    )
+
+@app.exception_handler(UpstreamUnavailable)
+async def upstream_exception_handler(request: Request, exc: UpstreamUnavailable):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"error": exc.detail},
+        headers=exc.headers,
     )
 
 @app.exception_handler(Exception)
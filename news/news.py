@@ -1,55 +1,41 @@
 import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urlparse, urljoin, quote
-import feedparser
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
 import time
-from selenium.common.exceptions import TimeoutException
-
-def find_favicon_link(url):
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")  # รันแบบไม่เปิด browser
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920x1080")
-
-    service = Service("D:/DesperateProject/IdeatradeIntern/scrapSet/chromedriver-win64/chromedriver.exe")
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-
-    try:
-        driver.set_page_load_timeout(1)
-        driver.get(url)
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-    except TimeoutException:
-        driver.execute_script("window.stop();")
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-    finally:
-        driver.quit()
-
-    parsed = urlparse(url)
-    root_url = f"{parsed.scheme}://{parsed.netloc}"
-
-    for link in soup.find_all('link'):
-        href = link.get('href')
-        if href and "favicon.ico" in href.lower():
-            # ถ้า href ไม่ใช่ full URL ให้แปลงเป็น full URL
-            if not href.startswith("http"):
-                href = urljoin(root_url, href)
-            return href
-
-    return urljoin(root_url, "/favicon.ico")
-
-def get_favicons(url):
+from concurrent.futures import ThreadPoolExecutor
+from Scraper.TtlCache import TtlCache
+from core.metrics import observe_upstream, timed_upstream
+from Scraper.SymbolUniverse import symbol_universe
+
+# feed และ favicon ของแต่ละ request ยิงพร้อมกันผ่าน pool นี้
+news_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="news")
+
+favicon_cache = TtlCache(
+    "favicons",
+    ttl=7 * 24 * 60 * 60,
+    stale_ttl=30 * 24 * 60 * 60,
+    max_entries=5000,
+    disk=True,
+    negative_ttl=24 * 60 * 60,
+)
+
+# ข่าวที่ normalize แล้วต่อ (symbol, market) เก็บใน memory อายุสั้น
+NEWS_TTL = 5 * 60
+news_cache = TtlCache("news", ttl=NEWS_TTL, stale_ttl=2 * NEWS_TTL, max_entries=2000, negative_ttl=60)
+
+# batch แยก pool จาก news_executor เพราะ get_news ใช้ news_executor ข้างใน (กัน deadlock)
+news_batch_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="news-batch")
+
+def fetch_favicons(url):
+    """หา favicon จาก <link rel="icon"> ของหน้าเว็บ (HTTP อย่างเดียว) ไม่เจอคืน []"""
     parsed = urlparse(url)
     root_url = f"{parsed.scheme}://{parsed.netloc}"
     favicons = []
 
-    root_favicon_url = urljoin(root_url, "/favicon.ico")
-
     try:
-        resp = requests.get(url, timeout=3)
-        
+        from bs4 import BeautifulSoup
+        with observe_upstream("favicon", "requests_get"):
+            resp = requests.get(url, timeout=3)
+
         if resp.status_code != 200:
             raise Exception(f"HTTP error: {resp.status_code}")
         soup = BeautifulSoup(resp.text, "html.parser")
@@ -68,15 +54,23 @@ def get_favicons(url):
                         href = urljoin(root_url, href)
                     favicons.append(href)
 
-        if (favicons != []):
-            return favicons
-        else: 
-            return [root_favicon_url]
+        return favicons
     except Exception:
-        favicon = find_favicon_link(url)
-        return [favicon]
+        return []
+
+def get_favicons(url):
+    """
+    favicon ของเว็บต้นทาง cache ต่อ domain (เก็บลง disk, อายุยาว)
+    ถ้าหาไม่เจอจะ cache ผลว่างไว้ 1 วัน แล้วใช้ /favicon.ico ของ root แทนโดยไม่เปิด browser
+    """
+    parsed = urlparse(url)
+    root_url = f"{parsed.scheme}://{parsed.netloc}"
+
+    favicons = favicon_cache.get(parsed.netloc.lower(), lambda: fetch_favicons(url))
+    if favicons:
+        return favicons
+    return [urljoin(root_url, "/favicon.ico")]
 
-import feedparser
 from urllib.parse import quote
 
 def get_news(symbol, stock_market, thai_name, eng_name, limit=3):
@@ -111,28 +105,33 @@ def get_news(symbol, stock_market, thai_name, eng_name, limit=3):
     #     query = f'"{eng_name}"'
     #     feeds.append(f"https://news.google.com/rss/search?q={quote(query)}")
 
-    # รวมข่าวจากทุก feed
+    # รวมข่าวจากทุก feed (ดึงทุก feed พร้อมกัน)
+    import feedparser  # import ตอนใช้ครั้งแรก ไม่ให้ถ่วงเวลา start server
     all_entries = []
-    for rss_url in feeds:
-        feed = feedparser.parse(rss_url)
+    for feed in news_executor.map(timed_upstream("google_news", "feedparser_parse", feedparser.parse), feeds):
         all_entries.extend(feed.entries)
 
     # เอาเฉพาะข่าวล่าสุด limit รายการ
     all_entries = sorted(all_entries, key=lambda e: e.get("published_parsed", None), reverse=True)[:limit]
 
+    # หา favicon ของทุกข่าวพร้อมกัน
+    def entry_favicons(entry):
+        source_href = entry.get("source", {}).get("href", "")
+        if source_href and source_href.startswith("http"):
+            try:
+                return get_favicons(source_href)
+            except:
+                return []
+        return []
+
+    favicon_results = list(news_executor.map(entry_favicons, all_entries))
+
     data = []
-    for entry in all_entries:
+    for entry, favicons in zip(all_entries, favicon_results):
         source = entry.get("source", {})
         source_title = source.get("title", "")
         source_href = source.get("href", "")
 
-        favicons = []
-        if source_href and source_href.startswith("http"):
-            try:
-                favicons = get_favicons(source_href)
-            except:
-                favicons = []
-
         data.append({
             "title": entry.get("title", ""),
             "published": entry.get("published", ""),
@@ -143,3 +142,37 @@ def get_news(symbol, stock_market, thai_name, eng_name, limit=3):
         })
 
     return data
+
+def get_news_cached(symbol, stock_market, thai_name, eng_name, limit=3):
+    key = (stock_market.upper(), symbol.upper(), limit)
+    return news_cache.get(key, lambda: get_news(symbol, stock_market, thai_name, eng_name, limit))
+
+def get_news_batch(symbol_list, limit=3):
+    """
+    ข่าวของหลาย symbol ในครั้งเดียว ชื่อไทย/อังกฤษเอามาจาก symbol universe
+    คืน {"data": {full_symbol: [...]}, "errors": {symbol: "..."}}
+    """
+    data = {}
+    errors = {}
+    jobs = {}
+
+    for symbol in symbol_list:
+        row = symbol_universe.resolve(symbol)
+        if row is None:
+            errors[symbol] = "Unknown symbol"
+            continue
+        full_symbol = row['symbol']
+        if full_symbol in jobs:
+            continue
+        stock_market, ticker = full_symbol.split(':', 1)
+        jobs[full_symbol] = news_batch_executor.submit(
+            get_news_cached, ticker, stock_market, row['ThaiCompanyName'], row['EngCompanyName'], limit
+        )
+
+    for full_symbol, future in jobs.items():
+        try:
+            data[full_symbol] = future.result()
+        except Exception as e:
+            errors[full_symbol] = str(e)
+
+    return {"data": data, "errors": errors}
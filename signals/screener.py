@@ -0,0 +1,301 @@
+import os
+import re
+import csv
+import time
+import threading
+import logging
+import numpy as np
+import pandas as pd
+from tvDatafeed import Interval
+from Scraper.SymbolUniverse import symbol_universe
+from Scraper.HistoricalData import fetch_bars
+
+logger = logging.getLogger(__name__)
+
+SCREENER_DAYS = int(os.getenv("SCREENER_DAYS", "260"))
+SCREENER_REFRESH_MINUTES = float(os.getenv("SCREENER_REFRESH_MINUTES", "10"))
+# ทั้ง universe ต้องถูก refresh ครบหนึ่งรอบภายในเวลานี้ ขนาด shard คำนวณจากจำนวน symbol
+SCREENER_PASS_MINUTES = float(os.getenv("SCREENER_PASS_MINUTES", "120"))
+# กำหนดเองได้ ถ้าเป็น 0 คำนวณจาก SCREENER_PASS_MINUTES
+SCREENER_SHARD_SIZE = int(os.getenv("SCREENER_SHARD_SIZE", "0"))
+US_STOCK_CSV = "completed_us_stock.csv"
+
+CONDITION_RE = re.compile(r"^\s*([a-z_][a-z0-9_]*)\s*(<=|>=|==|!=|<|>)\s*([a-z_][a-z0-9_]*|-?\d+(?:\.\d+)?)\s*$")
+OPERATORS = {
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "==": np.equal,
+    "!=": np.not_equal,
+}
+
+
+def load_screener_universe():
+    """StockData.csv + หุ้น US ใน completed_us_stock.csv ที่ยังไม่มีใน StockData.csv"""
+    symbol_universe.ensure_loaded()
+    rows = [
+        {"symbol": row["symbol"], "name": row.get("EngCompanyName") or "", "thai_name": row.get("ThaiCompanyName") or "",
+         "logo": row.get("logo") or ""}
+        for row in symbol_universe.rows
+    ]
+    known = {row["symbol"].upper() for row in rows}
+    if os.path.exists(US_STOCK_CSV):
+        with open(US_STOCK_CSV, newline="", encoding="utf-8") as csvfile:
+            for row in csv.DictReader(csvfile):
+                symbol = (row.get("symbol") or "").strip()
+                if symbol and symbol.upper() not in known:
+                    known.add(symbol.upper())
+                    rows.append({"symbol": symbol, "name": row.get("companyName") or "",
+                                 "thai_name": None, "logo": row.get("logo_url") or ""})
+    return rows
+
+
+def last_valid(matrix):
+    """ค่าล่าสุดที่ไม่ใช่ NaN ของแต่ละแถว และ index ของมัน"""
+    valid = ~np.isnan(matrix)
+    idx = matrix.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+    has_value = valid.any(axis=1)
+    values = matrix[np.arange(matrix.shape[0]), idx]
+    values[~has_value] = np.nan
+    return values, idx, has_value
+
+
+def trailing_mean(matrix, end_idx, n):
+    """ค่าเฉลี่ย n วันล่าสุดนับถึง end_idx ของแต่ละแถว (NaN ถ้ามีข้อมูลไม่ครบ n วัน)"""
+    filled = np.nan_to_num(matrix, nan=0.0).astype(np.float64)
+    counts = (~np.isnan(matrix)).astype(np.int32)
+    csum = np.concatenate([np.zeros((matrix.shape[0], 1)), np.cumsum(filled, axis=1)], axis=1)
+    ccount = np.concatenate([np.zeros((matrix.shape[0], 1), dtype=np.int64), np.cumsum(counts, axis=1)], axis=1)
+    rows = np.arange(matrix.shape[0])
+    hi = end_idx + 1
+    lo = np.maximum(hi - n, 0)
+    total = csum[rows, hi] - csum[rows, lo]
+    count = ccount[rows, hi] - ccount[rows, lo]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+    mean[(count < n) | (hi - lo < n)] = np.nan
+    return mean
+
+
+def wilder_rsi(close, n=14):
+    """RSI ของทุก symbol พร้อมกัน วนตามเวลาแต่ละขั้นเป็น vector ops ทั้งคอลัมน์"""
+    filled = pd.DataFrame(close).ffill(axis=1).to_numpy()
+    delta = np.diff(filled, axis=1)
+    delta = np.nan_to_num(delta, nan=0.0)
+    gain = np.clip(delta, 0, None)
+    loss = np.clip(-delta, 0, None)
+    alpha = 1.0 / n
+    avg_gain = np.zeros(close.shape[0])
+    avg_loss = np.zeros(close.shape[0])
+    for t in range(delta.shape[1]):
+        avg_gain = alpha * gain[:, t] + (1 - alpha) * avg_gain
+        avg_loss = alpha * loss[:, t] + (1 - alpha) * avg_loss
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rsi = np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + avg_gain / avg_loss))
+    enough = (~np.isnan(close)).sum(axis=1) > n
+    rsi[~enough] = np.nan
+    return rsi
+
+
+class Screener:
+    """
+    เก็บราคาปิดและ volume รายวันของทุก symbol ไว้ใน numpy array ก้อนเดียว (symbols x วัน)
+    job เบื้องหลังเติมข้อมูลทีละ shard จาก bar store, metric ทั้งตลาดคำนวณแบบ vectorized หลังทุก refresh
+    query เป็นแค่ mask + argsort บน array
+    matrix ถูกสร้างตอน refresh ครั้งแรก ไม่ใช่ตอน import
+    """
+
+    def __init__(self, days=SCREENER_DAYS, shard_size=SCREENER_SHARD_SIZE,
+                 refresh_minutes=SCREENER_REFRESH_MINUTES, pass_minutes=SCREENER_PASS_MINUTES):
+        self.days = days
+        self.fixed_shard_size = shard_size
+        self.shard_size = shard_size
+        self.refresh_minutes = refresh_minutes
+        self.pass_minutes = pass_minutes
+        self.rows = []
+        self.index = {}
+        self.markets = None
+        self.dates = None
+        self.close = None
+        self.volume = None
+        self.metrics = {}
+        self.updated_at = None
+        self.cursor = 0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def _ensure_matrix(self):
+        if self.close is not None:
+            return
+        rows = load_screener_universe()
+        self.index = {row["symbol"].upper(): i for i, row in enumerate(rows)}
+        self.markets = np.array([row["symbol"].split(":", 1)[0] for row in rows])
+        self.dates = self._date_axis(pd.Timestamp.now().normalize())
+        self.volume = np.full((len(rows), self.days), np.nan, dtype=np.float32)
+        self.close = np.full((len(rows), self.days), np.nan, dtype=np.float32)
+        self.rows = rows
+        self.shard_size = self.fixed_shard_size or self.shard_size_for(len(rows))
+        logger.info(f"🔎 screener: {len(rows)} ตัว shard ละ {self.shard_size} ทุก {self.refresh_minutes:g} นาที")
+
+    def shard_size_for(self, n_symbols):
+        """ขนาด shard ที่ทำให้วนครบ n_symbols ภายใน pass_minutes เมื่อ job รันทุก refresh_minutes"""
+        runs_per_pass = max(1, int(self.pass_minutes // self.refresh_minutes))
+        return max(1, -(-n_symbols // runs_per_pass))
+
+    def _date_axis(self, today):
+        return pd.bdate_range(end=today, periods=self.days).asi8 // 10**9
+
+    def _roll_axis(self):
+        """เลื่อนแกนวันที่เมื่อขึ้นวันใหม่ (ทิ้งวันเก่าสุด เติม NaN ท้าย)"""
+        dates = self._date_axis(pd.Timestamp.now().normalize())
+        if dates[-1] == self.dates[-1]:
+            return
+        shift = int(np.searchsorted(dates, self.dates[-1], side="right"))
+        shift = len(dates) - shift if shift else len(dates)
+        with self._lock:
+            for matrix in (self.close, self.volume):
+                matrix[:, :-shift] = matrix[:, shift:] if shift < self.days else np.nan
+                matrix[:, -shift:] = np.nan
+            self.dates = dates
+
+    def fill_row(self, symbol, df):
+        i = self.index.get(symbol.upper())
+        if i is None or df is None or df.empty:
+            return False
+        day = (df.index.normalize().asi8 // 10**9)
+        pos = np.searchsorted(self.dates, day)
+        ok = (pos < self.days) & (self.dates[np.minimum(pos, self.days - 1)] == day)
+        close = np.full(self.days, np.nan, dtype=np.float32)
+        volume = np.full(self.days, np.nan, dtype=np.float32)
+        close[pos[ok]] = df["close"].to_numpy()[ok]
+        volume[pos[ok]] = df["volume"].to_numpy()[ok]
+        with self._lock:
+            self.close[i] = close
+            self.volume[i] = volume
+        return True
+
+    def next_shard(self):
+        if self.cursor >= len(self.rows):
+            self.cursor = 0
+        shard = [row["symbol"] for row in self.rows[self.cursor:self.cursor + self.shard_size]]
+        self.cursor += len(shard)
+        return shard
+
+    def refresh_next_shard(self):
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            self._ensure_matrix()
+            self._roll_axis()
+            shard = self.next_shard()
+            start = time.monotonic()
+            filled = 0
+            for full_symbol in shard:
+                exchange, symbol = full_symbol.split(":", 1)
+                try:
+                    df = fetch_bars(exchange, symbol, Interval.in_daily, self.days + 10)
+                    filled += self.fill_row(full_symbol, df)
+                except Exception as e:
+                    logger.debug(f"screener: {full_symbol} ดึงข้อมูลไม่สำเร็จ: {e}")
+            self.compute_metrics()
+            logger.info(f"🔎 screener shard: {filled}/{len(shard)} ตัว | {time.monotonic() - start:.1f}s")
+        except Exception as e:
+            logger.error(f"Error in screener refresh: {e}")
+        finally:
+            self._refresh_lock.release()
+
+    def compute_metrics(self):
+        with self._lock:
+            close = self.close.copy()
+            volume = self.volume.copy()
+
+        last_close, last_idx, has_value = last_valid(close)
+        # ราคาปิดก่อนหน้าแท่งล่าสุดของแต่ละแถว
+        prev_close, _, _ = last_valid(np.where(np.arange(close.shape[1]) < last_idx[:, None], close, np.nan))
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            change_pct = (last_close - prev_close) / prev_close * 100
+
+        metrics = {
+            "close": last_close.astype(np.float64),
+            "change_pct": change_pct.astype(np.float64),
+            "sma20": trailing_mean(close, last_idx, 20),
+            "sma50": trailing_mean(close, last_idx, 50),
+            "sma200": trailing_mean(close, last_idx, 200),
+            "high52w": np.nanmax(np.where(has_value[:, None], close, 0), axis=1).astype(np.float64),
+            "rsi14": wilder_rsi(close, 14),
+            "volume": last_valid(volume)[0].astype(np.float64),
+            "avg_volume20": trailing_mean(volume, last_idx, 20),
+        }
+        with np.errstate(invalid="ignore", divide="ignore"):
+            metrics["rel_volume"] = metrics["volume"] / metrics["avg_volume20"]
+            metrics["pct_from_high52w"] = (metrics["close"] / metrics["high52w"] - 1) * 100
+        metrics["rsi"] = metrics["rsi14"]
+        for field in metrics.values():
+            field[~has_value] = np.nan
+
+        self.metrics = metrics
+        self.updated_at = time.time()
+
+    def _operand(self, token):
+        if token in self.metrics:
+            return self.metrics[token]
+        try:
+            return float(token)
+        except ValueError:
+            raise ValueError(f"Unknown screener field '{token}'")
+
+    def query(self, filters=None, sort=None, market=None, limit=50):
+        """
+        filters: "rsi14<30,close>sma50" (ทุกเงื่อนไขต้องจริง)
+        sort: "-change_pct" (มี - = มากไปน้อย)
+        """
+        metrics = self.metrics
+        if not metrics:
+            return {"updated_at": None, "total": 0, "data": []}
+
+        mask = ~np.isnan(metrics["close"])
+        if market:
+            mask &= np.isin(self.markets, [m.strip().upper() for m in market.split(",")])
+
+        for condition in (filters or "").split(","):
+            if not condition.strip():
+                continue
+            match = CONDITION_RE.match(condition.lower())
+            if not match:
+                raise ValueError(f"Invalid screener condition '{condition}'")
+            left, op, right = match.groups()
+            with np.errstate(invalid="ignore"):
+                mask &= OPERATORS[op](self._operand(left), self._operand(right))
+
+        selected = np.flatnonzero(mask)
+
+        if sort:
+            descending = sort.startswith("-")
+            key = sort.lstrip("+-").lower()
+            values = self._operand(key)
+            if np.isscalar(values):
+                raise ValueError(f"Cannot sort by constant '{sort}'")
+            values = values[selected]
+            # NaN ไปท้ายเสมอ
+            order_values = np.where(np.isnan(values), -np.inf if descending else np.inf, values)
+            order = np.argsort(-order_values if descending else order_values, kind="stable")
+            selected = selected[order]
+
+        fields = [f for f in metrics if f != "rsi"]
+        data = []
+        for i in selected[:limit]:
+            row = self.rows[i]
+            exchange, symbol = row["symbol"].split(":", 1)
+            item = {"stockSymbol": symbol, "stockMarket": exchange, "companyName": row["name"],
+                    "ThaiCompanyName": row["thai_name"], "logo": row["logo"]}
+            for field in fields:
+                value = metrics[field][i]
+                item[field] = None if np.isnan(value) else round(float(value), 4)
+            data.append(item)
+
+        return {"updated_at": self.updated_at, "total": int(len(selected)), "data": data}
+
+
+screener = Screener()
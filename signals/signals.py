@@ -0,0 +1,336 @@
+import re
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from Scraper.Resample import epoch_seconds
+
+
+# ---------- vectorized primitives ----------
+
+def ema_full(x, alpha):
+    return pd.Series(x).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+
+
+def ema_extend(x, alpha, prev_value, start):
+    """ต่อ EMA จาก index start โดยใช้ค่าที่ index start-1 (ทำงานแค่แท่งใหม่)"""
+    out = np.empty(len(x) - start)
+    y = prev_value
+    for i, xi in enumerate(x[start:]):
+        y = alpha * xi + (1 - alpha) * y
+        out[i] = y
+    return out
+
+
+def ema_series(x, alpha, prev, start):
+    if start == 0 or prev is None:
+        return ema_full(x, alpha)
+    return np.concatenate([prev[:start], ema_extend(x, alpha, prev[start - 1], start)])
+
+
+def rolling_windows(x, n, start):
+    """sliding window ของแท่ง start..ท้าย (คำนวณเฉพาะส่วนท้ายเมื่อ start > 0)"""
+    lo = max(0, start - n + 1)
+    tail = x[lo:]
+    if len(tail) < n:
+        return None, lo
+    return sliding_window_view(tail, n), lo
+
+
+def window_series(x, n, prev, start, reducer):
+    windows, lo = rolling_windows(x, n, start)
+    out = np.full(len(x), np.nan)
+    if prev is not None and start > 0:
+        out[:start] = prev[:start]
+    if windows is not None:
+        values = reducer(windows)
+        # window แรกจบที่ index lo + n - 1
+        out[lo + n - 1:] = values
+    return out
+
+
+# ---------- indicators ----------
+
+class Indicator(ABC):
+    """
+    แต่ละ indicator คำนวณจาก dict ของ array (open/high/low/close/volume)
+    compute(bars, prev, start): prev คือผลดิบ (raw) ของรอบก่อนที่ยังใช้ได้ถึง index start-1
+    ถ้า start > 0 จะคำนวณเพิ่มเฉพาะแท่ง start เป็นต้นไป
+    """
+    warmup = 1
+
+    @abstractmethod
+    def fields(self):
+        """ชื่อ column ที่คืนให้ผู้ใช้ (ไม่รวม state ภายในที่ขึ้นต้นด้วย _)"""
+
+    @abstractmethod
+    def compute(self, bars, prev, start):
+        """คืน dict ชื่อ -> array ยาวเท่า bars (รวม state ภายใน) สำหรับเป็น prev ของรอบถัดไป"""
+
+
+class Sma(Indicator):
+    def __init__(self, n=20):
+        self.n = n
+        self.name = f"sma{n}"
+        self.warmup = n
+
+    def fields(self):
+        return [self.name]
+
+    def compute(self, bars, prev, start):
+        prev_values = prev.get(self.name) if prev else None
+        return {self.name: window_series(bars["close"], self.n, prev_values, start, lambda w: w.mean(axis=1))}
+
+
+class Ema(Indicator):
+    def __init__(self, n=20):
+        self.n = n
+        self.name = f"ema{n}"
+        self.warmup = n
+
+    def fields(self):
+        return [self.name]
+
+    def compute(self, bars, prev, start):
+        prev_values = prev.get(self.name) if prev else None
+        return {self.name: ema_series(bars["close"], 2 / (self.n + 1), prev_values, start)}
+
+
+class Rsi(Indicator):
+    def __init__(self, n=14):
+        self.n = n
+        self.name = f"rsi{n}" if n != 14 else "rsi"
+        self.warmup = n + 1
+
+    def fields(self):
+        return [self.name]
+
+    def compute(self, bars, prev, start):
+        close = bars["close"]
+        delta = np.diff(close, prepend=close[0])
+        gain = np.clip(delta, 0, None)
+        loss = np.clip(-delta, 0, None)
+        alpha = 1 / self.n
+        avg_gain = ema_series(gain, alpha, prev.get("_avg_gain") if prev else None, start)
+        avg_loss = ema_series(loss, alpha, prev.get("_avg_loss") if prev else None, start)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + avg_gain / avg_loss))
+        return {self.name: rsi, "_avg_gain": avg_gain, "_avg_loss": avg_loss}
+
+
+class Macd(Indicator):
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast, self.slow, self.signal = fast, slow, signal
+        self.name = "macd" if (fast, slow, signal) == (12, 26, 9) else f"macd{fast}_{slow}_{signal}"
+        self.warmup = slow + signal
+
+    def fields(self):
+        return [self.name, f"{self.name}_signal", f"{self.name}_hist"]
+
+    def compute(self, bars, prev, start):
+        close = bars["close"]
+        prev = prev or {}
+        ema_fast = ema_series(close, 2 / (self.fast + 1), prev.get("_ema_fast"), start)
+        ema_slow = ema_series(close, 2 / (self.slow + 1), prev.get("_ema_slow"), start)
+        macd = ema_fast - ema_slow
+        signal = ema_series(macd, 2 / (self.signal + 1), prev.get(f"{self.name}_signal"), start)
+        return {
+            self.name: macd,
+            f"{self.name}_signal": signal,
+            f"{self.name}_hist": macd - signal,
+            "_ema_fast": ema_fast,
+            "_ema_slow": ema_slow,
+        }
+
+
+class Bollinger(Indicator):
+    def __init__(self, n=20, k=2.0):
+        self.n, self.k = n, k
+        self.name = "bb" if n == 20 else f"bb{n}"
+        self.warmup = n
+
+    def fields(self):
+        return [f"{self.name}_upper", f"{self.name}_middle", f"{self.name}_lower"]
+
+    def compute(self, bars, prev, start):
+        close = bars["close"]
+        prev = prev or {}
+        middle = window_series(close, self.n, prev.get(f"{self.name}_middle"), start, lambda w: w.mean(axis=1))
+        std = window_series(close, self.n, prev.get("_std"), start, lambda w: w.std(axis=1))
+        return {
+            f"{self.name}_upper": middle + self.k * std,
+            f"{self.name}_middle": middle,
+            f"{self.name}_lower": middle - self.k * std,
+            "_std": std,
+        }
+
+
+class Atr(Indicator):
+    def __init__(self, n=14):
+        self.n = n
+        self.name = "atr" if n == 14 else f"atr{n}"
+        self.warmup = n
+
+    def fields(self):
+        return [self.name]
+
+    def compute(self, bars, prev, start):
+        high, low, close = bars["high"], bars["low"], bars["close"]
+        prev_close = np.concatenate([close[:1], close[:-1]])
+        true_range = np.maximum.reduce([high - low, np.abs(high - prev_close), np.abs(low - prev_close)])
+        return {self.name: ema_series(true_range, 1 / self.n, prev.get(self.name) if prev else None, start)}
+
+
+INDICATORS = {
+    "sma": (Sma, 20),
+    "ema": (Ema, 20),
+    "rsi": (Rsi, 14),
+    "macd": (Macd, None),
+    "bb": (Bollinger, 20),
+    "atr": (Atr, 14),
+}
+
+DEFAULT_SIGNAL_INDICATORS = "sma50,sma200,ema20,rsi,macd,bb,atr"
+
+
+def parse_indicators(spec):
+    """แปลง "sma20,ema50,rsi,macd,bb,atr" เป็น list ของ Indicator"""
+    indicators = []
+    seen = set()
+    for token in (spec or "").split(","):
+        token = token.strip().lower()
+        if not token:
+            continue
+        match = re.fullmatch(r"([a-z]+)(\d*)", token)
+        if not match or match.group(1) not in INDICATORS:
+            raise ValueError(f"Unknown indicator '{token}'")
+        cls, default = INDICATORS[match.group(1)]
+        period = int(match.group(2)) if match.group(2) else default
+        if period is not None and not 1 <= period <= 1000:
+            raise ValueError(f"Invalid period for '{token}'")
+        indicator = cls(period) if period is not None else cls()
+        if indicator.name not in seen:
+            seen.add(indicator.name)
+            indicators.append(indicator)
+    return indicators
+
+
+# ---------- engine ----------
+
+class IndicatorEngine:
+    """
+    เก็บผลดิบของ indicator ต่อ (symbol, interval, indicator) ไว้
+    เมื่อ series เดิมมีแท่งใหม่ต่อท้าย จะคำนวณต่อเฉพาะแท่งใหม่ (กับแท่งสุดท้ายเดิมที่อาจยังไม่ปิด)
+    ถ้าต้นของ series เปลี่ยน (เช่นถูกตัดแท่งเก่าทิ้ง) จะคำนวณใหม่ทั้งหมด
+    """
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.full_runs = 0
+        self.incremental_runs = 0
+
+    def _resume_index(self, cached_ts, ts):
+        # แท่งสุดท้ายของรอบก่อนอาจยังไม่ปิด ให้คำนวณใหม่ตั้งแต่แท่งนั้น
+        m = len(cached_ts) - 1
+        if m <= 0 or len(ts) < m:
+            return 0
+        if ts[0] != cached_ts[0] or ts[m - 1] != cached_ts[m - 1]:
+            return 0
+        return m
+
+    def compute(self, key, df, indicators):
+        """คืน dict field -> np.ndarray ยาวเท่า df (ช่วง warm-up เป็น NaN)"""
+        ts = df.index.asi8
+        bars = {col: df[col].to_numpy(dtype=np.float64) for col in ["open", "high", "low", "close", "volume"]}
+        result = {}
+
+        for indicator in indicators:
+            cache_key = (key, indicator.name)
+            with self._lock:
+                cached = self._cache.get(cache_key)
+
+            start = self._resume_index(cached[0], ts) if cached is not None else 0
+            raw = indicator.compute(bars, cached[1] if start else None, start)
+            if start:
+                self.incremental_runs += 1
+            else:
+                self.full_runs += 1
+
+            with self._lock:
+                self._cache[cache_key] = (ts.copy(), raw)
+                self._cache.move_to_end(cache_key)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+
+            for field in indicator.fields():
+                values = raw[field].copy()
+                values[:indicator.warmup - 1] = np.nan
+                result[field] = values
+
+        return result
+
+
+indicator_engine = IndicatorEngine()
+
+
+# ---------- signals ----------
+
+def crossings(a, b):
+    """index ที่ a ตัดขึ้นเหนือ b (+1) และตัดลงใต้ b (-1)"""
+    with np.errstate(invalid="ignore"):
+        diff = np.sign(a - b)
+    up = np.flatnonzero((diff[:-1] < 0) & (diff[1:] > 0)) + 1
+    down = np.flatnonzero((diff[:-1] > 0) & (diff[1:] < 0)) + 1
+    return up, down
+
+
+def detect_signals(df, values, since=0):
+    """สัญญาณแบบ crossover จาก indicator ที่คำนวณแล้ว (ตรวจแบบ vectorized ทั้ง series)"""
+    close = df["close"].to_numpy(dtype=np.float64)
+    timestamps = epoch_seconds(df.index)
+    events = []
+
+    def add(indexes, signal, direction):
+        for i in indexes:
+            if i >= since:
+                events.append({"timestamp": int(timestamps[i]), "signal": signal, "direction": direction,
+                               "close": float(close[i])})
+
+    sma_fields = sorted((f for f in values if re.fullmatch(r"sma\d+", f)), key=lambda f: int(f[3:]))
+    if len(sma_fields) >= 2:
+        fast, slow = sma_fields[0], sma_fields[-1]
+        up, down = crossings(values[fast], values[slow])
+        add(up, f"{fast}_{slow}_golden_cross", "bullish")
+        add(down, f"{fast}_{slow}_death_cross", "bearish")
+
+    if "macd" in values:
+        up, down = crossings(values["macd"], values["macd_signal"])
+        add(up, "macd_cross", "bullish")
+        add(down, "macd_cross", "bearish")
+
+    if "rsi" in values:
+        up, _ = crossings(values["rsi"], np.full(len(close), 30.0))
+        _, down = crossings(values["rsi"], np.full(len(close), 70.0))
+        add(up, "rsi_oversold_exit", "bullish")
+        add(down, "rsi_overbought_exit", "bearish")
+
+    if "bb_upper" in values:
+        up, _ = crossings(close, values["bb_upper"])
+        _, down = crossings(close, values["bb_lower"])
+        add(up, "bb_breakout", "bullish")
+        add(down, "bb_breakdown", "bearish")
+
+    events.sort(key=lambda e: e["timestamp"])
+    return events
+
+
+def latest_values(values):
+    latest = {}
+    for field, series in values.items():
+        value = series[-1] if len(series) else np.nan
+        latest[field] = None if np.isnan(value) else round(float(value), 4)
+    return latest
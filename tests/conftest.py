@@ -0,0 +1,17 @@
+import os
+import time
+import pytest
+
+
+@pytest.fixture(params=["Asia/Bangkok", "UTC", "America/New_York"])
+def server_tz(request):
+    """index ของ tvDatafeed เป็นเวลาท้องถิ่นของ server ผลต้องเหมือนกันทุก timezone ของ server"""
+    old = os.environ.get("TZ")
+    os.environ["TZ"] = request.param
+    time.tzset()
+    yield request.param
+    if old is None:
+        os.environ.pop("TZ", None)
+    else:
+        os.environ["TZ"] = old
+    time.tzset()
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+from Scraper.BarStore import BarStore
+
+HOUR = pd.Timedelta(hours=1)
+
+
+def hourly(end, n):
+    index = pd.date_range(end=end, periods=n, freq="h")
+    close = np.arange(n, dtype=np.float64) + index[0].hour
+    df = pd.DataFrame({"symbol": "SET:PTT", "open": close, "high": close + 1, "low": close - 1,
+                       "close": close, "volume": np.full(n, 100.0)}, index=index)
+    df.index.name = "datetime"
+    return df
+
+
+class Upstream:
+    """fetch(n) ของ bar store: คืน n แท่งล่าสุดของ series ที่ปรับได้"""
+
+    def __init__(self, df):
+        self.df = df
+        self.calls = []
+
+    def __call__(self, n):
+        self.calls.append(n)
+        return self.df.iloc[-n:]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BarStore(root=str(tmp_path), min_refresh_seconds=60, max_bars=50, overlap_bars=2)
+
+
+def test_miss_then_hit(store):
+    now = pd.Timestamp.now().floor("h")
+    upstream = Upstream(hourly(now, 40))
+    first = store.get_bars("SET", "PTT", "in_1_hour", 10, upstream)
+    assert upstream.calls == [10]
+    assert list(first.index) == list(upstream.df.index[-10:])
+    assert first["close"].tolist() == upstream.df["close"].iloc[-10:].tolist()
+    assert (first["symbol"] == "SET:PTT").all()
+
+    again = store.get_bars("SET", "PTT", "in_1_hour", 5, upstream)
+    assert upstream.calls == [10]
+    assert list(again.index) == list(first.index[-5:])
+
+
+def test_deeper_request_refetches(store):
+    upstream = Upstream(hourly(pd.Timestamp.now().floor("h"), 40))
+    store.get_bars("SET", "PTT", "in_1_hour", 10, upstream)
+    assert len(store.get_bars("SET", "PTT", "in_1_hour", 30, upstream)) == 30
+    assert upstream.calls == [10, 30]
+
+
+def test_incremental_fetch_replaces_overlapping_bars(store):
+    store.min_refresh_seconds = 0
+    now = pd.Timestamp.now().floor("h")
+    upstream = Upstream(hourly(now - 3 * HOUR, 20))
+    store.get_bars("SET", "PTT", "in_1_hour", 20, upstream)
+
+    # ผ่านไป 3 ชั่วโมง แท่งล่าสุดเดิมถูกแก้ราคา (ตอนนั้นยังไม่ปิด)
+    later = hourly(now, 23)
+    later.loc[now - 3 * HOUR, "close"] = 99.0
+    upstream.df = later
+    out = store.get_bars("SET", "PTT", "in_1_hour", 20, upstream)
+
+    assert upstream.calls[-1] == 3 + store.overlap_bars
+    assert list(out.index) == list(later.index[-20:])
+    assert out.loc[now - 3 * HOUR, "close"] == 99.0
+    assert out.index.is_unique
+
+
+def test_merge_keeps_max_bars(store):
+    stored = {"timestamp": np.arange(0, 40), **{c: np.zeros(40) for c in ["open", "high", "low", "close", "volume"]}}
+    fresh = {"timestamp": np.arange(35, 60), **{c: np.ones(25) for c in ["open", "high", "low", "close", "volume"]}}
+    merged = store.merge(stored, fresh)
+    assert merged["timestamp"].tolist() == list(range(10, 60))
+    assert merged["close"].tolist() == [0.0] * 25 + [1.0] * 25
+
+
+def test_empty_upstream_without_store_returns_none(store):
+    assert store.get_bars("SET", "NOPE", "in_1_hour", 10, lambda n: None) is None
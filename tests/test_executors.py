@@ -0,0 +1,49 @@
+import asyncio
+import threading
+import pytest
+from core.executors import BoundedExecutor, UpstreamBusy, UpstreamTimeout
+
+
+def test_batch_larger_than_queue_is_admitted_as_one():
+    pool = BoundedExecutor("t", max_workers=2, max_queue=3, timeout=5)
+
+    def square(x):
+        return x * x
+
+    results = asyncio.run(pool.run_batch(square, [(i,) for i in range(20)]))
+    assert results == [i * i for i in range(20)]
+    assert pool.stats()["pending"] == 0 and pool.stats()["rejected"] == 0
+
+
+def test_batch_returns_exceptions_in_order():
+    pool = BoundedExecutor("t", max_workers=2, max_queue=2, timeout=5)
+
+    def check(x):
+        if x == 1:
+            raise ValueError("bad")
+        return x
+
+    results = asyncio.run(pool.run_batch(check, [(0,), (1,), (2,)]))
+    assert results[0] == 0 and results[2] == 2
+    assert isinstance(results[1], ValueError)
+
+
+def test_full_pool_rejects_batch_and_timeout_releases_queue():
+    pool = BoundedExecutor("t", max_workers=1, max_queue=1, timeout=0.2)
+    release = threading.Event()
+
+    async def scenario():
+        # batch ที่ค้างอยู่เต็ม pool request ถัดไปต้องได้ 503 ทันที
+        batch = asyncio.ensure_future(pool.run_batch(release.wait, [(5,), (5,), (5,)]))
+        await asyncio.sleep(0.05)
+        with pytest.raises(UpstreamBusy):
+            await pool.run(lambda: None)
+        with pytest.raises(UpstreamTimeout):
+            await batch
+
+    asyncio.run(scenario())
+    release.set()
+    pool.executor.shutdown(wait=True)
+    # งานที่ยังไม่เริ่มถูกยกเลิกตอน timeout ไม่ค้างใน pending
+    assert pool.stats()["pending"] == 0
+    assert pool.stats()["rejected"] == 1 and pool.stats()["timeouts"] == 1
@@ -0,0 +1,45 @@
+import io
+import json
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("tvDatafeed")
+from api.hist_formats import to_columns, iter_ndjson, to_csv
+from signals.signals import detect_signals
+
+# 2026-10-19 10:00 และ 14:00 เวลากรุงเทพ
+EXPECTED = [1792378800, 1792393200]
+
+
+def local_bars(server_tz):
+    """แท่งแบบที่ tvDatafeed สร้าง: index naive เป็นเวลาท้องถิ่นของ server"""
+    index = pd.DatetimeIndex(["2026-10-19 10:00", "2026-10-19 14:00"]).tz_localize("Asia/Bangkok")
+    df = pd.DataFrame({
+        "symbol": "SET:TEST",
+        "open": [1.0, 2.0],
+        "high": [1.5, 2.5],
+        "low": [0.5, 1.5],
+        "close": [1.25, 2.25],
+        "volume": [100.0, 200.0],
+    }, index=index.tz_convert(server_tz).tz_localize(None))
+    df.index.name = "datetime"
+    return df
+
+
+def test_columns_timestamps_are_utc_epochs(server_tz):
+    assert to_columns(local_bars(server_tz))["timestamp"] == EXPECTED
+
+
+def test_ndjson_and_csv_timestamps_are_utc_epochs(server_tz):
+    df = local_bars(server_tz)
+    lines = b"".join(iter_ndjson(df)).decode().splitlines()
+    assert [json.loads(line)["timestamp"] for line in lines] == EXPECTED
+    assert pd.read_csv(io.BytesIO(to_csv(df)))["timestamp"].tolist() == EXPECTED
+
+
+def test_signal_timestamps_are_utc_epochs(server_tz):
+    df = local_bars(server_tz)
+    values = {"sma5": np.array([1.0, 3.0]), "sma20": np.array([2.0, 2.0])}
+    events = detect_signals(df, values)
+    assert [event["timestamp"] for event in events] == [EXPECTED[1]]
@@ -0,0 +1,118 @@
+import json
+import time
+import logging
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import pytest
+from Scraper.MarketHours import MarketHours, MARKET_SESSIONS
+from Scraper.QuoteScheduler import QuoteScheduler, DemandTracker, CLOSED_RETRY_SECONDS
+
+BKK = ZoneInfo("Asia/Bangkok")
+NY = ZoneInfo("America/New_York")
+
+
+def at(tz, *args):
+    return datetime(*args, tzinfo=tz).timestamp()
+
+
+@pytest.fixture
+def hours(tmp_path):
+    path = tmp_path / "holidays.json"
+    path.write_text(json.dumps({"SET": ["2026-10-23"], "US": ["2026-11-26"]}))
+    return MarketHours(holidays_file=str(path))
+
+
+def test_live_during_session_and_grace(hours):
+    assert hours.is_live("SET", at(BKK, 2026, 10, 19, 11, 0))
+    assert hours.is_live("SET", at(BKK, 2026, 10, 19, 16, 45))
+    assert not hours.is_live("SET", at(BKK, 2026, 10, 19, 16, 55))
+    # พักเที่ยง
+    assert not hours.is_live("SET", at(BKK, 2026, 10, 19, 13, 30))
+    assert hours.is_live("NYSE", at(NY, 2026, 10, 19, 15, 59))
+
+
+def test_holidays_and_weekends_are_closed(hours):
+    assert not hours.is_live("SET", at(BKK, 2026, 10, 23, 11, 0))
+    assert not hours.is_live("SET", at(BKK, 2026, 10, 24, 11, 0))
+    assert not hours.is_live("NASDAQ", at(NY, 2026, 11, 26, 11, 0))
+    # close ล่าสุดก่อนวันหยุดคือวันทำการก่อนหน้า
+    assert hours.settled_close("SET", at(BKK, 2026, 10, 23, 11, 0)) == at(BKK, 2026, 10, 22, 16, 40)
+
+
+def test_needs_refresh_once_after_close(hours):
+    now = at(BKK, 2026, 10, 19, 22, 0)
+    close = at(BKK, 2026, 10, 19, 16, 40)
+    assert hours.needs_refresh("SET", close - 60, now)
+    assert hours.needs_refresh("SET", None, now)
+    assert not hours.needs_refresh("SET", close + 60, now)
+    # ระหว่าง session ดึงได้เสมอ
+    assert hours.needs_refresh("SET", at(BKK, 2026, 10, 20, 10, 59), at(BKK, 2026, 10, 20, 11, 0))
+    # พักเที่ยง: ดึงครั้งเดียวหลังปิดรอบเช้า
+    assert not hours.needs_refresh("SET", at(BKK, 2026, 10, 20, 12, 45), at(BKK, 2026, 10, 20, 13, 30))
+    # exchange ที่ไม่รู้จักดึงตลอด
+    assert hours.needs_refresh("OTC", now, now)
+
+
+def test_warns_once_when_calendar_misses_the_year(hours, caplog):
+    with caplog.at_level(logging.WARNING, logger="Scraper.MarketHours"):
+        hours.is_live("SET", at(BKK, 2027, 1, 4, 11, 0))
+        hours.is_live("SET", at(BKK, 2027, 1, 5, 11, 0))
+        hours.is_live("SET", at(BKK, 2026, 10, 19, 11, 0))
+    messages = [r.getMessage() for r in caplog.records]
+    assert len([m for m in messages if "SET" in m and "2027" in m]) == 1
+    assert not any("2026" in m for m in messages)
+
+
+def test_shipped_calendar_has_every_market():
+    with open("market_holidays.json", encoding="utf-8") as f:
+        calendars = json.load(f)
+    for _, _, calendar in MARKET_SESSIONS.values():
+        assert calendars.get(calendar), calendar
+
+
+class FixedDemand:
+    def __init__(self, symbols=None, markets=None):
+        self.symbols = symbols or {}
+        self.markets = markets or {}
+
+    def scores(self, now=None):
+        return dict(self.symbols), dict(self.markets)
+
+
+def test_plan_skips_settled_markets_and_ranks_by_demand(hours):
+    # 11:00 New York = 22:00 กรุงเทพ: NYSE เปิด, SET ปิดไปแล้ว
+    now = at(NY, 2026, 10, 19, 11, 0)
+    set_close = at(BKK, 2026, 10, 19, 16, 40)
+    symbols = ["SET:AAA", "SET:BBB", "NYSE:X", "NYSE:Y", "NYSE:Z"]
+    fetched_at = {
+        "SET:AAA": set_close + 60,
+        "SET:BBB": set_close - 3600,
+        "NYSE:X": now - 60,
+        "NYSE:Y": now - 60,
+        "NYSE:Z": now - 60,
+    }
+    scheduler = QuoteScheduler(hours, FixedDemand({"NYSE:Z": 10.0}), live_subscribers=lambda: {"NYSE:Y": 1})
+
+    plan = scheduler.plan(symbols, 4, fetched_at, now)
+    assert plan == ["SET:BBB", "NYSE:Z", "NYSE:Y", "NYSE:X"]
+    assert scheduler.last_plan["skipped_closed"] == 1
+    assert scheduler.last_plan["live_markets"] == ["NYSE"]
+
+    # ลองดึง BBB แล้วไม่สำเร็จ: รอ CLOSED_RETRY_SECONDS ก่อนลองใหม่
+    scheduler.record(["SET:BBB"], now)
+    assert "SET:BBB" not in scheduler.plan(symbols, 4, fetched_at, now + 60)
+    assert "SET:BBB" in scheduler.plan(symbols, 4, fetched_at, now + CLOSED_RETRY_SECONDS + 1)
+
+
+def test_plan_ties_follow_file_order(hours):
+    now = at(NY, 2026, 10, 19, 11, 0)
+    symbols = ["NYSE:C", "NYSE:A", "NYSE:B"]
+    scheduler = QuoteScheduler(hours, FixedDemand())
+    assert scheduler.plan(symbols, 2, {}, now) == ["NYSE:C", "NYSE:A"]
+
+
+def test_demand_decays_by_half_life():
+    tracker = DemandTracker(half_life_minutes=30)
+    tracker.hit(["SET:PTT"], weight=4)
+    symbols, _ = tracker.scores(now=time.time() + 30 * 60)
+    assert symbols["SET:PTT"] == pytest.approx(2.0, rel=1e-3)
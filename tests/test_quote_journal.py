@@ -0,0 +1,123 @@
+import os
+import time
+import calendar
+import numpy as np
+import pytest
+from Scraper.QuoteJournal import QuoteJournal, RECORD, to_series
+
+DAY = 86400
+T0 = calendar.timegm((2026, 10, 19, 3, 0, 0))  # 10:00 กรุงเทพ
+
+
+def quote(symbol, price, change=0.0, market="SET", error=None):
+    q = {"stockMarket": market, "stockSymbol": symbol, "stockPrice": price, "changePct": change}
+    if error:
+        q["error"] = error
+    return q
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return QuoteJournal(folder=str(tmp_path / "journal"), retention_days=3)
+
+
+def test_append_skips_errors_and_unchanged_prices(journal):
+    assert journal.append([quote("PTT", 34.0), quote("AOT", 60.0), quote("CPALL", None, error="x")], T0) == 2
+    assert journal.append([quote("PTT", 34.0), quote("AOT", 60.5)], T0 + 60) == 1
+    assert journal.append([quote("PTT", 34.25, 0.7)], T0 + 120) == 1
+
+    records = journal.records("SET:PTT")
+    assert records.dtype == RECORD
+    assert records["ts"].tolist() == [T0, T0 + 120]
+    assert records["price"].tolist() == [34.0, 34.25]
+    assert journal.records("SET:CPALL").size == 0
+    assert journal.records("NYSE:NOPE").size == 0
+
+
+def test_reads_ranges_across_days(journal):
+    journal.append([quote("PTT", 34.0)], T0)
+    journal.append([quote("PTT", 35.0)], T0 + DAY)
+    journal.append([quote("PTT", 36.0)], T0 + DAY + 3600)
+
+    # ไม่ระบุช่วง = วันล่าสุด
+    assert journal.records("SET:PTT")["price"].tolist() == [35.0, 36.0]
+    assert journal.records("SET:PTT", T0, T0 + DAY)["price"].tolist() == [34.0, 35.0]
+    assert journal.records("SET:PTT", start=T0 + 1)["price"].tolist() == [35.0, 36.0]
+
+    assert journal.quote_at("SET:PTT", T0 + DAY + 1800)["price"] == 35.0
+    assert journal.quote_at("SET:PTT", T0 - 1) is None
+
+
+def test_index_picks_up_records_written_after_first_read(journal):
+    journal.append([quote("PTT", 34.0)], T0)
+    assert len(journal.records("SET:PTT")) == 1
+    journal.append([quote("AOT", 60.0), quote("PTT", 34.5)], T0 + 60)
+    assert journal.records("SET:PTT")["price"].tolist() == [34.0, 34.5]
+    assert journal.records("SET:AOT")["price"].tolist() == [60.0]
+
+
+def test_symbol_ids_survive_restart(journal):
+    journal.append([quote("PTT", 34.0), quote("AAPL", 230.0, market="NASDAQ")], T0)
+    reopened = QuoteJournal(folder=journal.folder)
+    assert reopened.records("NASDAQ:AAPL")["price"].tolist() == [230.0]
+    reopened.append([quote("AAPL", 231.0, market="NASDAQ")], T0 + 60)
+    assert reopened.symbol_id("NASDAQ:AAPL") == journal.symbol_id("NASDAQ:AAPL")
+
+
+def test_rotate_removes_days_past_retention(journal):
+    for day in range(5):
+        journal.append([quote("PTT", 30.0 + day)], T0 + day * DAY)
+    assert journal.days() == ["20261020", "20261021", "20261022", "20261023"]
+    assert not os.path.exists(journal.day_path("20261019"))
+    # วันใหม่เขียน record แรกเสมอแม้ราคาเท่าเดิม
+    journal.append([quote("PTT", 34.0)], T0 + 5 * DAY)
+    assert journal.records("SET:PTT")["price"].tolist() == [34.0]
+
+
+def test_sparkline_keeps_first_and_last_point(journal):
+    for i in range(200):
+        journal.append([quote("PTT", 30.0 + i * 0.01)], T0 + i * 30)
+    points = journal.sparkline("SET:PTT", points=20)
+    assert len(points) <= 20
+    assert points["ts"][0] == T0 and points["ts"][-1] == T0 + 199 * 30
+    assert np.all(np.diff(points["ts"].astype(np.int64)) > 0)
+
+    series = to_series("SET:PTT", points)
+    assert series["symbol"] == "SET:PTT" and len(series["timestamp"]) == len(points)
+
+
+def test_submit_writes_on_writer_thread(journal):
+    for i in range(5):
+        journal.submit([quote("PTT", 34.0 + i)], T0 + i)
+    deadline = time.monotonic() + 5
+    while journal.appended < 5 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert journal.records("SET:PTT")["ts"].tolist() == [T0 + i for i in range(5)]
+    assert journal.stats()["dropped"] == 0
+
+
+def test_workers_sharing_a_folder_agree_on_symbol_ids(journal):
+    # uvicorn สอง worker = สอง QuoteJournal บนโฟลเดอร์เดียวกัน
+    other = QuoteJournal(folder=journal.folder)
+    journal.append([quote("PTT", 34.0)], T0)
+    other.append([quote("AOT", 60.0)], T0 + 1)
+    journal.append([quote("CPALL", 50.0)], T0 + 2)
+    other.append([quote("PTT", 34.5)], T0 + 3)
+
+    for reader in (journal, other, QuoteJournal(folder=journal.folder)):
+        assert reader.records("SET:PTT")["price"].tolist() == [34.0, 34.5]
+        assert reader.records("SET:AOT")["price"].tolist() == [60.0]
+        assert reader.records("SET:CPALL")["price"].tolist() == [50.0]
+
+
+def test_records_are_sorted_by_time_across_writers(journal):
+    other = QuoteJournal(folder=journal.folder)
+    journal.append([quote("PTT", 34.0)], T0 + 60)
+    assert journal.records("SET:PTT")["ts"].tolist() == [T0 + 60]
+    # worker อื่นเขียน record ที่เก่ากว่าต่อท้ายไฟล์ทีหลัง
+    other.append([quote("PTT", 33.5)], T0 + 30)
+    other.append([quote("PTT", 33.75)], T0 + 90)
+
+    assert journal.records("SET:PTT")["ts"].tolist() == [T0 + 30, T0 + 60, T0 + 90]
+    assert journal.quote_at("SET:PTT", T0 + 75)["price"] == 34.0
+    assert journal.quote_at("SET:PTT", T0 + 100)["price"] == 33.75
@@ -0,0 +1,85 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("tvDatafeed")
+from tvDatafeed import Interval
+from Scraper.Resample import is_coarser, resample_ohlcv, slice_range
+
+
+def server_times(exchange_tz, server_tz, stamps):
+    return pd.DatetimeIndex(pd.to_datetime(stamps)).tz_localize(exchange_tz).tz_convert(server_tz).tz_localize(None)
+
+
+def hourly_bars(exchange, exchange_tz, server_tz, days, hours):
+    stamps = [f"{day} {hour}" for day in days for hour in hours]
+    n = len(stamps)
+    df = pd.DataFrame({
+        "symbol": f"{exchange}:TEST",
+        "open": [float(i) for i in range(n)],
+        "high": [i + 0.5 for i in range(n)],
+        "low": [i - 0.5 for i in range(n)],
+        "close": [i + 0.25 for i in range(n)],
+        "volume": [100.0] * n,
+    }, index=server_times(exchange_tz, server_tz, stamps))
+    df.index.name = "datetime"
+    return df
+
+
+def test_set_4h_bars_follow_sessions(server_tz):
+    days = ["2026-10-19", "2026-10-20"]
+    hours = ["10:00", "11:00", "12:00", "14:00", "15:00", "16:00"]
+    out = resample_ohlcv(hourly_bars("SET", "Asia/Bangkok", server_tz, days, hours), Interval.in_4_hour, "SET")
+
+    expected = server_times("Asia/Bangkok", server_tz,
+                            ["2026-10-19 10:00", "2026-10-19 14:00", "2026-10-20 10:00", "2026-10-20 14:00"])
+    assert list(out.index) == list(expected)
+    assert out["open"].tolist() == [0.0, 3.0, 6.0, 9.0]
+    assert out["high"].tolist() == [2.5, 5.5, 8.5, 11.5]
+    assert out["low"].tolist() == [-0.5, 2.5, 5.5, 8.5]
+    assert out["close"].tolist() == [2.25, 5.25, 8.25, 11.25]
+    assert out["volume"].tolist() == [300.0] * 4
+    assert out.index.name == "datetime"
+    assert (out["symbol"] == "SET:TEST").all()
+
+
+def test_us_daily_bars_hold_whole_session(server_tz):
+    days = ["2026-10-19", "2026-10-20"]
+    hours = ["09:30", "10:30", "11:30", "12:30", "13:30", "14:30", "15:30"]
+    out = resample_ohlcv(hourly_bars("NYSE", "America/New_York", server_tz, days, hours), Interval.in_daily, "NYSE")
+
+    expected = server_times("America/New_York", server_tz, ["2026-10-19 09:30", "2026-10-20 09:30"])
+    assert list(out.index) == list(expected)
+    assert out["open"].tolist() == [0.0, 7.0]
+    assert out["close"].tolist() == [6.25, 13.25]
+    assert out["volume"].tolist() == [700.0, 700.0]
+
+
+def test_weekly_bars_start_on_monday_open(server_tz):
+    days = ["2026-10-16", "2026-10-19", "2026-10-23"]
+    out = resample_ohlcv(hourly_bars("SET", "Asia/Bangkok", server_tz, days, ["10:00", "16:00"]), Interval.in_weekly, "SET")
+
+    expected = server_times("Asia/Bangkok", server_tz, ["2026-10-12 10:00", "2026-10-19 10:00"])
+    assert list(out.index) == list(expected)
+    assert out["volume"].tolist() == [200.0, 400.0]
+
+
+def test_session_aligned_intervals_are_fetched_natively():
+    for interval in (Interval.in_4_hour, Interval.in_daily, Interval.in_weekly, Interval.in_monthly):
+        assert not is_coarser(interval, Interval.in_1_hour)
+    assert is_coarser(Interval.in_2_hour, Interval.in_1_hour)
+    assert not is_coarser(Interval.in_1_hour, Interval.in_1_hour)
+
+
+def test_slice_range_bounds_follow_server_time(server_tz):
+    hours = ["10:00", "11:00", "12:00", "14:00", "15:00", "16:00"]
+    df = hourly_bars("SET", "Asia/Bangkok", server_tz, ["2026-10-19"], hours)
+
+    # epoch ของ 11:00 และ 15:00 เวลากรุงเทพ
+    out = slice_range(df, 1792382400, 1792396800)
+    assert list(out.index) == list(server_times("Asia/Bangkok", server_tz, ["2026-10-19 11:00", "2026-10-19 12:00",
+                                                                          "2026-10-19 14:00", "2026-10-19 15:00"]))
+
+    out = slice_range(df, "2026-10-19T14:00", None, "Asia/Bangkok")
+    assert out["open"].tolist() == [3.0, 4.0, 5.0]
+    out = slice_range(df, "2026-10-19T04:00:00+00:00", None)
+    assert out["open"].tolist() == [1.0, 2.0, 3.0, 4.0, 5.0]
@@ -0,0 +1,45 @@
+import pytest
+
+pytest.importorskip("tvDatafeed")
+
+import signals.screener as screener_module
+from signals.screener import Screener
+
+
+def test_shard_size_covers_universe_within_pass():
+    screener = Screener(shard_size=0, refresh_minutes=10, pass_minutes=120)
+    assert screener.shard_size_for(12000) == 1000
+    assert screener.shard_size_for(12001) == 1001
+    assert screener.shard_size_for(5) == 1
+    # refresh ห่างกว่ารอบที่ต้องการ ต้องทำทั้ง universe ในครั้งเดียว
+    assert Screener(refresh_minutes=30, pass_minutes=10).shard_size_for(500) == 500
+
+
+def test_full_pass_fits_target(monkeypatch):
+    rows = [{"symbol": f"SET:S{i}", "name": "", "thai_name": None, "logo": ""} for i in range(2500)]
+    monkeypatch.setattr(screener_module, "load_screener_universe", lambda: rows)
+    screener = Screener(shard_size=0, refresh_minutes=10, pass_minutes=60)
+    screener._ensure_matrix()
+
+    seen = set()
+    for _ in range(6):
+        seen.update(screener.next_shard())
+    assert len(seen) == len(rows)
+
+
+def test_fixed_shard_size_wins(monkeypatch):
+    monkeypatch.setattr(screener_module, "load_screener_universe",
+                        lambda: [{"symbol": f"SET:S{i}", "name": "", "thai_name": None, "logo": ""} for i in range(50)])
+    screener = Screener(shard_size=7)
+    screener._ensure_matrix()
+    assert len(screener.next_shard()) == 7
+
+
+def test_us_rows_have_no_thai_name(monkeypatch, tmp_path):
+    csv_path = tmp_path / "us.csv"
+    csv_path.write_text("symbol,companyName,logo_url\nNASDAQ:AAPL,Apple Inc.,\n", encoding="utf-8")
+    monkeypatch.setattr(screener_module, "US_STOCK_CSV", str(csv_path))
+    monkeypatch.setattr(screener_module.symbol_universe, "ensure_loaded", lambda: None)
+    monkeypatch.setattr(screener_module.symbol_universe, "rows", [])
+    rows = screener_module.load_screener_universe()
+    assert rows == [{"symbol": "NASDAQ:AAPL", "name": "Apple Inc.", "thai_name": None, "logo": ""}]
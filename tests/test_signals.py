@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("tvDatafeed")
+from signals.signals import IndicatorEngine, parse_indicators, DEFAULT_SIGNAL_INDICATORS
+
+SPEC = DEFAULT_SIGNAL_INDICATORS + ",sma5,bb10,atr7"
+
+
+def bars(n, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    df = pd.DataFrame({
+        "symbol": "SET:TEST",
+        "open": close + rng.normal(0, 0.2, n),
+        "high": close + 1 + rng.random(n),
+        "low": close - 1 - rng.random(n),
+        "close": close,
+        "volume": rng.integers(1_000, 10_000, n).astype(float),
+    }, index=pd.date_range("2026-01-01", periods=n, freq="h"))
+    df.index.name = "datetime"
+    return df
+
+
+def assert_same(a, b):
+    assert a.keys() == b.keys()
+    for field in a:
+        np.testing.assert_allclose(a[field], b[field], rtol=1e-9, atol=1e-9, equal_nan=True, err_msg=field)
+
+
+def test_incremental_matches_full_recompute():
+    df = bars(400)
+    indicators = parse_indicators(SPEC)
+
+    # รอบแรกแท่งสุดท้ายยังไม่ปิด (ราคาต่างจากแท่งที่ปิดจริง) รอบถัดไปมีแท่งใหม่ต่อท้าย
+    partial = df.iloc[:300].copy()
+    partial.iloc[-1, partial.columns.get_loc("close")] += 3.0
+    engine = IndicatorEngine()
+    engine.compute("k", partial, indicators)
+    incremental = engine.compute("k", df, indicators)
+
+    full = IndicatorEngine().compute("k", df, indicators)
+    assert engine.incremental_runs == len(indicators)
+    assert_same(incremental, full)
+
+
+def test_changed_history_falls_back_to_full_run():
+    df = bars(300)
+    indicators = parse_indicators("sma20,rsi")
+    engine = IndicatorEngine()
+    engine.compute("k", df, indicators)
+
+    # แท่งเก่าถูกตัดทิ้ง (ต้นของ series เปลี่ยน) ต้องคำนวณใหม่ทั้งหมด
+    trimmed = df.iloc[50:]
+    result = engine.compute("k", trimmed, indicators)
+    assert engine.incremental_runs == 0
+    assert_same(result, IndicatorEngine().compute("k", trimmed, indicators))
+
+
+def test_warmup_is_nan():
+    result = IndicatorEngine().compute("k", bars(60), parse_indicators("sma20"))
+    assert np.isnan(result["sma20"][:19]).all()
+    assert not np.isnan(result["sma20"][19:]).any()
+
+
+@pytest.mark.parametrize("spec", ["foo", "sma0", "sma-1"])
+def test_parse_indicators_rejects_unknown(spec):
+    with pytest.raises(ValueError):
+        parse_indicators(spec)
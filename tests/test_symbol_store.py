@@ -0,0 +1,77 @@
+import os
+import csv
+import pytest
+from Scraper.SymbolStore import SymbolStore
+
+
+def write_csv(path, header, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+@pytest.fixture
+def store(tmp_path):
+    main_csv = tmp_path / "StockData.csv"
+    us_csv = tmp_path / "us.csv"
+    write_csv(main_csv, ["symbol", "ThaiCompanyName", "EngCompanyName", "logo"], [
+        ["SET:PTTEP", "บริษัท ปตท. สำรวจและผลิตปิโตรเลียม จำกัด (มหาชน)", "PTT EXPLORATION AND PRODUCTION", "pttep.svg"],
+        ["SET:PTT", "บริษัท ปตท. จำกัด (มหาชน)", "PTT PUBLIC COMPANY LIMITED", "ptt.svg"],
+        ["SET:PTTGC", "บริษัท พีทีที โกลบอล เคมิคอล จำกัด (มหาชน)", "PTT GLOBAL CHEMICAL", "pttgc.svg"],
+        ["SET:KBANK", "ธนาคารกสิกรไทย จำกัด (มหาชน)", "KASIKORNBANK", "kbank.svg"],
+        ["SET:SCB", "เอสซีบี เอกซ์ จำกัด (มหาชน)", "SCB X PUBLIC COMPANY LIMITED", ""],
+    ])
+    write_csv(us_csv, ["symbol", "companyName", "logo_url"], [
+        ["NASDAQ:AAPL", "Apple Inc.", "aapl.svg"],
+        ["NYSE:T", "AT&T Inc.", "t.svg"],
+        ["NASDAQ:APPN", "Appian Corporation", ""],
+        ["NYSE:SCB", "Pineapple Holdings", ""],
+    ])
+    sources = [
+        (str(main_csv), None, "EngCompanyName", "ThaiCompanyName", "logo"),
+        (str(us_csv), None, "companyName", None, "logo_url"),
+    ]
+    return SymbolStore(path=str(tmp_path / "symbols.sqlite"), sources=sources, check_interval=0)
+
+
+def symbols(result):
+    return [f"{r['stockMarket']}:{r['stockSymbol']}" for r in result]
+
+
+def test_exact_ticker_first_then_shorter_prefixes(store):
+    # PTTEP อยู่ก่อน PTT ในไฟล์ แต่ ticker สั้นกว่ามาก่อน ยาวเท่ากันเรียงตามลำดับไฟล์
+    assert symbols(store.search("pt")) == ["SET:PTT", "SET:PTTEP", "SET:PTTGC"]
+    assert symbols(store.search("pttgc")) == ["SET:PTTGC"]
+
+
+def test_market_filter_and_exchange_prefix(store):
+    assert symbols(store.search("scb")) == ["SET:SCB", "NYSE:SCB"]
+    assert symbols(store.search("scb", market="NYSE")) == ["NYSE:SCB"]
+    assert symbols(store.search("NYSE:scb")) == ["NYSE:SCB"]
+
+
+def test_thai_name_search(store):
+    assert symbols(store.search("กสิกร")) == ["SET:KBANK"]
+    assert symbols(store.search("ปตท", limit=5)) == ["SET:PTTEP", "SET:PTT"]
+
+
+def test_word_start_names_rank_before_substrings(store):
+    # "apple" ขึ้นต้นคำของ Apple Inc. ก่อน "pineapple" ที่มี apple อยู่กลางคำ
+    assert symbols(store.search("apple")) == ["NASDAQ:AAPL", "NYSE:SCB"]
+
+
+def test_limit_and_no_match(store):
+    assert len(store.search("p", limit=2)) == 2
+    assert store.search("zzzz") == []
+    assert store.search("   ") == []
+
+
+def test_rebuilds_when_source_is_newer(store, tmp_path):
+    assert store.search("newco") == []
+    us_csv = tmp_path / "us.csv"
+    with open(us_csv, "a", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerow(["NYSE:NEWCO", "Newco Corporation", ""])
+    later = os.path.getmtime(store.path) + 10
+    os.utime(us_csv, (later, later))
+    assert symbols(store.search("newco")) == ["NYSE:NEWCO"]
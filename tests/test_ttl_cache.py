@@ -0,0 +1,127 @@
+import threading
+import time
+import types
+import pytest
+import Scraper.TtlCache as ttl_cache
+from Scraper.TtlCache import TtlCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch, tmp_path):
+    clock = Clock()
+    monkeypatch.setattr(ttl_cache, "time", types.SimpleNamespace(time=clock.time))
+    monkeypatch.setattr(ttl_cache, "CACHE_STORAGE_FOLDER", str(tmp_path))
+    return clock
+
+
+class Loader:
+    def __init__(self, *values):
+        self.values = list(values)
+        self.calls = 0
+        self.done = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        value = self.values[min(self.calls, len(self.values)) - 1]
+        self.done.set()
+        return value
+
+
+def test_fresh_values_are_served_from_memory(clock):
+    cache = TtlCache("t", ttl=60)
+    loader = Loader({"v": 1})
+    assert cache.get("PTT", loader) == {"v": 1}
+    clock.now += 59
+    assert cache.get("PTT", loader) == {"v": 1}
+    assert loader.calls == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_stale_value_is_served_while_refreshing(clock):
+    cache = TtlCache("t", ttl=60, stale_ttl=600)
+    loader = Loader({"v": 1}, {"v": 2})
+    cache.get("PTT", loader)
+
+    clock.now += 120
+    assert cache.get("PTT", loader) == {"v": 1}
+    assert loader.done.wait(5)
+    for _ in range(100):
+        if not cache.stats()["inflight"]:
+            break
+        time.sleep(0.01)
+    assert cache.get("PTT", loader) == {"v": 2}
+    assert loader.calls == 2
+    assert cache.stats()["stale_hits"] == 1
+
+    # เกิน ttl + stale_ttl ต้องรอโหลดใหม่
+    clock.now += 1000
+    assert cache.peek("PTT") is None
+
+
+def test_empty_results_are_not_cached_without_negative_ttl(clock):
+    cache = TtlCache("t", ttl=60)
+    loader = Loader({}, {"v": 1})
+    assert cache.get("NOPE", loader) == {}
+    assert cache.get("NOPE", loader) == {"v": 1}
+    assert loader.calls == 2
+
+
+def test_negative_ttl_caches_empty_results_briefly(clock):
+    cache = TtlCache("t", ttl=3600, negative_ttl=30)
+    loader = Loader([], ["x"])
+    assert cache.get("NOPE", loader) == []
+    clock.now += 29
+    assert cache.get("NOPE", loader) == []
+    assert loader.calls == 1
+    clock.now += 2
+    assert cache.get("NOPE", loader) == ["x"]
+    assert loader.calls == 2
+
+
+def test_concurrent_misses_share_one_load(clock):
+    cache = TtlCache("t", ttl=60)
+    release = threading.Event()
+    calls = []
+
+    def slow_loader():
+        calls.append(1)
+        release.wait(5)
+        return {"v": 1}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("PTT", slow_loader))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for _ in range(100):
+        if calls:
+            break
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == [{"v": 1}] * 5
+    assert len(calls) == 1
+
+
+def test_disk_entries_survive_restart(clock):
+    TtlCache("d", ttl=60, disk=True).get("PTT", Loader({"v": 1}))
+    reopened = TtlCache("d", ttl=60, disk=True)
+    assert reopened.peek("PTT") == {"v": 1}
+    reopened.invalidate("PTT")
+    assert TtlCache("d", ttl=60, disk=True).peek("PTT") is None
+
+
+def test_memory_only_peek_skips_disk(clock):
+    TtlCache("d", ttl=60, disk=True).get("PTT", Loader({"v": 1}))
+    reopened = TtlCache("d", ttl=60, disk=True)
+    assert reopened.peek("PTT", memory_only=True) is None
+    assert reopened.get("PTT", Loader({"v": 2})) == {"v": 1}
+    assert reopened.peek("PTT", memory_only=True) == {"v": 1}
@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("tvDatafeed")
+from Scraper.TvSessionPool import TvSessionPool
+from Scraper.Upstream import Upstream, AdaptiveRateLimiter, CircuitBreaker
+
+BARS = pd.DataFrame({"close": [1.0]})
+
+
+class FakeClient:
+    # symbol ที่ไม่มีข้อมูลจริง หรือถูกสั่งให้คืน None (จำลอง upstream throttle)
+    empty = {"DELISTED1", "DELISTED2", "DELISTED3"}
+
+    def get_hist(self, symbol, exchange, **kwargs):
+        return None if symbol in self.empty else BARS
+
+
+@pytest.fixture
+def pool():
+    upstream = Upstream("test", AdaptiveRateLimiter(100, 1, 100, burst=100), CircuitBreaker(failure_threshold=1))
+    FakeClient.empty = {"DELISTED1", "DELISTED2", "DELISTED3"}
+    return TvSessionPool(factory=FakeClient, size=1, upstream=upstream)
+
+
+def test_empty_symbols_without_history_are_neutral(pool):
+    for symbol in ("DELISTED1", "DELISTED2", "DELISTED3"):
+        assert pool.get_hist(symbol=symbol, exchange="SET") is None
+    assert pool.upstream.failures == 0
+    assert pool.upstream.breaker.state == "closed"
+
+
+def test_empty_streak_on_known_symbols_counts_as_failure(pool):
+    pool.get_hist(symbol="PTT", exchange="SET")
+    pool.get_hist(symbol="CPALL", exchange="SET")
+    FakeClient.empty = {"PTT", "CPALL"}
+
+    pool.get_hist(symbol="PTT", exchange="SET")
+    assert pool.upstream.failures == 0
+    pool.get_hist(symbol="CPALL", exchange="SET")
+    assert pool.upstream.failures == 1
+    assert pool.upstream.breaker.state == "open"
@@ -0,0 +1,126 @@
+import types
+import pytest
+import Scraper.Upstream as upstream_module
+from Scraper.Upstream import AdaptiveRateLimiter, CircuitBreaker, CircuitOpen, RateLimitTimeout, Upstream
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(upstream_module, "time",
+                        types.SimpleNamespace(monotonic=clock.monotonic, sleep=clock.sleep))
+    return clock
+
+
+def test_limiter_spends_burst_then_waits_for_refill(clock):
+    limiter = AdaptiveRateLimiter(rate=2, min_rate=1, max_rate=10, burst=3)
+    for _ in range(3):
+        limiter.acquire()
+    assert clock.now == 1000.0
+    limiter.acquire()
+    assert clock.now == pytest.approx(1000.5)
+
+
+def test_limiter_times_out_with_retry_after(clock):
+    limiter = AdaptiveRateLimiter(rate=0.25, min_rate=0.1, max_rate=1, burst=1)
+    limiter.acquire()
+    with pytest.raises(RateLimitTimeout) as exc:
+        limiter.acquire(timeout=1)
+    assert exc.value.status_code == 503
+    assert exc.value.headers == {"Retry-After": "4"}
+
+
+def test_aimd_increases_additively_and_halves_on_error(clock):
+    limiter = AdaptiveRateLimiter(rate=4, min_rate=1, max_rate=5, increase=0.5, target_latency=2)
+    limiter.record(True, 0.1)
+    assert limiter.rate == 4.5
+    limiter.record(True, 0.1)
+    limiter.record(True, 0.1)
+    assert limiter.rate == 5
+
+    limiter.record(False)
+    assert limiter.rate == 2.5
+    # error ที่ตามมาใน decrease_interval เดียวกันนับเป็นครั้งเดียว
+    limiter.record(False)
+    assert limiter.rate == 2.5
+
+    clock.now += 1
+    limiter.record(True, 3.0)  # ช้ากว่า target ลด 10%
+    assert limiter.rate == pytest.approx(2.25)
+    for _ in range(5):
+        clock.now += 1
+        limiter.record(False)
+    assert limiter.rate == 1
+
+
+def test_breaker_opens_probes_and_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=3, cooldown=10, max_cooldown=25)
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record(False)
+    assert breaker.state == "open" and breaker.trips == 1
+    assert not breaker.allow()
+    assert breaker.retry_in() == 10
+
+    clock.now += 10
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    # probe ทีละหนึ่ง call
+    assert not breaker.allow()
+    breaker.record(False)
+    assert breaker.state == "open" and breaker.cooldown == 20
+
+    clock.now += 20
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.cooldown == 25
+
+    clock.now += 25
+    assert breaker.allow()
+    breaker.record(True)
+    assert breaker.state == "closed" and breaker.cooldown == 10 and breaker.failures == 0
+
+
+def test_breaker_counts_consecutive_failures_only(clock):
+    breaker = CircuitBreaker(failure_threshold=3)
+    breaker.record(False)
+    breaker.record(False)
+    breaker.record(True)
+    breaker.record(False)
+    breaker.record(False)
+    assert breaker.state == "closed"
+
+
+def test_upstream_call_records_outcomes_and_rejects_when_open(clock):
+    upstream = Upstream("test", AdaptiveRateLimiter(10, 1, 10, burst=10), CircuitBreaker(failure_threshold=2))
+
+    class NotFound(Exception):
+        pass
+
+    def fail(exc):
+        raise exc
+
+    assert upstream.call(lambda: "ok") == "ok"
+    with pytest.raises(NotFound):
+        upstream.call(fail, NotFound(), neutral=(NotFound,))
+    assert upstream.failures == 0
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            upstream.call(fail, ValueError())
+    assert upstream.failures == 2
+    with pytest.raises(CircuitOpen) as exc:
+        upstream.call(lambda: "ok")
+    assert exc.value.status_code == 503
+    assert exc.value.headers["Retry-After"] == "30"